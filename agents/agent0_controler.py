@@ -1,21 +1,10 @@
 from agents.base_agent import Agent
+from agents.agent2_planificateur import SCENARIOS, normalize_route
+from agents.memory import MEMORY_MAX_TOKENS
 import json
 
-class ControlerAgent(Agent):
-    def __init__(self):
-        super().__init__(
-            name="Controlleur",
-            description="Filtre les demandes et extrait les tickers boursiers.",
-            modelName="mistral"
-        )
-    
-    def run(self, userInput :str) -> dict:
-       
-        instructions = """
-        Ta mission est double :
-        1. VALIDATION : Décide si la demande concerne la finance, l'économie, la bourse ou une entreprise (OUI/NON).
-        2. EXTRACTION : Identifie l'entreprise mentionnée et trouve son TICKER boursier officiel.
-
+# Regles d'extraction du ticker, communes a run() et a intake()
+TICKER_RULES = """
         RÈGLES POUR LE TICKER :
         - Transforme le nom commun en symbole boursier (Ex: "Microsoft" -> "MSFT").
         - Ça marche même si c'est écrit en minuscule (ex: "apple" -> "AAPL").
@@ -28,7 +17,23 @@ class ControlerAgent(Agent):
         - "Analyse de Tesla" -> ticker: "TSLA"
         - "Cours du bitcoin" -> ticker: "BTC-USD"
         - "Google" -> ticker: "GOOGL"
+"""
 
+class ControlerAgent(Agent):
+    def __init__(self):
+        super().__init__(
+            name="Controlleur",
+            description="Filtre les demandes et extrait les tickers boursiers.",
+            memoryTokens=MEMORY_MAX_TOKENS
+        )
+    
+    def run(self, userInput :str) -> dict:
+       
+        instructions = """
+        Ta mission est double :
+        1. VALIDATION : Décide si la demande concerne la finance, l'économie, la bourse ou une entreprise (OUI/NON).
+        2. EXTRACTION : Identifie l'entreprise mentionnée et trouve son TICKER boursier officiel.
+""" + TICKER_RULES + """
         FORMAT JSON OBLIGATOIRE (Réponds uniquement le JSON) :
         {
             "decision": "OUI" ou "NON",
@@ -39,8 +44,37 @@ class ControlerAgent(Agent):
         
      
         response = self.callLlm(instructions, f"Voici la demande : {userInput}", formatJson=True)
+        return self._parse(response)
+
+    def intake(self, userInput: str) -> dict:
+        """
+        Accueil en un seul appel : validation, ticker et voie du Planificateur.
+        Remplace run() suivi de PlanificateurAgent.run() ; "route" vaut None si la voie est ambigue.
+        """
+        instructions = """
+        Ta mission est triple :
+        1. VALIDATION : Décide si la demande concerne la finance, l'économie, la bourse ou une entreprise (OUI/NON).
+        2. EXTRACTION : Identifie l'entreprise mentionnée et trouve son TICKER boursier officiel.
+        3. ROUTAGE : Choisis la voie de traitement de la demande (INFO_SIMPLE ou ANALYSE_COMPLETE).
+""" + TICKER_RULES + """
+        VOIES POSSIBLES :
+""" + SCENARIOS + """
+        FORMAT JSON OBLIGATOIRE (Réponds uniquement le JSON) :
+        {
+            "decision": "OUI" ou "NON",
+            "raison": "explication courte",
+            "ticker": "SYMBOLE" ou null,
+            "route": "INFO_SIMPLE" ou "ANALYSE_COMPLETE"
+        }
+        """
+
+        response = self.callLlm(instructions, f"Voici la demande : {userInput}", formatJson=True, task="intake")
+        resultat = self._parse(response)
+        resultat["route"] = normalize_route(resultat.get("route"))
+        return resultat
 
-      
+    def _parse(self, response) -> dict:
+        """Reponse JSON du modele -> dict (refus par defaut si le JSON est invalide)."""
         try:
             if isinstance(response, dict):
                 return response
@@ -1,25 +1,23 @@
 from agents.base_agent import Agent
-from tools.yfinance_fetch import data_fetcher_per_stock
+from tools.snapshot_cache import cached_fetch_stock_snapshot
 from agents.utils import save_to_file
-import json
 import datetime
 
 class ChercheurAgent(Agent):
     def __init__(self):
         super().__init__(
             name="Chercheur",
-            description="Expert en extraction de données financières.",
-            modelName="mistral"
+            description="Expert en extraction de données financières."
         )
     
     def _get_safe(self, data, path, default="N/A"):
-        """Récupère une valeur dans un dictionnaire imbriqué sans planter."""
+        """Récupère une valeur imbriquée (attribut du snapshot ou clé de dictionnaire) sans planter."""
         try:
             keys = path.split('.')
             val = data
             for key in keys:
                 if val is None: return default
-                val = val.get(key)
+                val = val.get(key) if isinstance(val, dict) else getattr(val, key, None)
             return val if val is not None else default
         except:
             return default
@@ -30,31 +28,44 @@ class ChercheurAgent(Agent):
             return f"{val:.2f}{suffix}"
         return str(val)
 
+    def _format_indicators(self, ind) -> str:
+        """Section des indicateurs precalcules (tools.indicators) : faits a citer tels quels."""
+        if ind is None:
+            return "- Indicateurs non disponibles (historique insuffisant)."
+        na = lambda val, suffix="": self._format_number(val, suffix) if val is not None else "N/A"
+        return f"""- **Moyennes mobiles (20j / 50j / 200j):** {na(ind.sma_20)} / {na(ind.sma_50)} / {na(ind.sma_200)} $
+- **Prix vs MM50 / MM200:** {na(ind.price_vs_sma_50_pct, "%")} / {na(ind.price_vs_sma_200_pct, "%")}
+- **RSI 14j:** {na(ind.rsi_14)}
+- **Performance 1 mois / 3 mois / 1 an:** {na(ind.return_1m_pct, "%")} / {na(ind.return_3m_pct, "%")} / {na(ind.return_1y_pct, "%")}
+- **Volatilite annualisee (1 mois / 1 an):** {na(ind.volatility_1m_pct, "%")} / {na(ind.volatility_1y_pct, "%")}
+- **Drawdown max 1 an:** {na(ind.max_drawdown_1y_pct, "%")}
+- **VaR historique 1 jour (95% / 99%):** {na(ind.var_95_1d_pct, "%")} / {na(ind.var_99_1d_pct, "%")}
+- **Z-score du volume (vs 20j):** {na(ind.volume_zscore_20d)}"""
+
     def run(self, ticker: str) -> str:
         print(f"[Chercheur] Récupération des données brutes pour {ticker}...")
 
    
         try:
-            raw_data_json = data_fetcher_per_stock(ticker)
-            data = json.loads(raw_data_json) if isinstance(raw_data_json, str) else raw_data_json
+            data = cached_fetch_stock_snapshot(ticker)
         except Exception as e:
             return f"❌ Erreur critique : {e}"
 
-        if isinstance(data, dict) and "error" in data:
+        if data.error:
              return f"❌ Impossible de récupérer les données pour {ticker}."
 
         print(f"[Chercheur] Génération des parties textuelles via LLM...")
 
-        summary_raw = data.get('business_summary', 'No summary available.')
-        news_raw = data.get('latest_news', [])
+        summary_raw = data.business_summary or 'No summary available.'
+        news_raw = data.latest_news
         
       
         news_list_txt = ""
         count = 0
         for n in news_raw:
-            content = n.get('context_article', '')
-            title = n.get('title', 'Sans titre')
-            link = n.get('link', '')
+            content = n.context_article or ''
+            title = n.title or 'Sans titre'
+            link = n.link or ''
 
         
             if not content or "Error" in content or "403" in content or len(content) < 50:
@@ -140,6 +151,9 @@ ACTUALITES A RESUMER (5 articles):
 - **Capitalisation:** {self._get_safe(d, 'market_cap')} (Brut)
 - **Beta:** {self._get_safe(d, 'beta')}
 
+### Indicateurs techniques et de risque (calcules sur {d.indicators.history_days if d.indicators else 0} seances)
+{self._format_indicators(d.indicators)}
+
 ## 3. RATIOS DE VALORISATION
 - **P/E (Actuel):** {self._format_number(self._get_safe(d, 'pe_ratio'))}
 - **P/E (Forward):** {self._format_number(self._get_safe(d, 'forward_pe'))}
@@ -165,7 +179,7 @@ ACTUALITES A RESUMER (5 articles):
 
 ## 7. DIVIDENDES
 - **Rendement (Yield):** {self._get_safe(d, 'dividends.yield_percent')}
-- **Payout Ratio:** {self._get_safe(d, 'dividends.payout_ratio')}
+- **Payout Ratio:** {self._get_safe(d, 'dividends.payout_percent')}
 
 ## 8. AVIS DES ANALYSTES
 - **Consensus:** {self._get_safe(d, 'recommendation').upper()}
@@ -176,7 +190,7 @@ ACTUALITES A RESUMER (5 articles):
 {synthese_news}
 
 ### Liens des articles sources
-{chr(10).join([f"- {n.get('title', 'Article')[:80]} : {n.get('link', '#')}" for n in d.get('latest_news', [])[:5] if n.get('link')])}
+{chr(10).join([f"- {(n.title or 'Article')[:80]} : {n.link}" for n in d.latest_news[:5] if n.link])}
 
 ---
 Rapport genere le {current_date}
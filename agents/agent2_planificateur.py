@@ -1,21 +1,8 @@
 from agents.base_agent import Agent
+from typing import Optional
 
-class PlanificateurAgent(Agent):
-    def __init__(self):
-        super().__init__(
-            name="Planificateur",
-            description="Tu es un chef de projet. Ton rôle est d'analyser la demande de l'utilisateur pour diriger le flux de travail vers les bons experts.",
-            modelName="mistral"
-        )
-    
-    def run(self, user_question: str) -> str:
-        print(f"[Planificateur] Analyse de l'intention utilisateur : '{user_question}'...")
-
-
-        system_prompt = """
-Tu es un routeur intelligent dans un système multi-agents financier.
-Tu dois analyser la question de l'utilisateur et choisir la prochaine étape.
-
+# Voies de traitement, communes a run() et a l'accueil en un appel (ControlerAgent.intake)
+SCENARIOS = """
 SCÉNARIO 1 : "INFO_SIMPLE"
 L'utilisateur demande des faits bruts, des chiffres spécifiques, une description de l'entreprise ou des résultats passés. Il ne demande pas d'avis ni de prévision.
 Exemples : 
@@ -32,7 +19,34 @@ Exemples :
 - "Fais-moi une analyse complète."
 - "Est-ce le bon moment pour acheter ?"
 - "Bull ou Bear sur ce stock ?"
+"""
+
 
+def normalize_route(response: str) -> Optional[str]:
+    """Reponse du modele -> "ANALYSE_COMPLETE", "INFO_SIMPLE", ou None si ambigue."""
+    decision = (response or "").strip().upper()
+    if "ANALYSE" in decision:
+        return "ANALYSE_COMPLETE"
+    if "INFO" in decision:
+        return "INFO_SIMPLE"
+    return None
+
+
+class PlanificateurAgent(Agent):
+    def __init__(self):
+        super().__init__(
+            name="Planificateur",
+            description="Tu es un chef de projet. Ton rôle est d'analyser la demande de l'utilisateur pour diriger le flux de travail vers les bons experts."
+        )
+    
+    def run(self, user_question: str) -> str:
+        print(f"[Planificateur] Analyse de l'intention utilisateur : '{user_question}'...")
+
+
+        system_prompt = """
+Tu es un routeur intelligent dans un système multi-agents financier.
+Tu dois analyser la question de l'utilisateur et choisir la prochaine étape.
+""" + SCENARIOS + """
 TA RÉPONSE DOIT CONTENIR UNIQUEMENT UN SEUL MOT : "INFO_SIMPLE" ou "ANALYSE_COMPLETE".
 """
         
@@ -47,16 +61,12 @@ TA RÉPONSE DOIT CONTENIR UNIQUEMENT UN SEUL MOT : "INFO_SIMPLE" ou "ANALYSE_COM
         )
 
        
-        decision = response.strip().upper()
+        decision = normalize_route(response)
         
        
-        if "ANALYSE" in decision:
-            decision = "ANALYSE_COMPLETE"
-        elif "INFO" in decision:
-            decision = "INFO_SIMPLE"
-        else:
+        if decision is None:
             
-            print(f"[Planificateur] ⚠️ Réponse ambiguë ('{decision}'). Par défaut -> INFO_SIMPLE")
+            print(f"[Planificateur] ⚠️ Réponse ambiguë ('{response.strip().upper()}'). Par défaut -> INFO_SIMPLE")
             decision = "INFO_SIMPLE"
 
         print(f"[Planificateur] Décision prise : {decision}")
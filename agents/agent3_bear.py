@@ -6,7 +6,7 @@ class BearAgent(Agent):
         super().__init__(
             name="Bear (Pessimiste)",
             description="Analyste financier spécialisé dans la gestion des risques et la vente à découvert (Short).",
-            modelName="mistral-nemo"
+            useCache=True
         )
     
     def run(self) -> str:
@@ -32,6 +32,7 @@ CONSIGNES :
    - Dette élevée ou problèmes de liquidité (Ratio de liquidité < 1).
    - Concurrence féroce, régulation, procès ou mauvaises nouvelles.
    - Ventes d'initiés ou dilution des actions.
+   - Risque de marché : cite les indicateurs calculés du contexte (volatilité, drawdown max, VaR, RSI) sans les recalculer.
 
 FORMAT DE RÉPONSE ATTENDU (Markdown) :
 ## ⚠️ ARGUMENTS CONTRE L'ACHAT (THÈSE BEAR)
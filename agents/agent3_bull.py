@@ -6,7 +6,7 @@ class BullAgent(Agent):
         super().__init__(
             name="Bull (Optimiste)",
             description="Analyste financier spécialisé dans la croissance et les opportunités d'achat.",
-            modelName="mistral-nemo"
+            useCache=True
         )
     
     def run(self) -> str:
@@ -32,6 +32,7 @@ CONSIGNES :
    - Ratios de valorisation attractifs (ex: PEG bas, P/E raisonnable pour la croissance).
    - Actualités positives et catalyseurs futurs (IA, nouveaux produits).
    - Santé financière solide (Cash flow, Trésorerie).
+   - Momentum technique : cite les indicateurs calculés du contexte (MM, RSI, performances) sans les recalculer.
 
 FORMAT DE RÉPONSE ATTENDU (Markdown) :
 ## 🚀 ARGUMENTS POUR L'ACHAT (THÈSE BULL)
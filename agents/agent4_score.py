@@ -1,4 +1,5 @@
 from agents.base_agent import Agent
+from agents.context_budget import ContextBudget, contexte_parts
 from agents.utils import save_to_file
 import json
 import re
@@ -20,11 +21,13 @@ class ScoreAgent(Agent):
         "risques_identifies": 0.10,   
     }
 
+    RESERVE_SORTIE = 700  # Tokens reserves a la reponse JSON dans la fenetre du modele
+
     def __init__(self):
         super().__init__(
             name="Juge (Score)",
             description="Arbitre financier avec systeme de scoring pondere.",
-            modelName="mistral-nemo"
+            useCache=True
         )
 
     def run(self) -> str:
@@ -84,11 +87,13 @@ Chaque critere a un COEFFICIENT D'IMPORTANCE different dans le score final:
    - 0-3: Tendance baissiere, sous les moyennes mobiles
    - 4-6: Neutre, consolidation
    - 7-10: Tendance haussiere, au-dessus des MM
+   - Base-toi sur les indicateurs calcules du contexte (Prix vs MM50/MM200, RSI 14j, performances)
 
 7. RISQUES IDENTIFIES (coef {int(self.COEFFICIENTS['risques_identifies']*100)}%)
    - 0-3: Risques majeurs (fraude, faillite, bulle)
    - 4-6: Risques moderes et geres
    - 7-10: Peu de risques identifies
+   - Tiens compte des indicateurs de risque calcules (volatilite, drawdown max, VaR historique)
 
 === FORMAT DE REPONSE OBLIGATOIRE ===
 
@@ -118,15 +123,22 @@ Tu DOIS repondre avec ce format JSON exact:
 IMPORTANT: Les valeurs X doivent etre des nombres entiers de 0 a 10.
 """
 
+        # Chiffres du contexte gardes en entier ; description, actualites et argumentaires raccourcis si besoin
+        parts = ContextBudget(self.modelName, reserve_output=self.RESERVE_SORTIE).fit(system_prompt, {
+            "contexte": contexte_parts(contexte),
+            "bull": [(avis_bull, 2)],
+            "bear": [(avis_bear, 2)],
+        })
+
         user_content = f"""
 === DONNEES FINANCIERES (CONTEXTE) ===
-{contexte[:3000]}
+{parts["contexte"]}
 
 === ARGUMENTATION BULL (OPTIMISTE) ===
-{avis_bull}
+{parts["bull"]}
 
 === ARGUMENTATION BEAR (PESSIMISTE) ===
-{avis_bear}
+{parts["bear"]}
 
 Analyse ces donnees et attribue une note a chaque critere.
 """
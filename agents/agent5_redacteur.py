@@ -1,8 +1,10 @@
 from agents.base_agent import Agent
+from agents.context_budget import ContextBudget, contexte_parts
 from agents.utils import save_to_file, load_history_from_file
 import json
 import datetime
 import os
+from typing import Callable
 
 class RedacteurAgent(Agent):
     """
@@ -15,14 +17,15 @@ class RedacteurAgent(Agent):
     def __init__(self):
         super().__init__(
             name="Redacteur",
-            description="Expert en redaction de rapports financiers clairs et structures.",
-            modelName="mistral-nemo"
+            description="Expert en redaction de rapports financiers clairs et structures."
         )
 
+    RESERVE_SORTIE = 1500  # Tokens reserves au rapport dans la fenetre du modele
+
     def _get_user_question(self) -> str:
         """Recupere la derniere question de l'utilisateur depuis l'historique du Controlleur."""
         try:
-            history = load_history_from_file("history_Controlleur.json")
+            history = load_history_from_file("history_Controlleur.json", last=2)
           
             for entry in reversed(history):
                 if entry.get("role") == "user":
@@ -47,12 +50,13 @@ class RedacteurAgent(Agent):
         except Exception as e:
             return f"Erreur: {e}"
 
-    def run(self, voie: str = "A") -> str:
+    def run(self, voie: str = "A", onToken: Callable[[str], None] = None) -> str:
         """
         Execute l'agent redacteur.
 
         Args:
             voie: "A" pour investissement (avec Bull/Bear/Score), "B" pour renseignement (contexte seul)
+            onToken: Appelee avec chaque morceau du rapport au fil de la generation (affichage progressif)
         """
         print(f"[Redacteur] Redaction du rapport final (Voie {voie})...")
 
@@ -81,18 +85,23 @@ class RedacteurAgent(Agent):
         
         if voie.upper() == "A":
             system_prompt = self._build_prompt_voie_a()
-            user_content = self._build_content_voie_a(question, contexte, avis_bull, avis_bear, avis_score)
+            user_content = self._build_content_voie_a(question, contexte, avis_bull, avis_bear, avis_score, system_prompt)
         else:
             system_prompt = self._build_prompt_voie_b()
-            user_content = self._build_content_voie_b(question, contexte)
+            user_content = self._build_content_voie_b(question, contexte, system_prompt)
 
         
-        rapport = self.callLlm(
+        chunks = []
+        for chunk in self.streamLlm(
             systemPromptInput=system_prompt,
             userPromptInput=user_content,
             formatJson=False,
             useHistory=False
-        )
+        ):
+            if onToken:
+                onToken(chunk)
+            chunks.append(chunk)
+        rapport = "".join(chunks)
 
       
         current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -149,6 +158,15 @@ class RedacteurAgent(Agent):
         actualites = self._extract_news_section(contexte)
         infos_entreprise = self._extract_company_info(contexte)
 
+        # Ancien rapport puis avis raccourcis selon la place laissee par les corrections et les chiffres
+        parts = ContextBudget(self.modelName, reserve_output=self.RESERVE_SORTIE).fit(
+            "".join([system_prompt, question, corrections, chiffres_cles, infos_entreprise, actualites]), {
+                "ancien_rapport": [(ancien_rapport, 1)],
+                "bull": [(avis_bull, 2)],
+                "bear": [(avis_bear, 2)],
+                "score": [(avis_score, 2)],
+            })
+
         user_content = f"""
 QUESTION ORIGINALE:
 "{question}"
@@ -162,7 +180,7 @@ CORRECTIONS DEMANDEES PAR L'AGENT CRITIQUE
 ============================================================
 ANCIEN RAPPORT A CORRIGER
 ============================================================
-{ancien_rapport[:2000] if ancien_rapport else "Non disponible"}
+{parts["ancien_rapport"] or "Non disponible"}
 
 ============================================================
 DONNEES SOURCES (utiliser ces chiffres EXACTS)
@@ -175,13 +193,13 @@ DONNEES SOURCES (utiliser ces chiffres EXACTS)
 {infos_entreprise}
 
 --- ARGUMENTS BULL ---
-{avis_bull[:800] if avis_bull else "Non disponible"}
+{parts["bull"] or "Non disponible"}
 
 --- ARGUMENTS BEAR ---
-{avis_bear[:800] if avis_bear else "Non disponible"}
+{parts["bear"] or "Non disponible"}
 
 --- SCORING ---
-{avis_score[:800] if avis_score else "Non disponible"}
+{parts["score"] or "Non disponible"}
 
 --- ACTUALITES ---
 {actualites}
@@ -200,7 +218,8 @@ INSTRUCTIONS
             systemPromptInput=system_prompt,
             userPromptInput=user_content,
             formatJson=False,
-            useHistory=False
+            useHistory=False,
+            task="correction"
         )
 
         # 5. Ajouter l'en-tete
@@ -423,8 +442,9 @@ FORMAT OBLIGATOIRE:
 [Resume des news du contexte]
 """
 
-    def _build_content_voie_a(self, question: str, contexte: str, bull: str, bear: str, score: str) -> str:
-        """Construit le contenu utilisateur pour la voie A."""
+    def _build_content_voie_a(self, question: str, contexte: str, bull: str, bear: str, score: str,
+                              system_prompt: str = "") -> str:
+        """Construit le contenu utilisateur pour la voie A (ajuste a la fenetre du modele)."""
   
         chiffres_cles = self._extract_key_numbers(contexte)
       
@@ -432,6 +452,15 @@ FORMAT OBLIGATOIRE:
        
         infos_entreprise = self._extract_company_info(contexte)
 
+        # Chiffres cles envoyes a part : le contexte complet n'est qu'une reference, coupe avant les avis
+        parts = ContextBudget(self.modelName, reserve_output=self.RESERVE_SORTIE).fit(
+            "".join([system_prompt, question, chiffres_cles, infos_entreprise, actualites]), {
+                "bull": [(bull, 1)],
+                "bear": [(bear, 1)],
+                "score": [(score, 1)],
+                "contexte": contexte_parts(contexte, base=2),
+            })
+
         return f"""
 QUESTION A LAQUELLE TU DOIS REPONDRE:
 "{question}"
@@ -451,13 +480,13 @@ ANALYSES DES AGENTS SPECIALISES
 ============================================================
 
 --- THESE BULL (Arguments positifs - Agent Bull) ---
-{bull if bull else "Non disponible"}
+{parts["bull"] or "Non disponible"}
 
 --- THESE BEAR (Risques identifies - Agent Bear) ---
-{bear if bear else "Non disponible"}
+{parts["bear"] or "Non disponible"}
 
 --- SCORING DETAILLE (Agent Score) ---
-{score if score else "Non disponible"}
+{parts["score"] or "Non disponible"}
 
 ============================================================
 ACTUALITES RECENTES
@@ -467,7 +496,7 @@ ACTUALITES RECENTES
 ============================================================
 CONTEXTE COMPLET (pour reference)
 ============================================================
-{contexte[:3000]}
+{parts["contexte"]}
 
 INSTRUCTIONS: Genere un rapport COMPLET et STRUCTURE en utilisant TOUTES les donnees ci-dessus.
 Remplis CHAQUE section du format demande avec les vraies donnees.
@@ -557,13 +586,18 @@ Remplis CHAQUE section du format demande avec les vraies donnees.
 
         return "\n".join(infos) if infos else "Informations entreprise non trouvees"
 
-    def _build_content_voie_b(self, question: str, contexte: str) -> str:
-        """Construit le contenu utilisateur pour la voie B."""
+    def _build_content_voie_b(self, question: str, contexte: str, system_prompt: str = "") -> str:
+        """Construit le contenu utilisateur pour la voie B (ajuste a la fenetre du modele)."""
        
         chiffres_cles = self._extract_key_numbers(contexte)
        
         actualites = self._extract_news_section(contexte)
 
+        parts = ContextBudget(self.modelName, reserve_output=self.RESERVE_SORTIE).fit(
+            "".join([system_prompt, question, chiffres_cles, actualites]), {
+                "contexte": contexte_parts(contexte),
+            })
+
         return f"""
 QUESTION A LAQUELLE TU DOIS REPONDRE:
 "{question}"
@@ -575,7 +609,7 @@ QUESTION A LAQUELLE TU DOIS REPONDRE:
 {actualites}
 
 === CONTEXTE COMPLET (informations entreprise) ===
-{contexte[:2500]}
+{parts["contexte"]}
 
 RAPPEL IMPORTANT: Utilise UNIQUEMENT les chiffres ci-dessus. Ne jamais inventer de chiffres.
 """
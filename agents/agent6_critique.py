@@ -1,5 +1,7 @@
 from agents.base_agent import Agent
 from agents.utils import save_to_file, load_history_from_file
+from agents.registry import get_agent
+from agents.context_budget import ContextBudget, contexte_parts
 import json
 import datetime
 import os
@@ -33,6 +35,8 @@ class CritiqueAgent(Agent):
   
     SEUIL_VALIDATION = 50
 
+    RESERVE_SORTIE = 600  # Tokens reserves a l'evaluation JSON dans la fenetre du modele
+
     
     SECTIONS_OBLIGATOIRES = [
         "REPONSE DIRECTE",
@@ -46,8 +50,7 @@ class CritiqueAgent(Agent):
     def __init__(self):
         super().__init__(
             name="Critique",
-            description="Expert en evaluation et controle qualite des rapports financiers.",
-            modelName="mistral-nemo"
+            description="Expert en evaluation et controle qualite des rapports financiers."
         )
         self.corrections_history = []
 
@@ -162,11 +165,17 @@ REPONSE JSON OBLIGATOIRE:
 SOIS STRICT: Un bon rapport doit avoir des arguments solides avec des chiffres, pas juste des generalites.
 """
 
+        # Chiffres du contexte gardes en entier pour la verification ; texte libre coupe en premier
+        parts = ContextBudget(self.modelName, reserve_output=self.RESERVE_SORTIE).fit(system_prompt, {
+            "rapport": [(rapport, 1)],
+            "contexte": contexte_parts(contexte),
+        })
+
         user_prompt = f"""RAPPORT A EVALUER:
-{rapport[:3000]}
+{parts["rapport"]}
 
 CONTEXTE SOURCE (pour verification):
-{contexte[:1500]}
+{parts["contexte"]}
 
 Evalue ce rapport de maniere STRICTE."""
 
@@ -354,7 +363,7 @@ Verdict: {"VALIDE" if score_global >= self.SEUIL_VALIDATION else "A CORRIGER"}
 
                   
                     from agents.agent5_redacteur import RedacteurAgent
-                    redacteur = RedacteurAgent()
+                    redacteur = get_agent(RedacteurAgent)  # Meme instance que main.py
                     rapport = redacteur.run_with_corrections(corrections_content)
 
                     print(f"[Critique] Nouveau rapport recu, re-evaluation...")
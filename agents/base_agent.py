@@ -1,48 +1,266 @@
-from langchain_ollama import ChatOllama
 from langchain.messages import HumanMessage
 from langchain_core.messages import SystemMessage
 from langchain.messages import AIMessage
 from agents.utils import *
+from agents.context_budget import DEFAULT_RESERVE_OUTPUT, estimate_tokens, observe
+from agents.llm_cache import cache_key, get_llm_cache, message_pairs
+from agents.memory import MEMORY_SUMMARY, BoundedMemory, Turn
+from agents.metrics import get_collector, llm_usage
+from agents.registry import get_model
+from agents.routing import get_router
+from typing import AsyncIterator, Callable, Dict, Generator, Iterator, List, Optional
+import asyncio
+import functools
+import threading
+import time
 
-import yfinance as yf
 
 
+def record_first_token(agent_name: str, start: float) -> float:
+    """Temps avant le premier token (depuis start), impute a agent_name dans les metriques."""
+    seconds = round(time.perf_counter() - start, 3)
+    get_collector().record_first_token(seconds, agent_name)
+    return seconds
+
+
+def record_llm_call(agent_name: str, model_name: str, metadata: dict) -> Dict:
+    """Compteurs Ollama d'un appel (dernier morceau du flux), imputes a agent_name ; retourne l'usage."""
+    usage = llm_usage(metadata)
+    get_collector().record_llm_call({**usage, "model": model_name}, agent_name)
+    return usage
+
+
+class _Completion:
+    """
+    Etapes communes a stream_completion et astream_completion, autour du flux du modele :
+    consultation du cache, premier token, compteurs Ollama, mise en cache de la reponse.
+    """
+
+    def __init__(self, agent_name: str, model_name: str, messages: list, format_json: bool, cache,
+                 on_first_token: Optional[Callable[[float], None]], on_usage: Optional[Callable[[Dict, float], None]]):
+        self.agent_name = agent_name
+        self.model_name = model_name
+        self.cache = cache
+        self.on_first_token = on_first_token
+        self.on_usage = on_usage
+        self.start = time.perf_counter()
+        self.key = cache_key(model_name, messages, "json" if format_json else None) if cache is not None else None
+        self.chunks = []
+        self.metadata = {}
+
+    def _first_token(self):
+        seconds = record_first_token(self.agent_name, self.start)
+        if self.on_first_token is not None:
+            self.on_first_token(seconds)
+
+    def lookup(self) -> Optional[str]:
+        """Reponse en cache (comptee comme premier token), ou None."""
+        content = self.cache.get(self.key) if self.cache is not None else None
+        if content is not None:
+            self._first_token()
+        return content
+
+    def feed(self, chunk) -> Optional[str]:
+        """Integre un morceau du flux ; retourne son texte, ou None pour un morceau vide."""
+        # Le dernier morceau (vide) porte les compteurs Ollama
+        self.metadata.update(getattr(chunk, "response_metadata", None) or {})
+        if not chunk.content:
+            return None
+        if not self.chunks:
+            self._first_token()
+        self.chunks.append(chunk.content)
+        return chunk.content
+
+    def finish(self) -> str:
+        """Reponse complete ; enregistre les compteurs Ollama de l'appel."""
+        usage = record_llm_call(self.agent_name, self.model_name, self.metadata)
+        if self.on_usage is not None:
+            self.on_usage(usage, self.start)
+        return "".join(self.chunks)
+
+    def store(self, content: str):
+        if self.cache is not None:
+            self.cache.put(self.key, content, self.model_name, self.agent_name)
+
+
+def stream_completion(agent_name: str, model_name: str, messages: list, format_json: bool = False, cache=None,
+                      on_first_token: Optional[Callable[[float], None]] = None,
+                      on_usage: Optional[Callable[[Dict, float], None]] = None) -> Generator[str, None, str]:
+    """
+    Appel LLM en flux commun a Agent et MonoAgent : reponse servie par le cache si presente,
+    sinon generation morceau par morceau, mise en cache une fois entierement lue.
+    Le temps avant le premier token et les compteurs Ollama vont dans les metriques de agent_name ;
+    on_first_token(secondes) et on_usage(usage, debut) permettent a l'appelant de les reprendre.
+    Retourne la reponse complete : content = yield from stream_completion(...)
+    """
+    completion = _Completion(agent_name, model_name, messages, format_json, cache, on_first_token, on_usage)
+    content = completion.lookup()
+    if content is not None:
+        yield content
+        return content
+
+    for chunk in get_model(model_name, formatJson=format_json).stream(messages):
+        text = completion.feed(chunk)
+        if text:
+            yield text
+    content = completion.finish()
+    completion.store(content)
+    return content
+
+
+async def astream_completion(agent_name: str, model_name: str, messages: list, format_json: bool = False,
+                             cache=None, on_first_token: Optional[Callable[[float], None]] = None,
+                             on_usage: Optional[Callable[[Dict, float], None]] = None) -> AsyncIterator[str]:
+    """
+    Version asynchrone de stream_completion (model.astream) ; les acces au cache passent par un thread.
+    Un generateur asynchrone ne retourne pas de valeur : la reponse complete est la concatenation
+    des morceaux produits.
+    """
+    completion = _Completion(agent_name, model_name, messages, format_json, cache, on_first_token, on_usage)
+    content = await asyncio.to_thread(completion.lookup) if cache is not None else None
+    if content is not None:
+        yield content
+        return
+
+    async for chunk in get_model(model_name, formatJson=format_json).astream(messages):
+        text = completion.feed(chunk)
+        if text:
+            yield text
+    content = completion.finish()
+    if cache is not None:
+        await asyncio.to_thread(completion.store, content)
+
 
 class Agent:
-    def __init__(self, name : str, description : str, modelName : str):
+    def __init__(self, name : str, description : str, modelName : str = None, useCache : bool = False,
+                 memoryTokens : int = None):
         self.name=name
         self.description=description
-        self.model=ChatOllama(model=modelName)
+        # Sans modelName, chaque appel est route (agents.routing) ; modelName = modele prefere
+        self.routed=modelName is None
+        self.modelName=modelName or get_router().default_model(name)
+        self.model=get_model(self.modelName)  # Client partage par tous les agents du meme modele
+        self.useCache=useCache  # Appels eligibles a agents.llm_cache (actif seulement avec LLM_CACHE=1)
+        self.lastTimeToFirstToken=None  # Secondes avant le premier token du dernier appel
         self.conversation_history = load_history_from_file(f"history_{self.name}.json")
+        self._historyLock = threading.Lock()  # Appels concurrents (threads ou coroutines)
+        # Historique envoye au modele borne a memoryTokens (resume + derniers echanges) ; None = complet
+        self.memory = BoundedMemory(self.modelName, memoryTokens,
+                                    self._summarizeTurns if MEMORY_SUMMARY == "llm" else None) if memoryTokens else None
        
 
     
     def add_history(self, role : str, content : str):
-        self.conversation_history.append({"role": role, "content": content})
+        with self._historyLock:
+            self.conversation_history.append({"role": role, "content": content})
+
+    def _commitHistory(self, userContent: str, assistantContent: str):
+        """Ajoute l'echange question / reponse d'un seul bloc, en memoire et a la fin du journal."""
+        exchange = [{"role": "user", "content": userContent}, {"role": "assistant", "content": assistantContent}]
+        with self._historyLock:
+            self.conversation_history.extend(exchange)
+            append_history_to_file(exchange, f"history_{self.name}.json")
 
     
 
-    def callLlm(self, systemPromptInput: str, userPromptInput: str, formatJson: bool = False, useHistory: bool = True) -> str:
+    def callLlm(self, systemPromptInput: str, userPromptInput: str, formatJson: bool = False, useHistory: bool = True,
+                useCache: bool = None, task: str = None) -> str:
+        return "".join(self.streamLlm(systemPromptInput, userPromptInput, formatJson, useHistory, useCache, task))
+
+    def streamLlm(self, systemPromptInput: str, userPromptInput: str, formatJson: bool = False, useHistory: bool = True,
+                  useCache: bool = None, task: str = None) -> Iterator[str]:
+        """
+        Comme callLlm, mais produit la reponse morceau par morceau au fil de la generation.
+        Le temps avant le premier token est enregistre pour cet agent (metriques).
+        L'historique et le cache ne sont mis a jour qu'une fois la reponse entierement lue.
+        task : route de l'appel ("Agent:tache" dans agents.routing), sinon celle de l'agent.
+        """
+        modelName, messages, cache = self._prepareCall(systemPromptInput, userPromptInput, formatJson,
+                                                       useHistory, useCache, task)
+
+        content = yield from stream_completion(self.name, modelName, messages, formatJson, cache,
+                                               self._setFirstToken,
+                                               functools.partial(self._trackCall, modelName, task, messages))
+
+      
+        if useHistory:
+            self._commitHistory(userPromptInput, content)
+
+    async def acallLlm(self, systemPromptInput: str, userPromptInput: str, formatJson: bool = False,
+                       useHistory: bool = True, useCache: bool = None, task: str = None) -> str:
+        """
+        Version asynchrone de callLlm (API async du modele) : plusieurs agents
+        independants peuvent tourner comme coroutines dans une meme boucle.
+            bull_avis, bear_avis = await asyncio.gather(bull.acallLlm(...), bear.acallLlm(...))
+        """
+        chunks = [chunk async for chunk in self.astreamLlm(systemPromptInput, userPromptInput, formatJson,
+                                                              useHistory, useCache, task)]
+        return "".join(chunks)
+
+    async def astreamLlm(self, systemPromptInput: str, userPromptInput: str, formatJson: bool = False,
+                         useHistory: bool = True, useCache: bool = None, task: str = None) -> AsyncIterator[str]:
+        """Version asynchrone de streamLlm ; les acces disque (cache, historique) passent par un thread."""
+        modelName, messages, cache = await asyncio.to_thread(
+            self._prepareCall, systemPromptInput, userPromptInput, formatJson, useHistory, useCache, task)
+
+        chunks = []
+        async for chunk in astream_completion(self.name, modelName, messages, formatJson, cache, self._setFirstToken,
+                                              functools.partial(self._trackCall, modelName, task, messages)):
+            chunks.append(chunk)
+            yield chunk
+
+        if useHistory:
+            await asyncio.to_thread(self._commitHistory, userPromptInput, "".join(chunks))
+
+    def _prepareCall(self, systemPromptInput: str, userPromptInput: str, formatJson: bool, useHistory: bool,
+                     useCache: bool, task: str = None):
+        """Modele route, messages de la requete (copie de l'historique a cet instant) et cache a utiliser (ou None)."""
         systemPrompt = SystemMessage(content=f"Tu es {self.name}. Ton role est {self.description}. {systemPromptInput}")
         userPrompt = HumanMessage(content=userPromptInput)
 
 
         if useHistory:
-            messages = [systemPrompt] + self.conversation_history + [userPrompt]
+            with self._historyLock:
+                history = list(self.conversation_history)
+            if self.memory is not None:
+                history, historyTokens = self.memory.window(history)
+            else:
+                historyTokens = sum(estimate_tokens(m["content"], self.modelName) for m in history)
+            get_collector().record_history(historyTokens, self.name)
+            messages = [systemPrompt] + history + [userPrompt]
         else:
             messages = [systemPrompt, userPrompt]
 
-       
-        if formatJson:
-            response = self.model.bind(format="json").invoke(messages)
-        else:
-            response = self.model.invoke(messages)
+        modelName = self.modelName
+        if self.routed:
+            promptTokens = estimate_tokens("".join(content for _, content in message_pairs(messages)), self.modelName)
+            # Le prompt a ete ajuste a la fenetre du modele prefere : le modele choisi doit aussi garder la place de la reponse
+            modelName = get_router().choose(self.name, task, promptTokens,
+                                            getattr(self, "RESERVE_SORTIE", DEFAULT_RESERVE_OUTPUT))
 
-      
-        if useHistory:
-            self.add_history("user", userPrompt.content)
-            self.add_history("assistant", response.content)
-            save_history_to_file(self.conversation_history, f"history_{self.name}.json")
+        # useCache=None : reglage de l'agent
+        cache = get_llm_cache() if (self.useCache if useCache is None else useCache) else None
+        return modelName, messages, cache
+
+    def _summarizeTurns(self, summary: str, turns: List[Turn]) -> str:
+        """Resume glissant des echanges sortis de la fenetre (MEMORY_SUMMARY=llm)."""
+        echanges = "\n".join(f"Utilisateur : {question}\nReponse : {answer}" for question, answer in turns)
+        return self.callLlm(
+            "Resume ces echanges en quelques lignes courtes (demandes, entreprises, tickers, decisions). "
+            "Reponds uniquement par le resume.",
+            f"Resume actuel :\n{summary or 'Aucun'}\n\nNouveaux echanges :\n{echanges}",
+            useHistory=False,
+            useCache=True
+        )
+
+    def _trackCall(self, modelName: str, task: str, messages: list, usage: Dict, start: float):
+        """
+        Compteurs Ollama de l'appel (deja dans les metriques) : latences du routeur, et nombre reel
+        de tokens du prompt pour recaler le budget de contexte.
+        """
+        get_router().record(self.name, task, modelName, usage, time.perf_counter() - start)
+        observe(modelName, sum(len(content) for _, content in message_pairs(messages)), usage["prompt_tokens"])
 
-        return response.content
+    def _setFirstToken(self, seconds: float):
+        self.lastTimeToFirstToken = seconds
     
\ No newline at end of file
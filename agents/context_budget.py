@@ -0,0 +1,147 @@
+"""
+Budget de tokens des prompts : chaque prompt est ajuste a la fenetre de contexte
+du modele, au lieu de coupes fixes en caracteres (contexte[:3000], avis[:800]...).
+
+- Les tokens sont estimes a partir du nombre de caracteres ; le ratio est recale
+  sur les prompt_eval_count reellement renvoyes par Ollama (observe()).
+- Un prompt = des sections, chacune decoupee en parties de priorite differente.
+  Priorite 0 : jamais coupee (chiffres cles du contexte : prix, capitalisation,
+  ratios... verifies ensuite par le Critique). Au-dela, les parties de plus grande
+  priorite sont raccourcies (fin de texte) puis supprimees en premier.
+
+Usage:
+    budget = ContextBudget("mistral-nemo", reserve_output=1500)
+    parts = budget.fit(system_prompt, {
+        "contexte": contexte_parts(contexte),
+        "bull": [(avis_bull, 2)],
+    })
+    parts["contexte"], parts["bull"]
+"""
+
+import re
+import threading
+from typing import Dict, List, Tuple
+
+
+# Fenetre de contexte par modele, passee a Ollama (num_ctx) par agents.registry :
+# au-dela, Ollama tronque silencieusement le debut du prompt.
+CONTEXT_WINDOWS = {
+    "mistral-nemo": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 4096  # num_ctx par defaut d'Ollama
+CHARS_PER_TOKEN = 3.2          # Estimation initiale (francais + markdown), recalee par observe()
+CALIBRATION_WEIGHT = 0.2       # Poids d'une nouvelle observation dans la moyenne glissante
+TEMPLATE_MARGIN = 150          # Tokens du gabarit de prompt hors sections (titres, consignes)
+DEFAULT_RESERVE_OUTPUT = 1024  # Tokens reserves a la reponse quand l'agent ne precise pas RESERVE_SORTIE
+MIN_PART_TOKENS = 40           # En dessous, une partie raccourcie est supprimee
+TRUNCATION_MARK = "[...]"
+
+# Sous-sections du contexte (titres ## / ###) -> priorite (0 = jamais coupee)
+CONTEXTE_PRIORITIES = (
+    ("LIENS", 4),
+    ("DESCRIPTION", 3),
+    ("ACTUALITES", 2),
+    ("INDICATEURS", 1),
+)
+
+_ratios: Dict[str, float] = {}
+_ratios_lock = threading.Lock()
+
+
+def context_window(model: str) -> int:
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def estimate_tokens(text: str, model: str = None) -> int:
+    if not text:
+        return 0
+    with _ratios_lock:
+        ratio = _ratios.get(model, CHARS_PER_TOKEN)
+    return int(len(text) / ratio) + 1
+
+
+def observe(model: str, prompt_chars: int, prompt_tokens: int):
+    """Recale le ratio caracteres / token du modele sur un prompt_eval_count reel."""
+    if prompt_chars <= 0 or prompt_tokens <= 0:
+        return
+    with _ratios_lock:
+        current = _ratios.get(model, CHARS_PER_TOKEN)
+        _ratios[model] = current + CALIBRATION_WEIGHT * (prompt_chars / prompt_tokens - current)
+
+
+def shorten(text: str, tokens: int, model: str = None) -> str:
+    """Garde le debut du texte (lignes entieres si possible) dans la limite de `tokens`."""
+    if estimate_tokens(text, model) <= tokens:
+        return text
+    with _ratios_lock:
+        ratio = _ratios.get(model, CHARS_PER_TOKEN)
+    max_chars = max(0, int(tokens * ratio) - len(TRUNCATION_MARK) - 1)
+    cut = text[:max_chars]
+    if "\n" in cut:
+        cut = cut[:cut.rfind("\n")]
+    return f"{cut.rstrip()}\n{TRUNCATION_MARK}"
+
+
+def contexte_parts(contexte: str, base: int = 0) -> List[Tuple[str, int]]:
+    """
+    Decoupe contexte.txt en sous-sections (## / ###), chacune avec sa priorite.
+    base > 0 quand le contexte n'est qu'une copie de reference (chiffres cles deja envoyes a part).
+    """
+    if not contexte:
+        return []
+    chunks = re.split(r"(?m)^(?=#{2,3} )", contexte)
+    parts = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        title = chunk.split("\n", 1)[0].upper()
+        # Titres accentues ou non selon les sections
+        title = title.replace("É", "E").replace("È", "E")
+        priority = next((p for keyword, p in CONTEXTE_PRIORITIES if keyword in title), 0)
+        parts.append((chunk, priority + base))
+    return parts
+
+
+class ContextBudget:
+    """Ajuste les sections d'un prompt a la fenetre du modele, moins la reserve de sortie."""
+
+    def __init__(self, model: str, reserve_output: int = DEFAULT_RESERVE_OUTPUT, window: int = None):
+        self.model = model
+        self.window = window or context_window(model)
+        self.reserve_output = reserve_output
+
+    def available(self, fixed: str = "") -> int:
+        """Tokens disponibles pour les sections, une fois le texte fixe et la sortie reserves."""
+        return self.window - self.reserve_output - TEMPLATE_MARGIN - estimate_tokens(fixed, self.model)
+
+    def fit(self, fixed: str, sections: Dict[str, List[Tuple[str, int]]]) -> Dict[str, str]:
+        """
+        fixed : texte envoye tel quel (prompt systeme, question, chiffres cles...).
+        sections : nom -> parties (texte, priorite) dans l'ordre.
+        Retourne nom -> texte ajuste (parties recollees).
+        """
+        parts = [[name, text or "", priority, estimate_tokens(text, self.model)]
+                 for name, section in sections.items() for text, priority in section]
+        budget = self.available(fixed)
+        excess = sum(part[3] for part in parts) - budget
+
+        # Priorite la plus haute d'abord ; a priorite egale, la fin du prompt d'abord
+        candidates = [i for i, part in enumerate(parts) if part[2] > 0]
+        for i in sorted(candidates, key=lambda i: (-parts[i][2], -i)):
+            if excess <= 0:
+                break
+            part = parts[i]
+            keep = part[3] - excess
+            part[1] = shorten(part[1], keep, self.model) if keep >= MIN_PART_TOKENS else ""
+            new_tokens = estimate_tokens(part[1], self.model)
+            excess -= part[3] - new_tokens
+            part[3] = new_tokens
+
+        if excess > 0:
+            print(f"[Budget] Prompt au-dela de la fenetre de {self.model} ({excess} tokens), parties essentielles conservees")
+
+        fitted = {name: [] for name in sections}
+        for name, text, _, _ in parts:
+            if text:
+                fitted[name].append(text)
+        return {name: "".join(texts) for name, texts in fitted.items()}
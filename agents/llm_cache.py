@@ -0,0 +1,155 @@
+"""
+Cache persistant des reponses LLM, adresse par le contenu de la requete.
+
+La cle est le SHA-256 de (modele, messages, format) : un meme prompt sur un meme
+contexte (ex : Bull / Bear / Score relances sur un contexte.txt inchange) est servi
+sans appeler Ollama. Desactive par defaut, car une reponse servie du cache est
+figee : on perd la variabilite de l'echantillonnage. LLM_CACHE=1 l'active pour
+l'execution, et seulement pour les appels marques useCache=True.
+
+- Une reponse = un fichier <cle>.json ; la date de modification sert d'horloge LRU.
+- Eviction des entrees les moins recemment utilisees au-dela de MAX_ENTRIES ou MAX_BYTES.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+LLM_CACHE_DIR = os.path.join("data", "cache", "llm")
+MAX_ENTRIES = 2000
+MAX_BYTES = 50 * 1024 * 1024        # Taille max du cache sur disque
+
+
+def message_pairs(messages: list) -> List[Tuple[str, str]]:
+    """Messages langchain ou dicts {"role", "content"} (historique) -> paires (role, contenu)."""
+    return [(m["role"], m["content"]) if isinstance(m, dict) else (m.type, m.content) for m in messages]
+
+
+def cache_key(model: str, messages: list, format: Optional[str] = None) -> str:
+    """Cle de la requete : modele, messages dans l'ordre et format de sortie."""
+    payload = json.dumps({"model": model, "messages": message_pairs(messages), "format": format},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Cache disque des reponses LLM, avec eviction LRU par nombre d'entrees et par taille."""
+
+    def __init__(self, folder: str = LLM_CACHE_DIR, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._index = self._scan()  # cle -> (dernier acces, taille)
+
+    # === Fichiers ===
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        if not os.path.isdir(self.folder):
+            return {}
+        index = {}
+        for filename in os.listdir(self.folder):
+            if filename.endswith(".json"):
+                stat = os.stat(os.path.join(self.folder, filename))
+                index[filename[:-5]] = (stat.st_mtime, stat.st_size)
+        return index
+
+    def _evict(self):
+        """Supprime les entrees les moins recemment utilisees (sous self._lock)."""
+        total_bytes = sum(size for _, size in self._index.values())
+        for key, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if len(self._index) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            total_bytes -= size
+            self._stats["evictions"] += 1
+
+    # === API ===
+
+    def get(self, key: str) -> Optional[str]:
+        """Reponse stockee pour cette cle, ou None. Un hit rafraichit la date LRU."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                response = json.load(f)["response"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        now = time.time()
+        try:
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._stats["hits"] += 1
+            if key in self._index:
+                self._index[key] = (now, self._index[key][1])
+        return response
+
+    def put(self, key: str, response: str, model: str = "", agent: str = ""):
+        """Stocke une reponse (ecriture atomique via un fichier temporaire unique), puis evince si besoin."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "model": model, "agent": agent, "created_at": time.time(),
+                           "response": response}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._index[key] = (time.time(), os.path.getsize(path))
+            self._stats["stores"] += 1
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._index.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs : hits, misses, ecritures, evictions, taux de hit (%), taille du cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._index)
+            stats["bytes"] = sum(size for _, size in self._index.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups * 100, 1) if lookups else 0.0
+        return stats
+
+
+# Instance globale pour faciliter l'utilisation
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Retourne le cache global, ou None si le cache n'est pas active (LLM_CACHE=1)."""
+    global _llm_cache
+    if os.environ.get("LLM_CACHE", "0").strip() != "1":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
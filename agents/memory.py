@@ -0,0 +1,113 @@
+"""
+Memoire de conversation bornee pour les agents qui envoient leur historique (useHistory=True).
+
+L'historique complet reste sur disque (logs/history_<agent>.jsonl, relu par le Redacteur),
+mais seul un extrait borne est envoye au modele :
+- une fenetre glissante des derniers echanges, tels quels ;
+- un resume des echanges plus anciens, mis a jour au fil de l'eau (extractif par
+  defaut, ou par le LLM avec MEMORY_SUMMARY=llm).
+
+Usage:
+    memory = BoundedMemory("mistral", max_tokens=800)
+    messages, tokens = memory.window(agent.conversation_history)
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agents.context_budget import estimate_tokens, shorten
+
+
+MEMORY_MAX_TOKENS = int(os.environ.get("MEMORY_MAX_TOKENS", "800"))  # Plafond de l'historique envoye
+MEMORY_SUMMARY = os.environ.get("MEMORY_SUMMARY", "extractive")      # "extractive" ou "llm"
+MIN_RECENT_TURNS = 2        # Derniers echanges toujours envoyes tels quels
+SUMMARY_SHARE = 0.3         # Part max du plafond reservee au resume des anciens echanges
+SUMMARY_LINE_CHARS = 90     # Longueur max de la question et de la reponse dans une ligne de resume
+SUMMARY_HEADER = "Resume des echanges precedents :"
+
+Turn = Tuple[str, str]
+
+
+def history_turns(history: List[Dict]) -> List[Turn]:
+    """Historique {"role", "content"} -> echanges (question, reponse) dans l'ordre."""
+    turns, question = [], None
+    for message in history:
+        if message.get("role") == "user":
+            question = message.get("content", "")
+        elif message.get("role") == "assistant" and question is not None:
+            turns.append((question, message.get("content", "")))
+            question = None
+    return turns
+
+
+def turn_messages(turns: List[Turn]) -> List[Dict]:
+    return [message for question, answer in turns
+            for message in ({"role": "user", "content": question}, {"role": "assistant", "content": answer})]
+
+
+def _compact(text: str) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    return text if len(text) <= SUMMARY_LINE_CHARS else text[:SUMMARY_LINE_CHARS - 3] + "..."
+
+
+def extractive_summary(turns: List[Turn]) -> List[str]:
+    """Une ligne par echange : debut de la question -> debut de la reponse."""
+    return [f"- {_compact(question)} -> {_compact(answer)}" for question, answer in turns]
+
+
+class BoundedMemory:
+    """Extrait borne (resume + derniers echanges) de l'historique d'un agent."""
+
+    def __init__(self, model: str, max_tokens: int = None,
+                 summarizer: Optional[Callable[[str, List[Turn]], str]] = None):
+        """
+        summarizer(resume_precedent, nouveaux_echanges) -> nouveau resume ; None = resume extractif.
+        """
+        self.model = model
+        self.max_tokens = max_tokens or MEMORY_MAX_TOKENS
+        self.summarizer = summarizer
+        self._folded = 0                   # Nombre d'echanges deja integres au resume
+        self._summary_lines: List[str] = []
+        self._summary = ""
+        self._lock = threading.Lock()
+
+    def window(self, history: List[Dict]) -> Tuple[List[Dict], int]:
+        """Messages a envoyer (resume eventuel + derniers echanges) et leur taille estimee en tokens."""
+        turns = history_turns(history)
+        summary_budget = int(self.max_tokens * SUMMARY_SHARE)
+
+        with self._lock:
+            if self._folded > len(turns):  # Historique remplace (rechargement, purge)
+                self._folded, self._summary_lines, self._summary = 0, [], ""
+
+            # Fenetre glissante : les echanges les plus recents qui tiennent dans le plafond
+            start, used = len(turns), 0
+            while start > self._folded:
+                size = estimate_tokens(turns[start - 1][0] + turns[start - 1][1], self.model)
+                if len(turns) - start >= MIN_RECENT_TURNS and used + size > self.max_tokens - summary_budget:
+                    break
+                start -= 1
+                used += size
+
+            # Les echanges sortis de la fenetre rejoignent le resume (jamais l'inverse)
+            if start > self._folded:
+                self._fold(turns[self._folded:start], summary_budget)
+                self._folded = start
+
+            messages = turn_messages(turns[start:])
+            if self._summary:
+                messages.insert(0, {"role": "system", "content": f"{SUMMARY_HEADER}\n{self._summary}"})
+        return messages, sum(estimate_tokens(m["content"], self.model) for m in messages)
+
+    def _fold(self, turns: List[Turn], budget: int):
+        """Integre des echanges au resume, borne a `budget` tokens (sous self._lock)."""
+        if self.summarizer is not None:
+            self._summary = shorten(self.summarizer(self._summary, turns), budget, self.model)
+            return
+        self._summary_lines.extend(extractive_summary(turns))
+        # Les lignes les plus anciennes sortent en premier
+        while len(self._summary_lines) > 1 and estimate_tokens("\n".join(self._summary_lines), self.model) > budget:
+            self._summary_lines.pop(0)
+        self._summary = "\n".join(self._summary_lines)
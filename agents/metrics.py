@@ -19,6 +19,17 @@ class AgentMetrics:
     llm_calls: int = 0
     success: bool = True
     error_message: Optional[str] = None
+    time_to_first_token: Optional[float] = None  # Premier appel LLM de l'agent (secondes)
+
+    # Comptes exacts renvoyés par Ollama, cumulés sur les appels de l'agent (durées en secondes)
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    load_time: float = 0.0
+    prompt_eval_time: float = 0.0
+    eval_time: float = 0.0
+    tokens_per_second: Optional[float] = None  # output_tokens / eval_time
+    history_tokens: int = 0  # Historique de conversation envoyé (estimation, après bornage de la mémoire)
+    models: List[str] = field(default_factory=list)  # Modèles utilisés (choisis par agents.routing)
 
 
 @dataclass
@@ -44,6 +55,9 @@ class AnalysisMetrics:
     ticker_validated_by_user: bool = True
     ticker_extraction_correct: bool = True
 
+    # Accueil de la question : "single" (un appel) ou "double" (Contrôleur puis Planificateur)
+    intake_mode: str = ""
+
     # Métriques de qualité du rapport
     voie_choisie: str = ""  # "ANALYSE_COMPLETE" ou "INFO_SIMPLE"
     rapport_genere: bool = False
@@ -54,6 +68,42 @@ class AnalysisMetrics:
     score_final: float = 0.0
     recommandation: str = ""
 
+    # Durées des sous-requêtes Yahoo / scrapes d'articles (secondes)
+    fetch_timings: Dict = field(default_factory=dict)
+
+    # Cache des réponses LLM pendant l'analyse (hits, misses, taux de hit)
+    llm_cache: Dict = field(default_factory=dict)
+
+    # Préchargements terminés avant l'analyse : modèle -> {"load_time", "total_time"} (secondes)
+    model_loads: Dict = field(default_factory=dict)
+
+
+USAGE_FIELDS = ("prompt_tokens", "output_tokens", "load_time", "prompt_eval_time", "eval_time")
+CRITICAL_LOAD_TIME = 1.0  # Au-delà (secondes), un appel d'agent a payé le chargement du modèle
+
+
+def llm_usage(metadata: Dict) -> Dict:
+    """
+    Compteurs d'un appel a partir des response_metadata d'Ollama (dernier morceau du flux) :
+    prompt_eval_count, eval_count et durees load / prompt_eval / eval en nanosecondes.
+    """
+    seconds = lambda name: round((metadata.get(name) or 0) / 1e9, 3)
+    return {
+        "prompt_tokens": metadata.get("prompt_eval_count") or 0,
+        "output_tokens": metadata.get("eval_count") or 0,
+        "load_time": seconds("load_duration"),
+        "prompt_eval_time": seconds("prompt_eval_duration"),
+        "eval_time": seconds("eval_duration"),
+    }
+
+
+def _llm_cache_counters() -> Dict:
+    """Compteurs du cache LLM global (zeros si desactive)."""
+    from agents.llm_cache import get_llm_cache
+
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else {"hits": 0, "misses": 0}
+
 
 class MetricsCollector:
     """
@@ -68,6 +118,9 @@ class MetricsCollector:
         # ... exécution de l'agent ...
         collector.end_agent("Chercheur", success=True)
 
+        # Nom de métrique différent du nom de l'agent LLM (Agent.name)
+        collector.start_agent("Bull", "Bull (Optimiste)")
+
         # À la fin
         collector.end_analysis()
         collector.save_to_file()
@@ -77,6 +130,13 @@ class MetricsCollector:
         self.current_analysis: Optional[AnalysisMetrics] = None
         self._agent_start_times: Dict[str, float] = {}
         self._analysis_start_time: float = 0.0
+        self._llm_cache_start: Dict = {"hits": 0, "misses": 0}
+        self._current_agent: Optional[str] = None  # Dernier agent démarré encore en cours
+        self._running: Dict[str, str] = {}  # Agent LLM (Agent.name) -> agent en cours auquel imputer ses appels
+        self._first_tokens: Dict[str, float] = {}
+        self._usage: Dict[str, Dict] = {}
+        self._pending_agents: List[Dict] = []  # Agents terminés hors analyse (ex : Controleur), rattachés à la suivante
+        self._model_loads: Dict[str, Dict] = {}  # Préchargements (warm-up), rattachés à l'analyse suivante
         self.history: List[AnalysisMetrics] = []
         self._load_history()
 
@@ -104,14 +164,67 @@ class MetricsCollector:
             timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             mode=mode,
             ticker=ticker,
-            question=question[:100]  # Tronquer si trop long
+            question=question[:100],  # Tronquer si trop long
+            agents_metrics=self._pending_agents,
+            model_loads=self._model_loads
         )
+        self._pending_agents = []
+        self._model_loads = {}
         self._analysis_start_time = time.time()
         self._agent_start_times = {}
+        self._running = {}
+        self._current_agent = None
+        self._first_tokens = {}
+        self._usage = {}
+        self._llm_cache_start = _llm_cache_counters()
 
-    def start_agent(self, agent_name: str):
-        """Marque le début de l'exécution d'un agent."""
+    def start_agent(self, agent_name: str, llm_agent: str = None):
+        """
+        Marque le début de l'exécution d'un agent.
+        llm_agent : nom de l'agent LLM (Agent.name) dont les appels sont imputés à cette entrée, si différent.
+        """
         self._agent_start_times[agent_name] = time.time()
+        self._running[llm_agent or agent_name] = agent_name
+        self._current_agent = agent_name
+        self._first_tokens.pop(agent_name, None)
+        self._usage.pop(agent_name, None)
+
+    def _charged_agent(self, llm_agent: Optional[str]) -> Optional[str]:
+        """
+        Entrée à laquelle imputer un appel de llm_agent : la sienne s'il est en cours (agents
+        concurrents, ex : asyncio.gather), sinon l'agent en cours (ex : Rédacteur appelé par le Critique).
+        """
+        return self._running.get(llm_agent, self._current_agent)
+
+    def record_first_token(self, seconds: float, llm_agent: str = None):
+        """Temps avant le premier token, rattaché à l'agent de l'appel (seul le premier appel compte)."""
+        agent_name = self._charged_agent(llm_agent)
+        if agent_name is not None:
+            self._first_tokens.setdefault(agent_name, seconds)
+
+    def record_llm_call(self, usage: Dict, llm_agent: str = None):
+        """Ajoute un appel LLM (voir llm_usage) aux compteurs de l'agent de l'appel."""
+        agent_name = self._charged_agent(llm_agent)
+        if agent_name is None:
+            return
+        totals = self._usage.setdefault(agent_name, {"llm_calls": 0, **{name: 0 for name in USAGE_FIELDS}})
+        totals["llm_calls"] += 1
+        for name in USAGE_FIELDS:
+            totals[name] += usage.get(name, 0)
+        if usage.get("model") and usage["model"] not in totals.setdefault("models", []):
+            totals["models"].append(usage["model"])
+
+    def record_model_load(self, model: str, load_time: float, total_time: float):
+        """Préchargement d'un modèle : durée de chargement mesurée par Ollama et durée de la requête."""
+        self._model_loads[model] = {"load_time": load_time, "total_time": total_time}
+
+    def record_history(self, tokens: int, llm_agent: str = None):
+        """Taille de l'historique de conversation envoyé avec un appel de l'agent."""
+        agent_name = self._charged_agent(llm_agent)
+        if agent_name is None:
+            return
+        totals = self._usage.setdefault(agent_name, {"llm_calls": 0, **{name: 0 for name in USAGE_FIELDS}})
+        totals["history_tokens"] = totals.get("history_tokens", 0) + tokens
 
     def end_agent(self, agent_name: str, success: bool = True, error_message: str = None):
         """Marque la fin de l'exécution d'un agent."""
@@ -119,16 +232,27 @@ class MetricsCollector:
             return
 
         execution_time = time.time() - self._agent_start_times[agent_name]
+        usage = self._usage.get(agent_name, {})
 
         agent_metrics = AgentMetrics(
             name=agent_name,
             execution_time=round(execution_time, 2),
             success=success,
-            error_message=error_message
+            error_message=error_message,
+            time_to_first_token=self._first_tokens.get(agent_name),
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in usage.items()}
         )
+        if agent_metrics.eval_time:
+            agent_metrics.tokens_per_second = round(agent_metrics.output_tokens / agent_metrics.eval_time, 1)
+        self._running = {llm_agent: name for llm_agent, name in self._running.items() if name != agent_name}
+        self._current_agent = next(reversed(self._running.values()), None)
 
         if self.current_analysis:
             self.current_analysis.agents_metrics.append(asdict(agent_metrics))
+        else:
+            # Dernière exécution seulement (ex : questions refusées par le Contrôleur avant celle-ci)
+            self._pending_agents = [a for a in self._pending_agents if a["name"] != agent_name]
+            self._pending_agents.append(asdict(agent_metrics))
 
     def set_ticker_info(self, extracted: str, validated_by_user: bool, correct: bool):
         """Enregistre les infos sur l'extraction du ticker."""
@@ -137,6 +261,11 @@ class MetricsCollector:
             self.current_analysis.ticker_validated_by_user = validated_by_user
             self.current_analysis.ticker_extraction_correct = correct
 
+    def set_intake_mode(self, mode: str):
+        """Enregistre le mode d'accueil (un ou deux appels LLM avant la collecte des données)."""
+        if self.current_analysis:
+            self.current_analysis.intake_mode = mode
+
     def set_critique_info(self, iterations: int, final_score: float, validated_first_pass: bool):
         """Enregistre les infos du Critique."""
         if self.current_analysis:
@@ -144,6 +273,11 @@ class MetricsCollector:
             self.current_analysis.critique_final_score = final_score
             self.current_analysis.validated_first_pass = validated_first_pass
 
+    def set_fetch_timings(self, timings: Dict):
+        """Enregistre les durées par sous-requête du fetch Yahoo Finance."""
+        if self.current_analysis:
+            self.current_analysis.fetch_timings = timings
+
     def set_voie(self, voie: str):
         """Enregistre la voie choisie par le Planificateur."""
         if self.current_analysis:
@@ -164,8 +298,17 @@ class MetricsCollector:
             self.current_analysis.total_execution_time = round(
                 time.time() - self._analysis_start_time, 2
             )
+            counters = _llm_cache_counters()
+            hits = counters["hits"] - self._llm_cache_start["hits"]
+            misses = counters["misses"] - self._llm_cache_start["misses"]
+            self.current_analysis.llm_cache = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses) * 100, 1) if hits + misses else 0.0,
+            }
             self.history.append(self.current_analysis)
             self._save_history()
+            self.current_analysis = None
 
     def get_current_metrics(self) -> Optional[AnalysisMetrics]:
         """Retourne les métriques de l'analyse en cours."""
@@ -192,7 +335,13 @@ class MetricsCollector:
                     "score_qualite_moyen": 0.0,
                     "nb_args_bull_moyen": 0.0,
                     "nb_args_bear_moyen": 0.0,
-                    "temps_par_agent": {}
+                    "taux_hit_cache_llm": 0.0,
+                    "temps_par_agent": {},
+                    "ttft_par_agent": {},
+                    "tokens_par_agent": {},
+                    "prechargement_modeles": {},
+                    "chargements_chemin_critique": 0,
+                    "temps_accueil": {}
                 }
 
             times = [m.total_execution_time for m in analyses]
@@ -205,6 +354,8 @@ class MetricsCollector:
 
             # Temps moyen par agent
             agent_times: Dict[str, List[float]] = {}
+            agent_ttfts: Dict[str, List[float]] = {}
+            agent_tokens: Dict[str, Dict[str, float]] = {}
             for analysis in analyses:
                 for agent in analysis.agents_metrics:
                     name = agent.get("name", "Unknown")
@@ -212,6 +363,34 @@ class MetricsCollector:
                     if name not in agent_times:
                         agent_times[name] = []
                     agent_times[name].append(t)
+                    if agent.get("time_to_first_token") is not None:
+                        agent_ttfts.setdefault(name, []).append(agent["time_to_first_token"])
+                    if agent.get("llm_calls"):
+                        totals = agent_tokens.setdefault(name, {"runs": 0, "llm_calls": 0, **{f: 0 for f in USAGE_FIELDS}})
+                        totals["runs"] += 1
+                        for f in ("llm_calls", *USAGE_FIELDS):
+                            totals[f] += agent.get(f, 0)
+                        totals["history_tokens"] = totals.get("history_tokens", 0) + agent.get("history_tokens", 0)
+
+            # Préchargements (warm-up) et appels d'agent ayant payé le chargement du modèle
+            model_loads: Dict[str, List[float]] = {}
+            for analysis in analyses:
+                for model, load in analysis.model_loads.items():
+                    model_loads.setdefault(model, []).append(load.get("load_time", 0.0))
+            critical_loads = sum(1 for analysis in analyses for agent in analysis.agents_metrics
+                                 if agent.get("load_time", 0.0) > CRITICAL_LOAD_TIME)
+
+            # Accueil (Contrôleur + Planificateur éventuel) par mode
+            intake_times: Dict[str, List[float]] = {}
+            for analysis in analyses:
+                if analysis.intake_mode:
+                    intake_times.setdefault(analysis.intake_mode, []).append(sum(
+                        agent.get("execution_time", 0.0) for agent in analysis.agents_metrics
+                        if agent.get("name") in ("Controleur", "Planificateur")))
+
+            # Taux de hit du cache LLM (toutes analyses confondues)
+            cache_hits = sum(m.llm_cache.get("hits", 0) for m in analyses)
+            cache_lookups = cache_hits + sum(m.llm_cache.get("misses", 0) for m in analyses)
 
             avg_agent_times = {
                 name: round(sum(times) / len(times), 2)
@@ -237,7 +416,33 @@ class MetricsCollector:
                 "nb_args_bear_moyen": round(
                     sum(m.nb_arguments_bear for m in analyses) / len(analyses), 1
                 ),
-                "temps_par_agent": avg_agent_times
+                "taux_hit_cache_llm": round(cache_hits / cache_lookups * 100, 1) if cache_lookups else 0.0,
+                "temps_par_agent": avg_agent_times,
+                "ttft_par_agent": {
+                    name: round(sum(ttfts) / len(ttfts), 2)
+                    for name, ttfts in agent_ttfts.items()
+                },
+                # Moyennes par execution de l'agent, debit = tokens generes / temps de generation
+                "tokens_par_agent": {
+                    name: {
+                        "appels_llm": round(t["llm_calls"] / t["runs"], 1),
+                        "tokens_prompt": round(t["prompt_tokens"] / t["runs"]),
+                        "tokens_sortie": round(t["output_tokens"] / t["runs"]),
+                        "tokens_par_seconde": round(t["output_tokens"] / t["eval_time"], 1) if t["eval_time"] else 0.0,
+                        "chargement_modele": round(t["load_time"] / t["runs"], 2),
+                        "tokens_historique": round(t["history_tokens"] / t["runs"]),
+                    }
+                    for name, t in agent_tokens.items()
+                },
+                "prechargement_modeles": {
+                    model: round(sum(loads) / len(loads), 2)
+                    for model, loads in model_loads.items()
+                },
+                "chargements_chemin_critique": critical_loads,
+                "temps_accueil": {
+                    mode: {"temps_moyen": round(sum(t) / len(t), 2), "nb_analyses": len(t)}
+                    for mode, t in intake_times.items()
+                }
             }
 
         return {
@@ -267,18 +472,44 @@ Date de génération: {current_date}
 - Temps d'exécution moyen: {ma['temps_moyen']}s
 - Temps minimum: {ma['temps_min']}s
 - Temps maximum: {ma['temps_max']}s
+- Taux de hit du cache LLM: {ma['taux_hit_cache_llm']}%
 
 ### Mono-Agent
 - Nombre d'analyses réalisées: {mo['nb_analyses']}
 - Temps d'exécution moyen: {mo['temps_moyen']}s
 - Temps minimum: {mo['temps_min']}s
 - Temps maximum: {mo['temps_max']}s
+- Taux de hit du cache LLM: {mo['taux_hit_cache_llm']}%
 
 ### Temps par Agent (Multi-Agents)
 """
         # Ajouter temps par agent
         for agent_name, avg_time in ma.get("temps_par_agent", {}).items():
-            report += f"- {agent_name}: {avg_time}s (moyenne)\n"
+            ttft = ma.get("ttft_par_agent", {}).get(agent_name)
+            ttft_txt = f", premier token {ttft}s" if ttft is not None else ""
+            report += f"- {agent_name}: {avg_time}s (moyenne{ttft_txt})\n"
+
+        intake_labels = {"single": "un appel (Contrôleur)", "double": "deux appels (Contrôleur + Planificateur)"}
+        if ma.get("temps_accueil"):
+            report += "\n### Accueil de la Question (Multi-Agents)\n"
+            for mode, t in ma["temps_accueil"].items():
+                report += f"- {intake_labels.get(mode, mode)}: {t['temps_moyen']}s (moyenne sur {t['nb_analyses']} analyse(s))\n"
+
+        report += "\n### Tokens par Agent (mesurés par Ollama, moyenne par exécution)\n"
+        for mode_label, mode_stats in (("Multi-Agents", ma), ("Mono-Agent", mo)):
+            for agent_name, t in mode_stats.get("tokens_par_agent", {}).items():
+                report += (f"- [{mode_label}] {agent_name}: {t['appels_llm']} appel(s), "
+                           f"{t['tokens_prompt']} tokens prompt, {t['tokens_sortie']} tokens générés, "
+                           f"{t['tokens_par_seconde']} tokens/s, chargement modèle {t['chargement_modele']}s"
+                           + (f", dont ~{t['tokens_historique']} tokens d'historique" if t.get("tokens_historique") else "")
+                           + "\n")
+
+        report += "\n### Chargement des Modèles (préchargement au démarrage)\n"
+        for mode_label, mode_stats in (("Multi-Agents", ma), ("Mono-Agent", mo)):
+            for model, load_time in mode_stats.get("prechargement_modeles", {}).items():
+                report += f"- [{mode_label}] {model}: {load_time}s (moyenne)\n"
+            report += (f"- [{mode_label}] Exécutions d'agent ayant attendu un chargement (> {CRITICAL_LOAD_TIME}s): "
+                       f"{mode_stats.get('chargements_chemin_critique', 0)}\n")
 
         report += f"""
 --------------------------------------------------------------------------------
@@ -0,0 +1,104 @@
+"""
+Registre des clients LLM et des agents partages par tout le processus.
+
+- Un seul ChatOllama par modele : les agents qui utilisent le meme modele partagent
+  son client HTTP (et donc son pool de connexions vers Ollama). La fenetre de
+  contexte (num_ctx) est celle que suppose agents.context_budget.
+- Prechargement des modeles au demarrage (warm_up) et duree de maintien en
+  memoire (keep_alive) par modele : le chargement ne tombe plus sur une question.
+- Un seul exemplaire de chaque agent : l'historique sur disque n'est charge qu'une
+  fois, et les boucles (corrections du Critique, questions successives du REPL)
+  ne reconstruisent plus d'agents.
+
+Usage:
+    redacteur = get_agent(RedacteurAgent)
+    mono = get_agent(MonoAgent, modelName="mistral-nemo")
+    warm_up()  # en arriere-plan, modeles des agents deja construits
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple, Type, TypeVar
+
+from langchain_ollama import ChatOllama
+
+from agents.context_budget import context_window
+from agents.metrics import get_collector
+
+
+T = TypeVar("T")
+
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")  # Maintien en memoire apres le dernier appel ("-1" : sans limite)
+MODEL_KEEP_ALIVE: Dict[str, str] = {}                     # Surcharges par modele, ex : {"mistral": "10m"}
+
+_models: Dict[Tuple[str, bool], object] = {}
+_agents: Dict[tuple, object] = {}
+_lock = threading.RLock()
+
+
+def get_model(modelName: str, formatJson: bool = False):
+    """Client partage pour ce modele (variante liee au format JSON si formatJson)."""
+    with _lock:
+        key = (modelName, formatJson)
+        if key not in _models:
+            base = _models.get((modelName, False))
+            if base is None:
+                base = _models[(modelName, False)] = ChatOllama(model=modelName, num_ctx=context_window(modelName),
+                                                                keep_alive=keep_alive(modelName))
+            if formatJson:
+                _models[key] = base.bind(format="json")
+        return _models[key]
+
+
+def keep_alive(modelName: str) -> str:
+    return MODEL_KEEP_ALIVE.get(modelName, KEEP_ALIVE)
+
+
+def _preload(modelName: str):
+    """Charge le modele dans Ollama (requete vide) avec les options des vrais appels."""
+    import ollama  # Client installe avec langchain-ollama
+
+    start = time.perf_counter()
+    try:
+        # Meme num_ctx que get_model : sinon Ollama rechargerait le modele au premier appel
+        response = ollama.Client().generate(model=modelName, prompt="", keep_alive=keep_alive(modelName),
+                                            options={"num_ctx": context_window(modelName)})
+    except Exception as e:
+        print(f"[Warm-up] {modelName} non precharge : {e}")
+        return
+    get_collector().record_model_load(modelName, round((response["load_duration"] or 0) / 1e9, 2),
+                                      round(time.perf_counter() - start, 2))
+
+
+def warm_up(models: Iterable[str] = None, wait: bool = False) -> List[threading.Thread]:
+    """
+    Precharge les modeles en parallele, par defaut ceux des agents deja construits.
+    wait=False : en arriere-plan (ex : pendant la saisie de la premiere question).
+    """
+    with _lock:
+        models = sorted(set(models or (modelName for modelName, _ in _models)))
+    threads = [threading.Thread(target=_preload, args=(modelName,), name=f"warm-up-{modelName}", daemon=True)
+               for modelName in models]
+    for thread in threads:
+        thread.start()
+    if wait:
+        for thread in threads:
+            thread.join()
+    return threads
+
+
+def get_agent(cls: Type[T], **kwargs) -> T:
+    """Instance unique de cls pour ces arguments (construite au premier appel)."""
+    key = (cls, tuple(sorted(kwargs.items())))
+    with _lock:
+        if key not in _agents:
+            _agents[key] = cls(**kwargs)
+        return _agents[key]
+
+
+def reset():
+    """Oublie clients et agents (ex : changement de configuration)."""
+    with _lock:
+        _models.clear()
+        _agents.clear()
@@ -0,0 +1,160 @@
+"""
+Routage des modeles par agent et par tache.
+
+Chaque agent (ou tache "Agent:tache") a une liste de modeles candidats, du prefere
+au plus rapide. Le routeur prend le premier candidat dont la latence estimee tient
+dans le budget de l'agent ; l'estimation vient des compteurs Ollama des appels
+precedents (debit prompt et generation par modele, tokens generes par tache).
+Sans budget ni statistiques, le modele prefere est toujours utilise.
+
+Usage:
+    router = get_router()
+    model = router.choose("Redacteur", "correction", prompt_tokens=3200, reserve_output=1500)
+    ...
+    router.record("Redacteur", "correction", model, usage, wall_time)
+
+MODEL_ROUTES_FILE=routes.json remplace la configuration ci-dessous :
+    {"routes": {"Planificateur": ["mistral"]}, "budgets": {"Critique": 30}}
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+from agents.context_budget import context_window
+
+
+# Agent (ou "Agent:tache") -> modeles candidats, du prefere au plus rapide
+MODEL_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "Controlleur": ("mistral",),
+    "Chercheur": ("mistral",),
+    "Planificateur": ("mistral",),               # Classification en un mot : petit modele
+    "Bull (Optimiste)": ("mistral-nemo", "mistral"),
+    "Bear (Pessimiste)": ("mistral-nemo", "mistral"),
+    "Juge (Score)": ("mistral-nemo", "mistral"),
+    "Redacteur": ("mistral-nemo",),              # Rapport final : toujours le grand modele
+    "Redacteur:correction": ("mistral-nemo", "mistral"),
+    "Critique": ("mistral-nemo", "mistral"),
+}
+DEFAULT_MODEL = "mistral-nemo"
+
+# Agent (ou "Agent:tache") -> duree visee d'un appel (secondes) ; au-dela, candidat suivant
+LATENCY_BUDGETS: Dict[str, float] = {
+    "Bull (Optimiste)": 60.0,
+    "Bear (Pessimiste)": 60.0,
+    "Juge (Score)": 60.0,
+    "Redacteur:correction": 90.0,
+    "Critique": 45.0,
+}
+
+ROUTES_FILE = os.environ.get("MODEL_ROUTES_FILE")
+STATS_WEIGHT = 0.3          # Poids d'un nouvel appel dans les moyennes glissantes
+
+
+def _ema(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + STATS_WEIGHT * (value - previous)
+
+
+class ModelRouter:
+    """Choix du modele d'un appel a partir de la configuration et des latences observees."""
+
+    def __init__(self, routes: Dict[str, Sequence[str]] = None, budgets: Dict[str, float] = None):
+        self.routes = dict(MODEL_ROUTES if routes is None else routes)
+        self.budgets = dict(LATENCY_BUDGETS if budgets is None else budgets)
+        if routes is None and ROUTES_FILE:
+            with open(ROUTES_FILE, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            self.routes.update(config.get("routes", {}))
+            self.budgets.update(config.get("budgets", {}))
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Optional[float]]] = {}  # modele -> debits et surcout moyens
+        self._tasks: Dict[str, Optional[float]] = {}              # route -> tokens generes moyens
+        self._choices: Dict[str, Dict[str, int]] = {}             # route -> modele -> appels
+        self._fallbacks = 0
+
+    @staticmethod
+    def _key(agent: str, task: str = None) -> str:
+        return f"{agent}:{task}" if task else agent
+
+    def candidates(self, agent: str, task: str = None) -> Tuple[str, ...]:
+        return tuple(self.routes.get(self._key(agent, task)) or self.routes.get(agent) or (DEFAULT_MODEL,))
+
+    def budget(self, agent: str, task: str = None) -> Optional[float]:
+        return self.budgets.get(self._key(agent, task), self.budgets.get(agent) if task else None)
+
+    def default_model(self, agent: str) -> str:
+        return self.candidates(agent)[0]
+
+    def estimate(self, model: str, agent: str, task: str = None, prompt_tokens: int = 0) -> Optional[float]:
+        """Latence estimee (secondes) d'un appel, ou None sans statistiques pour ce modele / cette tache."""
+        with self._lock:
+            stats = self._models.get(model)
+            output_tokens = self._tasks.get(self._key(agent, task))
+        if not stats or not stats["eval_rate"] or output_tokens is None:
+            return None
+        prompt_time = prompt_tokens / stats["prompt_rate"] if stats["prompt_rate"] else 0.0
+        return prompt_time + output_tokens / stats["eval_rate"] + (stats["overhead"] or 0.0)
+
+    def choose(self, agent: str, task: str = None, prompt_tokens: int = 0, reserve_output: int = 0) -> str:
+        """
+        Premier candidat dont la fenetre accepte le prompt plus la reponse (reserve_output tokens)
+        et dont la latence estimee tient dans le budget.
+        """
+        candidates = [m for m in self.candidates(agent, task) if context_window(m) >= prompt_tokens + reserve_output] \
+            or [max(self.candidates(agent, task), key=context_window)]
+        budget = self.budget(agent, task)
+        model = candidates[0]
+        if budget is not None:
+            estimates = {m: self.estimate(m, agent, task, prompt_tokens) for m in candidates}
+            within = [m for m in candidates if estimates[m] is None or estimates[m] <= budget]
+            model = within[0] if within else min(candidates, key=lambda m: estimates[m])
+            if model != candidates[0]:
+                print(f"[Routage] {self._key(agent, task)} : {model} au lieu de {candidates[0]} "
+                      f"(estimation {estimates[candidates[0]]:.0f}s > budget {budget:.0f}s)")
+                with self._lock:
+                    self._fallbacks += 1
+
+        with self._lock:
+            choices = self._choices.setdefault(self._key(agent, task), {})
+            choices[model] = choices.get(model, 0) + 1
+        return model
+
+    def record(self, agent: str, task: str, model: str, usage: Dict, wall_time: float):
+        """Met a jour les moyennes avec les compteurs Ollama d'un appel (voir metrics.llm_usage)."""
+        with self._lock:
+            stats = self._models.setdefault(model, {"prompt_rate": None, "eval_rate": None, "overhead": None})
+            if usage["prompt_tokens"] and usage["prompt_eval_time"]:
+                stats["prompt_rate"] = _ema(stats["prompt_rate"], usage["prompt_tokens"] / usage["prompt_eval_time"])
+            if usage["output_tokens"] and usage["eval_time"]:
+                stats["eval_rate"] = _ema(stats["eval_rate"], usage["output_tokens"] / usage["eval_time"])
+            # Hors chargement : le warm-up et keep_alive doivent l'eviter, il fausserait l'estimation
+            overhead = wall_time - usage["prompt_eval_time"] - usage["eval_time"] - usage["load_time"]
+            stats["overhead"] = _ema(stats["overhead"], max(0.0, overhead))
+            key = self._key(agent, task)
+            if usage["output_tokens"]:
+                self._tasks[key] = _ema(self._tasks.get(key), usage["output_tokens"])
+
+    def stats(self) -> Dict:
+        """Debits moyens par modele (tokens/s), modeles choisis par route et nombre de replis."""
+        with self._lock:
+            return {
+                "models": {model: {name: round(value, 2) if value is not None else None for name, value in s.items()}
+                           for model, s in self._models.items()},
+                "choices": {key: dict(choices) for key, choices in self._choices.items()},
+                "fallbacks": self._fallbacks,
+            }
+
+
+# Instance globale pour faciliter l'utilisation
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Retourne le routeur global (cree au premier appel)."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -1,56 +1,142 @@
 import os
 import json
+import threading
+
+# Historiques des agents : journal JSONL (un message par ligne) en ajout seul
+HISTORY_COMPACT_BYTES = 2 * 1024 * 1024  # Au-dela, le journal est compacte
+HISTORY_RETAIN_BYTES = 1024 * 1024       # Taille conservee a la compaction (messages les plus recents)
+TAIL_BLOCK = 64 * 1024                   # Lecture de la fin du fichier par blocs
+
+_history_lock = threading.Lock()
+
+
+def _history_path(filename: str, folder: str) -> str:
+    """'history_X.json' ou 'history_X' -> logs/history_X.jsonl"""
+    base = filename[:-6] if filename.endswith('.jsonl') else filename[:-5] if filename.endswith('.json') else filename
+    return os.path.join(folder, f"{base}.jsonl")
+
+
+def _parse_lines(lines: list) -> list:
+    """Decode les lignes JSONL ; une ligne tronquee (arret pendant une ecriture) est ignoree."""
+    messages = []
+    for line in lines:
+        try:
+            messages.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return messages
+
+
+def _read_tail(path: str, max_lines: int = None, max_bytes: int = None) -> list:
+    """Dernieres lignes du fichier (en nombre ou en octets) sans lire le debut."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0:
+            if max_lines is not None and data.count(b"\n") > max_lines:
+                break
+            if max_bytes is not None and len(data) >= max_bytes:
+                break
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    partial = pos > 0
+    if max_bytes is not None and len(data) > max_bytes:
+        data = data[-max_bytes:]
+        partial = True
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    if partial and lines:
+        lines = lines[1:]  # Premiere ligne partielle
+    return lines[-max_lines:] if max_lines else lines
+
+
+def _write_history(history: list, path: str):
+    """Reecrit le journal complet (ecriture atomique)."""
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        for message in history:
+            f.write(json.dumps(message, ensure_ascii=False) + "\n")
+    os.replace(f"{path}.tmp", path)
+
+
+def _compact_history(path: str):
+    """Ne garde que les messages les plus recents (HISTORY_RETAIN_BYTES), en commencant par une question."""
+    history = _parse_lines(_read_tail(path, max_bytes=HISTORY_RETAIN_BYTES))
+    while history and history[0].get("role") != "user":
+        history.pop(0)
+    _write_history(history, path)
+
 
 def save_history_to_file(history: list, filename: str, folder: str = "logs") -> str:
     """
-    Sauvegarde une liste (comme conversation_history) dans un fichier JSON structuré.
+    Sauvegarde une liste (comme conversation_history) dans le journal JSONL de l'agent, en entier.
+    Pour ajouter un échange à chaque appel, utiliser append_history_to_file.
     
     :param history: La liste des messages à sauvegarder.
     :param filename: Le nom du fichier (ex: 'history_agent1.json').
     :param folder: Le dossier de destination.
     """
     try:
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-
-    
-        if not filename.endswith('.json'):
-            filename += '.json'
-            
-        file_path = os.path.join(folder, filename)
-
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=4, ensure_ascii=False)
+        os.makedirs(folder, exist_ok=True)
+        with _history_lock:
+            _write_history(history, _history_path(filename, folder))
+    except Exception as e:
+        print(f"Erreur sauvegarde JSON : {e}")
 
-        print(f"Historique sauvegardé dans : {file_path}")
 
+def append_history_to_file(messages: list, filename: str, folder: str = "logs"):
+    """
+    Ajoute des messages a la fin du journal JSONL de l'agent (cout independant de la taille de
+    l'historique). Au-dela de HISTORY_COMPACT_BYTES, le journal est compacte aux messages recents.
+    """
+    try:
+        os.makedirs(folder, exist_ok=True)
+        path = _history_path(filename, folder)
+        with _history_lock:
+            with open(path, 'a+b') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")  # Ligne tronquee par un arret pendant une ecriture
+                f.write("".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages).encode('utf-8'))
+            if os.path.getsize(path) > HISTORY_COMPACT_BYTES:
+                _compact_history(path)
     except Exception as e:
         print(f"Erreur sauvegarde JSON : {e}")
 
 
-def load_history_from_file(filename: str, folder: str = "logs"):
+def load_history_from_file(filename: str, folder: str = "logs", last: int = None):
         """
-        Charge l'historique depuis un fichier JSON et le remet dans la mémoire de l'agent.
+        Charge l'historique depuis le journal JSONL et le remet dans la mémoire de l'agent.
+        last : ne lit que les `last` derniers messages (fin du fichier).
+        Un ancien historique JSON (history_X.json) est converti au premier chargement.
         """
         
         conversation_history = []
+        file_path = _history_path(filename, folder)
+        legacy_path = f"{file_path[:-6]}.json"
 
-   
-        if not filename.endswith('.json'):
-            filename += '.json'
-            
-        file_path = os.path.join(folder, filename)
+        if not os.path.exists(file_path) and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    save_history_to_file(json.load(f), filename, folder)
+            except Exception as e:
+                print(f"Erreur lecture JSON : {e}")
         
         if os.path.exists(file_path):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    conversation_history = json.load(f)
-                print(f"Mémoire rechargée depuis {filename} ({len(conversation_history)} messages)")
+                if last is not None:
+                    conversation_history = _parse_lines(_read_tail(file_path, max_lines=last))
+                else:
+                    with open(file_path, 'rb') as f:
+                        conversation_history = _parse_lines(f.read().splitlines())
+                    print(f"Mémoire rechargée depuis {os.path.basename(file_path)} ({len(conversation_history)} messages)")
             except Exception as e:
                 print(f"Erreur lecture JSON : {e}")
         else:
-            print(f"Fichier {filename} introuvable dans {folder}. On part de zéro.")
+            print(f"Fichier {os.path.basename(file_path)} introuvable dans {folder}. On part de zéro.")
         
         return conversation_history
 
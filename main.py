@@ -8,21 +8,42 @@ from agents.agent5_redacteur import RedacteurAgent
 from agents.agent6_critique import CritiqueAgent
 from agents.utils import save_to_file
 from agents.metrics import get_collector
+from agents.registry import get_agent, warm_up
+from tools.snapshot_cache import shutdown_snapshot_cache
+from tools.yfinance_fetch import get_last_fetch_timings, setup_ssl_certs
+import os
 import sys
 import time
 import re
 
+
+# Accueil d'une question : "single" = un appel (Controleur.intake : validation, ticker et voie),
+# "double" = Controleur puis Planificateur (comparaison dans metriques.txt)
+INTAKE_MODE = os.environ.get("INTAKE_MODE", "single")
+
+
+def print_token(token: str):
+    """Affiche un morceau de rapport des sa generation."""
+    print(token, end="", flush=True)
+
+
 def main():
 
+    if os.name == "nt":
+        # Certificats SSL copies hors des chemins Windows avec accents
+        setup_ssl_certs()
+
     print("Initialisation du systeme Multi-Agents...")
-    controleur = ControlerAgent()
-    chercheur = ChercheurAgent()
-    planificateur = PlanificateurAgent()
-    bull = BullAgent()
-    bear = BearAgent()
-    score_agent = ScoreAgent()
-    redacteur = RedacteurAgent()
-    critique = CritiqueAgent()
+    controleur = get_agent(ControlerAgent)
+    chercheur = get_agent(ChercheurAgent)
+    planificateur = get_agent(PlanificateurAgent)
+    bull = get_agent(BullAgent)
+    bear = get_agent(BearAgent)
+    score_agent = get_agent(ScoreAgent)
+    redacteur = get_agent(RedacteurAgent)
+    critique = get_agent(CritiqueAgent)
+    # Prechargement des modeles des agents, en parallele pendant la saisie de la premiere question
+    warm_up()
 
     # Initialisation du collecteur de métriques
     metrics = get_collector()
@@ -38,8 +59,11 @@ def main():
 
 
             print("[1/6] Analyse de la pertinence et identification...")
-            metrics.start_agent("Controleur")
-            resultat_controle = controleur.run(user_input)
+            metrics.start_agent("Controleur", controleur.name)
+            if INTAKE_MODE == "double":
+                resultat_controle = controleur.run(user_input)
+            else:
+                resultat_controle = controleur.intake(user_input)
             metrics.end_agent("Controleur")
 
             if resultat_controle.get("decision") == "OUI":
@@ -75,6 +99,7 @@ def main():
                     # Démarrer la collecte de métriques pour cette analyse
                     metrics.start_analysis("multi-agent", ticker, user_input)
                     metrics.set_ticker_info(ticker_ia, ticker_validated_by_user, ticker_extraction_correct)
+                    metrics.set_intake_mode(INTAKE_MODE)
 
                     print(f"[2/6] Lancement de l'Agent Chercheur sur {ticker}...")
                     start_time = time.time()
@@ -82,6 +107,7 @@ def main():
                     metrics.start_agent("Chercheur")
                     resultat_recherche = chercheur.run(ticker)
                     metrics.end_agent("Chercheur")
+                    metrics.set_fetch_timings(get_last_fetch_timings(ticker))
 
 
                     if "Impossible de recuperer" in resultat_recherche or "Erreur critique" in resultat_recherche:
@@ -90,10 +116,15 @@ def main():
                         continue
 
 
-                    print(f"[3/6] Planification de la strategie...")
-                    metrics.start_agent("Planificateur")
-                    strategie = planificateur.run(user_input)
-                    metrics.end_agent("Planificateur")
+                    # Voie deja choisie a l'accueil en un appel, sinon Planificateur
+                    strategie = resultat_controle.get("route")
+                    if strategie:
+                        print(f"[3/6] Strategie choisie a l'accueil : {strategie}")
+                    else:
+                        print(f"[3/6] Planification de la strategie...")
+                        metrics.start_agent("Planificateur")
+                        strategie = planificateur.run(user_input)
+                        metrics.end_agent("Planificateur")
                     metrics.set_voie(strategie)
 
 
@@ -102,29 +133,32 @@ def main():
 
 
                         print("   [Bull] Analyse des opportunites de croissance...")
-                        metrics.start_agent("Bull")
+                        metrics.start_agent("Bull", bull.name)
                         avis_bull = bull.run()
                         metrics.end_agent("Bull")
                         save_to_file(avis_bull, "avis_bull.txt", "data")
 
 
                         print("   [Bear] Analyse des risques et faiblesses...")
-                        metrics.start_agent("Bear")
+                        metrics.start_agent("Bear", bear.name)
                         avis_bear = bear.run()
                         metrics.end_agent("Bear")
                         save_to_file(avis_bear, "avis_bear.txt", "data")
 
 
                         print("   [Score] Arbitrage et notation finale...")
-                        metrics.start_agent("Score")
+                        metrics.start_agent("Score", score_agent.name)
                         avis_score = score_agent.run()
                         metrics.end_agent("Score")
 
 
                         print("   [Redacteur] Generation du rapport final...")
+                        print("\n" + "="*15 + " RAPPORT (redaction en cours) " + "="*15)
                         metrics.start_agent("Redacteur")
-                        rapport_final = redacteur.run(voie="A")
+                        brouillon = redacteur.run(voie="A", onToken=print_token)
                         metrics.end_agent("Redacteur")
+                        print("\n" + "="*45)
+                        rapport_final = brouillon
 
 
                         print("   [Critique] Evaluation du rapport...")
@@ -167,18 +201,24 @@ def main():
                             pass
 
                        
-                        print("\n" + "="*15 + " RAPPORT FINAL " + "="*15)
-                        print(rapport_final)
-                        print("="*45)
+                        if rapport_final == brouillon:
+                            print("\nRAPPORT FINAL : identique au rapport affiche ci-dessus.")
+                        else:
+                            print("\n" + "="*15 + " RAPPORT FINAL " + "="*15)
+                            print(rapport_final)
+                            print("="*45)
 
                     else:  # INFO_SIMPLE
                         print(f"\nVOIE B : Rapport Factuel ({ticker})")
 
 
                         print("   [Redacteur] Generation du rapport informatif...")
+                        print("\n" + "="*15 + " RAPPORT (redaction en cours) " + "="*15)
                         metrics.start_agent("Redacteur")
-                        rapport_final = redacteur.run(voie="B")
+                        brouillon = redacteur.run(voie="B", onToken=print_token)
                         metrics.end_agent("Redacteur")
+                        print("\n" + "="*40)
+                        rapport_final = brouillon
 
                         # Appel du Critique pour valider le rapport informatif
                         print("   [Critique] Evaluation du rapport...")
@@ -210,9 +250,12 @@ def main():
                         except:
                             pass
 
-                        print("\n" + "="*15 + " RAPPORT " + "="*15)
-                        print(rapport_final)
-                        print("="*40)
+                        if rapport_final == brouillon:
+                            print("\nRAPPORT : identique au rapport affiche ci-dessus.")
+                        else:
+                            print("\n" + "="*15 + " RAPPORT " + "="*15)
+                            print(rapport_final)
+                            print("="*40)
 
                     end_time = time.time()
                     execution_time = round(end_time - start_time, 2)
@@ -234,5 +277,8 @@ def main():
         except Exception as e:
             print(f"Erreur critique dans le main : {e}")
 
+    # Rafraichissements de snapshots encore en file : abandonnes
+    shutdown_snapshot_cache()
+
 if __name__ == "__main__":
     main()
@@ -1,12 +1,18 @@
-from langchain_ollama import ChatOllama
 from langchain.messages import HumanMessage
 from langchain_core.messages import SystemMessage
-from tools.yfinance_fetch import data_fetcher_per_stock
+from tools.yfinance_fetch import get_last_fetch_timings, setup_ssl_certs
+from tools.snapshot_cache import cached_fetch_stock_snapshot, shutdown_snapshot_cache
+from tools.snapshot import StockSnapshot
+from agents.base_agent import stream_completion
 from agents.metrics import get_collector
+from agents.llm_cache import get_llm_cache
+from agents.registry import get_agent, get_model, warm_up
 import json
 import datetime
+import os
 import re
 import time
+from typing import Iterator
 
 
 class MonoAgent:
@@ -20,24 +26,27 @@ class MonoAgent:
     But: Comparer les performances avec le système multi-agents
     """
 
-    def __init__(self, modelName: str = "mistral-nemo"):
+    def __init__(self, modelName: str = "mistral-nemo", use_cache: bool = False):
         self.name = "MonoAgent"
-        self.model = ChatOllama(model=modelName)
+        self.modelName = modelName
+        self.model = get_model(modelName)
+        self.use_cache = use_cache  # Cache des reponses LLM partage avec les agents (agents.llm_cache)
         print(f"[MonoAgent] Initialisé avec le modèle {modelName}")
 
-    def _call_llm(self, system_prompt: str, user_prompt: str, format_json: bool = False) -> str:
-        """Appelle le LLM avec les prompts fournis."""
+    def _call_llm(self, system_prompt: str, user_prompt: str, format_json: bool = False, use_cache: bool = None) -> str:
+        """Appelle le LLM avec les prompts fournis (use_cache=None : reglage de l'agent)."""
+        return "".join(self._stream_llm(system_prompt, user_prompt, format_json, use_cache))
+
+    def _stream_llm(self, system_prompt: str, user_prompt: str, format_json: bool = False,
+                    use_cache: bool = None) -> Iterator[str]:
+        """Comme _call_llm, morceau par morceau ; le temps avant le premier token va dans les metriques."""
         messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=user_prompt)
         ]
 
-        if format_json:
-            response = self.model.bind(format="json").invoke(messages)
-        else:
-            response = self.model.invoke(messages)
-
-        return response.content
+        cache = get_llm_cache() if (self.use_cache if use_cache is None else use_cache) else None
+        yield from stream_completion(self.name, self.modelName, messages, format_json, cache)
 
     def _extract_ticker(self, user_question: str) -> dict:
         """Extrait le ticker de la question utilisateur."""
@@ -72,31 +81,29 @@ class MonoAgent:
         except json.JSONDecodeError:
             return {"ticker": None, "raison": "Erreur de parsing"}
 
-    def _fetch_financial_data(self, ticker: str) -> dict:
+    def _fetch_financial_data(self, ticker: str) -> StockSnapshot:
         """Récupère les données financières depuis Yahoo Finance."""
         print(f"[MonoAgent] Récupération des données pour {ticker}...")
 
         try:
-            raw_data_json = data_fetcher_per_stock(ticker)
-            data = json.loads(raw_data_json) if isinstance(raw_data_json, str) else raw_data_json
-            return data
+            return cached_fetch_stock_snapshot(ticker)
         except Exception as e:
             print(f"[MonoAgent] Erreur lors de la récupération: {e}")
-            return {"error": str(e)}
+            return StockSnapshot(ticker, error=str(e))
 
-    def _translate_and_summarize(self, data: dict) -> dict:
+    def _translate_and_summarize(self, data: StockSnapshot) -> dict:
         """Traduit et résume les informations de l'entreprise."""
         print(f"[MonoAgent] Traduction et résumé des données...")
 
-        summary_raw = data.get('business_summary', 'Aucune description disponible.')
-        news_raw = data.get('latest_news', [])
+        summary_raw = data.business_summary or 'Aucune description disponible.'
+        news_raw = data.latest_news
 
         
         news_list_txt = ""
         for idx, n in enumerate(news_raw[:5], 1):
-            title = n.get('title', 'Sans titre')
-            content = n.get('context_article', '')
-            link = n.get('link', '')
+            title = n.title or 'Sans titre'
+            content = n.context_article or ''
+            link = n.link or ''
 
             if content and len(content) > 50 and "Error" not in content:
                 news_list_txt += f"ARTICLE {idx}: {title}\nCONTENU: {content[:500]}...\n\n"
@@ -146,45 +153,45 @@ class MonoAgent:
             return f"{val:.2f}{suffix}"
         return str(val) if val is not None else "N/A"
 
-    def _analyze_complete(self, data: dict, translated: dict) -> str:
+    def _analyze_complete(self, data: StockSnapshot, translated: dict) -> str:
         """Fait l'analyse complète (Bull + Bear + Score + Recommandation)."""
         print(f"[MonoAgent] Analyse complète en cours...")
 
         # Préparer un contexte résumé
         d = data
         context_summary = f"""
-        ENTREPRISE: {d.get('company_name', 'N/A')} ({d.get('ticker', 'N/A')})
-        SECTEUR: {d.get('sector', 'N/A')}
+        ENTREPRISE: {d.company_name or 'N/A'} ({d.ticker})
+        SECTEUR: {d.sector or 'N/A'}
 
         DESCRIPTION: {translated['description'][:500]}
 
-        PRIX ACTUEL: {d.get('current_price')} $
-        CAPITALISATION: {d.get('market_cap')}
+        PRIX ACTUEL: {d.current_price} $
+        CAPITALISATION: {d.market_cap}
 
         RATIOS DE VALORISATION:
-        - P/E (Actuel): {self._format_number(d.get('pe_ratio'))}
-        - P/E (Forward): {self._format_number(d.get('forward_pe'))}
-        - PEG Ratio: {self._format_number(d.get('peg_ratio'))}
-        - Price-to-Sales: {self._format_number(d.get('price_to_sales'))}
+        - P/E (Actuel): {self._format_number(d.pe_ratio)}
+        - P/E (Forward): {self._format_number(d.forward_pe)}
+        - PEG Ratio: {self._format_number(d.peg_ratio)}
+        - Price-to-Sales: {self._format_number(d.price_to_sales)}
 
         RENTABILITE:
-        - Marge Opérationnelle: {self._format_number(float(d.get('operating_margins', 0))*100, "%")}
-        - Marge Nette: {self._format_number(float(d.get('profit_margins', 0))*100, "%")}
-        - ROE: {self._format_number(float(d.get('return_on_equity', 0))*100, "%")}
+        - Marge Opérationnelle: {self._format_number(float(d.operating_margins or 0)*100, "%")}
+        - Marge Nette: {self._format_number(float(d.profit_margins or 0)*100, "%")}
+        - ROE: {self._format_number(float(d.return_on_equity or 0)*100, "%")}
 
         CROISSANCE:
-        - Revenus: {self._format_number(float(d.get('revenue_growth', 0))*100, "%")}
-        - Bénéfices: {self._format_number(float(d.get('earnings_growth', 0))*100, "%")}
+        - Revenus: {self._format_number(float(d.revenue_growth or 0)*100, "%")}
+        - Bénéfices: {self._format_number(float(d.earnings_growth or 0)*100, "%")}
 
         BILAN:
-        - Cash Total: {d.get('total_cash')}
-        - Dette Totale: {d.get('total_debt')}
-        - Ratio Dette/Equity: {self._format_number(d.get('debt_to_equity'))}
+        - Cash Total: {d.total_cash}
+        - Dette Totale: {d.total_debt}
+        - Ratio Dette/Equity: {self._format_number(d.debt_to_equity)}
 
         ANALYSTES:
-        - Consensus: {d.get('recommendation', 'N/A').upper()}
-        - Cible Moyenne: {d.get('target_price_mean')} $
-        - Nb Analystes: {d.get('number_of_analysts')}
+        - Consensus: {(d.recommendation or 'N/A').upper()}
+        - Cible Moyenne: {d.target_price_mean} $
+        - Nb Analystes: {d.number_of_analysts}
 
         ACTUALITES:
         {translated['news_summary'][:800]}
@@ -246,7 +253,8 @@ class MonoAgent:
 
         user_prompt = f"Analyse ces données financières:\n\n{context_summary}"
 
-        response = self._call_llm(system_prompt, user_prompt, format_json=True)
+        # Equivalent de Bull / Bear / Score : meme contexte -> meme reponse, servie du cache si LLM_CACHE=1
+        response = self._call_llm(system_prompt, user_prompt, format_json=True, use_cache=True)
 
         try:
             clean_response = response.strip()
@@ -267,7 +275,7 @@ class MonoAgent:
                 "conclusion": "Erreur lors de l'analyse."
             }
 
-    def _generate_final_report(self, user_question: str, ticker: str, data: dict,
+    def _generate_final_report(self, user_question: str, ticker: str, data: StockSnapshot,
                               translated: dict, analysis: dict) -> str:
         """Genere le rapport final (version simplifiee)."""
         print(f"[MonoAgent] Generation du rapport final...")
@@ -286,7 +294,7 @@ class MonoAgent:
         rapport = f"""# RAPPORT MONO-AGENT
 
 Question: {user_question}
-Entreprise: {d.get('company_name')} ({ticker})
+Entreprise: {d.company_name} ({ticker})
 Date: {current_date}
 
 ---
@@ -307,9 +315,9 @@ Points negatifs:
 ---
 
 Donnees:
-- Prix: {d.get('current_price')} $
-- Capitalisation: {d.get('market_cap')}
-- P/E: {self._format_number(d.get('pe_ratio'))}
+- Prix: {d.current_price} $
+- Capitalisation: {d.market_cap}
+- P/E: {self._format_number(d.pe_ratio)}
 
 ---
 
@@ -352,10 +360,11 @@ Donnees:
         metrics.start_agent("MonoAgent_Fetch")
         data = self._fetch_financial_data(ticker)
         metrics.end_agent("MonoAgent_Fetch")
+        metrics.set_fetch_timings(get_last_fetch_timings(ticker))
 
-        if "error" in data:
-            metrics.end_agent("MonoAgent_Fetch", success=False, error_message=data['error'])
-            return f"❌ Erreur lors de la récupération des données: {data['error']}"
+        if data.error:
+            metrics.end_agent("MonoAgent_Fetch", success=False, error_message=data.error)
+            return f"❌ Erreur lors de la récupération des données: {data.error}"
 
         print(f"✅ Données récupérées")
 
@@ -410,10 +419,17 @@ def main():
     """
     Point d'entrée pour tester le mono-agent.
     """
+    if os.name == "nt":
+        # Certificats SSL copies hors des chemins Windows avec accents
+        setup_ssl_certs()
+
     print("="*50)
     print("     MONO-AGENT - Analyse d'Investissement")
     print("="*50)
 
+    # Prechargement du modele pendant la saisie de la premiere question
+    warm_up(["mistral-nemo"])
+
     while True:
         try:
             print("\n" + "-"*50)
@@ -427,7 +443,7 @@ def main():
             import time
             start_time = time.time()
 
-            mono_agent = MonoAgent(modelName="mistral-nemo")
+            mono_agent = get_agent(MonoAgent, modelName="mistral-nemo")
             rapport = mono_agent.run(user_input)
 
             end_time = time.time()
@@ -444,6 +460,9 @@ def main():
         except Exception as e:
             print(f"❌ Erreur: {e}")
 
+    # Rafraichissements de snapshots encore en file : abandonnes
+    shutdown_snapshot_cache()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
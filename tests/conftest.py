@@ -0,0 +1,104 @@
+"""
+Doublures communes aux tests : un yf.Ticker sans reseau et un environnement isole
+(dossier de travail temporaire, singletons des caches remis a zero).
+"""
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+
+NEWS_URLS = ("https://finance.yahoo.com/news/a.html", None, "https://www.reuters.com/markets/b")
+
+
+class FakeTicker:
+    """yf.Ticker sans reseau : seuls les attributs lus par tools.yfinance_fetch."""
+
+    def __init__(self, ticker: str, session=None):
+        self.ticker = ticker
+        self.info = {
+            "longName": f"{ticker} Corp", "sector": "Technology", "industry": "Semiconductors",
+            "country": "United States", "website": "https://example.com", "fullTimeEmployees": 1200,
+            "longBusinessSummary": "Fabrique des puces.",
+            "currentPrice": 120.5, "previousClose": 119.0, "open": 119.5, "dayHigh": 121.0, "dayLow": 118.2,
+            "fiftyTwoWeekHigh": 150.0, "fiftyTwoWeekLow": 80.0, "fiftyDayAverage": 115.3,
+            "twoHundredDayAverage": 105.1, "marketCap": 2_950_000_000_000, "enterpriseValue": 2_900_000_000_000,
+            "volume": 41_000_000, "averageVolume": 39_500_000, "beta": 1.7,
+            "trailingPE": 45.2, "forwardPE": 30.1, "priceToBook": 40.2, "priceToSalesTrailing12Months": 25.0,
+            "enterpriseToRevenue": 24.1, "enterpriseToEbitda": 38.0,
+            "profitMargins": 0.55, "operatingMargins": 0.62, "grossMargins": 0.75,
+            "returnOnEquity": 1.1, "returnOnAssets": 0.5,
+            "revenueGrowth": 0.94, "earningsGrowth": 1.1, "earningsQuarterlyGrowth": 1.2,
+            "dividendRate": 0.04, "dividendYield": 0.0003, "payoutRatio": 0.01, "exDividendDate": 1757030400,
+            "targetLowPrice": 100.0, "targetMeanPrice": 170.0, "targetHighPrice": 220.0,
+            "recommendationKey": "buy", "numberOfAnalystOpinions": 55,
+            "totalRevenue": 130_000_000_000, "revenuePerShare": 5.3, "ebitda": 86_000_000_000,
+            "netIncomeToCommon": 72_000_000_000, "trailingEps": 2.9, "forwardEps": 4.0, "bookValue": 3.0,
+            "totalCash": 43_000_000_000, "totalDebt": 10_000_000_000, "debtToEquity": 13.0,
+            "currentRatio": 4.1, "quickRatio": 3.5,
+        }
+        # Cotation legere (fast_info) : memes valeurs que info
+        self.fast_info = SimpleNamespace(
+            last_price=120.5, previous_close=119.0, open=119.5, day_high=121.0, day_low=118.2,
+            year_high=150.0, year_low=80.0, fifty_day_average=115.3, two_hundred_day_average=105.1,
+            market_cap=2_950_000_000_000, last_volume=41_000_000, three_month_average_volume=39_500_000,
+        )
+        self.news = [
+            {"content": {"title": f"Nouvelle {i}", "canonicalUrl": {"url": url}}}
+            for i, url in enumerate(NEWS_URLS)
+        ]
+        quarters = pd.to_datetime(["2026-06-30", "2026-03-31", "2025-12-31", "2025-09-30", "2025-06-30"])
+        self.quarterly_income_stmt = pd.DataFrame(
+            [[18.8e9, 14.9e9, 22.1e9, 19.3e9, 16.6e9], [46.7e9, 44.1e9, 39.3e9, 35.1e9, 30.0e9]],
+            index=["Net Income", "Total Revenue"], columns=quarters)
+        self.quarterly_balance_sheet = pd.DataFrame(
+            [[125.3e9], [10.3e9], [8.6e9], [79.3e9]],
+            index=["Total Assets", "Total Debt", "Cash And Cash Equivalents", "Stockholders Equity"],
+            columns=quarters[:1])
+        self.quarterly_cashflow = pd.DataFrame(
+            [[27.4e9], [26.1e9], [-1.3e9]],
+            index=["Operating Cash Flow", "Free Cash Flow", "Capital Expenditure"], columns=quarters[:1])
+        self.recommendations = pd.DataFrame({
+            "period": ["0m", "-1m", "-2m"], "strongBuy": [12, 11, 10], "buy": [40, 41, 39],
+            "hold": [5, 6, 7], "sell": [1, 0, 1], "strongSell": [0, 0, 0],
+        })
+
+    def history(self, period: str = None, start: str = None, auto_adjust: bool = True, **kwargs):
+        dates = pd.bdate_range(end="2026-09-30", periods=20)
+        frame = pd.DataFrame({
+            "Open": [100.0 + i for i in range(20)],
+            "High": [101.5 + i for i in range(20)],
+            "Low": [99.0 + i for i in range(20)],
+            "Close": [100.25 + i for i in range(20)],
+            "Volume": [30_000_000 + 1000 * i for i in range(20)],
+        }, index=dates)
+        return frame[frame.index >= pd.Timestamp(start)] if start else frame
+
+
+def fake_scrape(url: str, max_chars: int = 5000) -> str:
+    return f"Texte de {url}"
+
+
+@pytest.fixture
+def offline_yahoo(monkeypatch, tmp_path):
+    """
+    Fetch Yahoo sans reseau : yf.Ticker remplace par FakeTicker, scrapes d'articles simules,
+    caches sur disque (cours, articles, echecs) recrees dans un dossier temporaire.
+    """
+    import yfinance
+
+    from tools import article_cache, cassette, failure_cache, http_session, price_store, yfinance_fetch
+
+    monkeypatch.chdir(tmp_path)
+    # Trafic "reel" (vers FakeTicker), quelle que soit la variable YF_CASSETTE_MODE
+    monkeypatch.setattr(cassette, "_active", None)
+    monkeypatch.setattr(cassette, "_env_checked", True)
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setattr(http_session, "_tickers", {})
+    monkeypatch.setattr(http_session, "get_yahoo_session", lambda: None)
+    monkeypatch.setattr(price_store, "_price_store", None)
+    monkeypatch.setattr(article_cache, "_article_store", None)
+    monkeypatch.setattr(failure_cache, "_failure_cache", None)
+    monkeypatch.setattr(yfinance_fetch, "scrape_article_content", fake_scrape)
+    return tmp_path
@@ -0,0 +1,48 @@
+"""
+ArticleStore : texte re-extrait quand l'extracteur change, y compris en lot
+(reextract_all), sans s'arreter sur un fichier illisible ou un HTML evince.
+"""
+
+import os
+
+import pytest
+
+from tools.article_cache import ArticleStore
+
+
+HTML = b"<html><body><p>Texte de l'article</p></body></html>"
+
+
+def extract(html: bytes, max_chars: int) -> str:
+    return f"v2:{html.decode()[:max_chars]}"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArticleStore(str(tmp_path / "articles"))
+
+
+def save(store: ArticleStore, url: str) -> dict:
+    return store.save(url, HTML, {"ETag": '"abc"'}, "v1:texte", 5000, "lxml-1")
+
+
+def test_text_reextracts_on_new_extractor_version(store):
+    record = save(store, "https://example.com/a")
+
+    assert store.text(record, 5000, extract, "lxml-1") == "v1:texte"
+    assert store.text(record, 5000, extract, "lxml-2").startswith("v2:")
+    assert store.load("https://example.com/a")["extractor_version"] == "lxml-2"
+    assert store.stats()["reextracted"] == 1
+
+
+def test_reextract_all_skips_unreadable_and_evicted_entries(store):
+    for path in ("a", "b", "c"):
+        save(store, f"https://example.com/{path}")
+    evicted = store.load("https://example.com/b")
+    os.remove(store._html_path(evicted["key"]))
+    with open(os.path.join(store.folder, "corrompu.json"), "w", encoding="utf-8") as f:
+        f.write('{"key": ')
+
+    assert store.reextract_all(extract, "lxml-2") == 2
+    assert store.load("https://example.com/a")["text"].startswith("v2:")
+    assert store.reextract_all(extract, "lxml-2") == 0  # Deja a jour
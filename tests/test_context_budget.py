@@ -0,0 +1,104 @@
+"""
+ContextBudget.fit : les parties de plus grande priorite sont raccourcies puis supprimees
+en premier, la priorite 0 n'est jamais coupee.
+"""
+
+import pytest
+
+from agents import context_budget
+from agents.context_budget import (
+    TEMPLATE_MARGIN, TRUNCATION_MARK, ContextBudget, contexte_parts, estimate_tokens, observe,
+)
+
+
+MODEL = "test-model"
+WINDOW = 1000
+RESERVE = 100
+AVAILABLE = WINDOW - RESERVE - TEMPLATE_MARGIN  # Sans texte fixe
+
+
+@pytest.fixture(autouse=True)
+def fresh_ratios(monkeypatch):
+    monkeypatch.setattr(context_budget, "_ratios", {})
+
+
+def text_of(tokens: int, word: str = "ligne") -> str:
+    """Texte multi-lignes d'environ `tokens` tokens."""
+    text = ""
+    while estimate_tokens(text, MODEL) < tokens:
+        text += f"{word} {len(text)}\n"
+    return text
+
+
+def fit(sections, fixed=""):
+    return ContextBudget(MODEL, reserve_output=RESERVE, window=WINDOW).fit(fixed, sections)
+
+
+def total_tokens(fitted: dict) -> int:
+    return sum(estimate_tokens(text, MODEL) for text in fitted.values())
+
+
+def test_prompt_within_budget_is_untouched():
+    sections = {"contexte": [(text_of(200), 0), (text_of(200), 2)], "bull": [(text_of(100), 1)]}
+    fitted = fit(sections)
+
+    assert fitted == {name: "".join(text for text, _ in parts) for name, parts in sections.items()}
+
+
+def test_highest_priority_number_is_cut_first():
+    essentiel, actualites, liens = text_of(400, "prix"), text_of(300, "news"), text_of(300, "lien")
+    fitted = fit({"contexte": [(essentiel, 0), (actualites, 2), (liens, 4)]})
+
+    assert fitted["contexte"].startswith(essentiel + actualites)
+    assert liens not in fitted["contexte"]
+    assert total_tokens(fitted) <= AVAILABLE
+
+
+def test_shortened_part_keeps_its_beginning():
+    essentiel, avis = text_of(400), text_of(600, "avis")
+    fitted = fit({"contexte": [(essentiel, 0)], "bull": [(avis, 2)]})
+
+    assert fitted["contexte"] == essentiel
+    assert fitted["bull"].endswith(TRUNCATION_MARK)
+    assert avis.startswith(fitted["bull"][:-len(TRUNCATION_MARK)].rstrip())
+    assert total_tokens(fitted) <= AVAILABLE
+
+
+def test_equal_priority_cuts_end_of_prompt_first():
+    bull, bear = text_of(400, "bull"), text_of(400, "bear")
+    fitted = fit({"bull": [(bull, 1)], "bear": [(bear, 1)]})
+
+    assert fitted["bull"] == bull
+    assert fitted["bear"] != bear
+
+
+def test_fixed_text_is_charged_to_the_budget():
+    avis = text_of(400)
+    assert fit({"bull": [(avis, 1)]})["bull"] == avis
+    assert fit({"bull": [(avis, 1)]}, fixed=text_of(500))["bull"] != avis
+
+
+def test_priority_zero_is_never_cut(capsys):
+    essentiel = text_of(AVAILABLE + 200)
+    fitted = fit({"contexte": [(essentiel, 0), (text_of(100), 3)]})
+
+    assert fitted["contexte"] == essentiel
+    assert "au-dela de la fenetre" in capsys.readouterr().out
+
+
+def test_contexte_parts_priorities():
+    contexte = ("## CHIFFRES CLES\nPrix : 120\n"
+                "### Indicateurs techniques\nRSI 55\n"
+                "## ACTUALITÉS\nNouvelle\n"
+                "## LIENS\nhttps://example.com\n")
+    assert [priority for _, priority in contexte_parts(contexte)] == [0, 1, 2, 4]
+    assert [priority for _, priority in contexte_parts(contexte, base=1)] == [1, 2, 3, 5]
+    assert "".join(text for text, _ in contexte_parts(contexte)) == contexte
+
+
+def test_observe_recalibrates_estimate():
+    text = "x" * 3200
+    before = estimate_tokens(text, MODEL)
+    observe(MODEL, prompt_chars=4000, prompt_tokens=2000)  # 2 caracteres par token
+
+    assert estimate_tokens(text, MODEL) > before
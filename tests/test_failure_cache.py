@@ -0,0 +1,77 @@
+"""
+FailureCache : regles de blocage par URL et par domaine.
+"""
+
+import pytest
+import requests
+
+from tools.failure_cache import DOMAIN_MIN_FAILURES, FailureCache, classify_failure
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FailureCache(str(tmp_path / "scrape_failures.json"))
+
+
+def test_classify_failure():
+    assert classify_failure(http_error(403)) == "HTTP 403"
+    assert classify_failure(requests.ReadTimeout()) == "timeout"
+    assert classify_failure(requests.ConnectionError()) == "connexion"
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_dead_links_block_only_their_url(cache, status):
+    for i in range(DOMAIN_MIN_FAILURES + 1):
+        cache.record_failure(f"https://news.example.com/mort-{i}", http_error(status), 0.2)
+
+    assert cache.check("https://news.example.com/mort-0") == f"HTTP {status}"
+    assert cache.check("https://news.example.com/vivant") is None
+    assert cache.stats()["blocked_domains"] == 0
+
+
+def test_forbidden_on_distinct_urls_blocks_domain(cache):
+    cache.record_failure("https://www.example.com/a", http_error(403), 1.0)
+    assert cache.check("https://example.com/autre") is None  # Une seule URL : pas encore le domaine
+
+    cache.record_failure("https://example.com/b", http_error(403), 3.0)
+    assert cache.check("https://example.com/autre") == "HTTP 403"
+    assert cache.stats()["skipped_domains"] == 1
+    assert cache.stats()["time_saved"] == 2.0  # Duree moyenne des echecs du domaine
+
+
+def test_same_url_does_not_count_twice_for_domain(cache):
+    for _ in range(DOMAIN_MIN_FAILURES + 1):
+        cache.record_failure("https://example.com/a", requests.ReadTimeout(), 10.0)
+
+    assert cache.check("https://example.com/a") == "timeout"
+    assert cache.check("https://example.com/b") is None
+
+
+def test_non_source_errors_are_ignored(cache):
+    cache.record_failure("https://example.com/a", ValueError("extraction"), 0.1)
+    assert cache.check("https://example.com/a") is None
+    assert cache.stats()["failures"] == 0
+
+
+def test_success_clears_url_and_domain(cache):
+    for path in ("a", "b"):
+        cache.record_failure(f"https://example.com/{path}", http_error(403), 1.0)
+    cache.record_success("https://example.com/a")
+
+    assert cache.check("https://example.com/a") is None
+    assert cache.check("https://example.com/c") is None
+    assert cache.stats()["recovered"] == 1
+
+
+def test_entries_persist_across_instances(cache):
+    for path in ("a", "b"):
+        cache.record_failure(f"https://example.com/{path}", http_error(451), 1.0)
+
+    reloaded = FailureCache(cache.path)
+    assert reloaded.check("https://example.com/c") == "HTTP 451"
@@ -0,0 +1,76 @@
+"""
+Historique des agents en journal JSONL : ajout seul, lecture de la fin du fichier,
+lignes tronquees ignorees, compaction et conversion de l'ancien format JSON.
+"""
+
+import json
+
+import pytest
+
+from agents import utils
+from agents.utils import append_history_to_file, load_history_from_file, save_history_to_file
+
+
+def exchange(i: int) -> list:
+    return [{"role": "user", "content": f"Question {i}"}, {"role": "assistant", "content": f"Réponse {i}"}]
+
+
+@pytest.fixture
+def logs(tmp_path):
+    return str(tmp_path / "logs")
+
+
+def test_append_then_load(logs):
+    for i in range(3):
+        append_history_to_file(exchange(i), "history_Bull.json", logs)
+
+    assert load_history_from_file("history_Bull.json", logs) == exchange(0) + exchange(1) + exchange(2)
+
+
+@pytest.mark.parametrize("tail_block", [utils.TAIL_BLOCK, 16], ids=["one-block", "many-blocks"])
+def test_load_last_messages_reads_tail(logs, monkeypatch, tail_block):
+    monkeypatch.setattr(utils, "TAIL_BLOCK", tail_block)
+    for i in range(50):
+        append_history_to_file(exchange(i), "history_Bull.json", logs)
+
+    assert load_history_from_file("history_Bull.json", logs, last=4) == exchange(48) + exchange(49)
+
+
+def test_truncated_line_is_skipped_and_repaired(logs, tmp_path):
+    append_history_to_file(exchange(0), "history_Bull.json", logs)
+    path = tmp_path / "logs" / "history_Bull.jsonl"
+    with open(path, "ab") as f:
+        f.write(b'{"role": "user", "cont')  # Arret pendant une ecriture
+
+    assert load_history_from_file("history_Bull.json", logs) == exchange(0)
+    append_history_to_file(exchange(1), "history_Bull.json", logs)
+    assert load_history_from_file("history_Bull.json", logs) == exchange(0) + exchange(1)
+
+
+def test_compaction_keeps_recent_messages_from_a_question(logs, monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, "HISTORY_COMPACT_BYTES", 2000)
+    monkeypatch.setattr(utils, "HISTORY_RETAIN_BYTES", 500)
+    for i in range(40):
+        append_history_to_file(exchange(i), "history_Bull.json", logs)
+
+    history = load_history_from_file("history_Bull.json", logs)
+    assert (tmp_path / "logs" / "history_Bull.jsonl").stat().st_size <= 2000
+    assert history[0]["role"] == "user"
+    assert history[-2:] == exchange(39)
+    assert history == [m for i in range(int(history[0]["content"].split()[1]), 40) for m in exchange(i)]
+
+
+def test_legacy_json_history_is_converted(logs, tmp_path):
+    (tmp_path / "logs").mkdir()
+    with open(tmp_path / "logs" / "history_Bull.json", "w", encoding="utf-8") as f:
+        json.dump(exchange(0), f, ensure_ascii=False)
+
+    assert load_history_from_file("history_Bull.json", logs) == exchange(0)
+    assert (tmp_path / "logs" / "history_Bull.jsonl").exists()
+
+
+def test_save_rewrites_whole_history(logs):
+    append_history_to_file(exchange(0), "history_Bull.json", logs)
+    save_history_to_file(exchange(1), "history_Bull.json", logs)
+
+    assert load_history_from_file("history_Bull.json", logs) == exchange(1)
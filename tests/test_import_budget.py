@@ -0,0 +1,33 @@
+"""
+Budget de temps d'import (voir tools.import_budget) : chaque module est importe
+dans un processus neuf, sans dependance lourde ni modification de l'environnement.
+"""
+
+import pytest
+
+from tools.import_budget import (
+    ENTRYPOINT_BUDGETS_MS,
+    ENTRYPOINT_PRELOAD,
+    IMPORT_BUDGETS_MS,
+    measure,
+)
+
+
+def _check(module: str, budget: int, preload: tuple = ()):
+    result = measure(module, repeat=3, preload=preload)
+    if "missing" in result:
+        pytest.skip(f"dependance absente : {result['missing']}")
+    assert "error" not in result, result.get("error")
+    assert result["heavy"] == [], f"modules lourds charges a l'import : {result['heavy']}"
+    assert result["env_changed"] == [], f"environnement modifie a l'import : {result['env_changed']}"
+    assert result["ms"] <= budget, f"{module} : {result['ms']} ms > {budget} ms"
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS_MS))
+def test_fetch_module_import_budget(module):
+    _check(module, IMPORT_BUDGETS_MS[module])
+
+
+@pytest.mark.parametrize("module", sorted(ENTRYPOINT_BUDGETS_MS))
+def test_entrypoint_import_budget(module):
+    _check(module, ENTRYPOINT_BUDGETS_MS[module], ENTRYPOINT_PRELOAD)
@@ -0,0 +1,67 @@
+"""
+LLMCache : cle de requete (modele, messages, format), stockage et opt-in par execution.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from agents import llm_cache
+from agents.llm_cache import LLMCache, cache_key
+
+
+MESSAGES = [{"role": "system", "content": "Tu es l'Agent BULL."},
+            {"role": "user", "content": "Contexte NVDA"}]
+
+
+def test_key_depends_on_model_messages_and_format():
+    key = cache_key("mistral", MESSAGES, "json")
+
+    assert cache_key("mistral", [dict(m) for m in MESSAGES], "json") == key
+    assert cache_key("mistral-nemo", MESSAGES, "json") != key
+    assert cache_key("mistral", MESSAGES, None) != key
+    assert cache_key("mistral", MESSAGES[::-1], "json") != key
+    assert cache_key("mistral", MESSAGES[:1] + [{"role": "user", "content": "Contexte AMD"}], "json") != key
+
+
+def test_langchain_messages_and_history_dicts_share_key():
+    # Messages langchain : seuls .type et .content comptent
+    langchain_messages = [SimpleNamespace(type=m["role"], content=m["content"]) for m in MESSAGES]
+    assert cache_key("mistral", langchain_messages) == cache_key("mistral", MESSAGES)
+
+
+def test_put_then_get(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    key = cache_key("mistral", MESSAGES)
+
+    assert cache.get(key) is None
+    cache.put(key, '{"score": 7}', model="mistral", agent="Juge (Score)")
+
+    assert cache.get(key) == '{"score": 7}'
+    assert LLMCache(str(tmp_path)).get(key) == '{"score": 7}'  # Relu depuis le disque
+    assert [p.suffix for p in tmp_path.iterdir()] == [".json"]  # Aucun fichier temporaire restant
+    assert cache.stats()["hit_rate"] == 50.0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path), max_entries=2)
+    keys = [cache_key("mistral", [{"role": "user", "content": str(i)}]) for i in range(3)]
+    cache.put(keys[0], "a")
+    cache.put(keys[1], "b")
+    cache.get(keys[0])  # keys[1] devient la moins recemment utilisee
+    cache.put(keys[2], "c")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" and cache.get(keys[2]) == "c"
+
+
+@pytest.mark.parametrize("value, enabled", [(None, False), ("0", False), ("1", True)])
+def test_cache_is_opt_in_per_run(monkeypatch, tmp_path, value, enabled):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_cache, "_llm_cache", None)
+    if value is None:
+        monkeypatch.delenv("LLM_CACHE", raising=False)
+    else:
+        monkeypatch.setenv("LLM_CACHE", value)
+
+    assert (llm_cache.get_llm_cache() is not None) == enabled
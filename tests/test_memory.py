@@ -0,0 +1,97 @@
+"""
+BoundedMemory : fenetre glissante des derniers echanges + resume des plus anciens,
+le tout borne a max_tokens.
+"""
+
+from agents.memory import (
+    MIN_RECENT_TURNS, SUMMARY_HEADER, BoundedMemory, history_turns, turn_messages,
+)
+
+
+MODEL = "test-model"
+
+
+def history(n: int, size: int = 40) -> list:
+    """n echanges, chaque question / reponse d'environ `size` caracteres."""
+    return turn_messages([(f"Question {i} " + "q" * size, f"Reponse {i} " + "r" * size) for i in range(n)])
+
+
+def turn_index(message: dict) -> int:
+    return int(message["content"].split()[1])
+
+
+class StubSummarizer:
+    """Resume "LLM" factice : garde la trace des echanges recus."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary: str, turns: list) -> str:
+        self.calls.append([question.split()[1] for question, _ in turns])
+        return (summary + " " if summary else "") + " ".join(f"Q{q.split()[1]}" for q, _ in turns)
+
+
+def test_history_turns_pairs_questions_and_answers():
+    messages = [{"role": "assistant", "content": "orpheline"},
+                {"role": "user", "content": "Q1"}, {"role": "assistant", "content": "R1"},
+                {"role": "user", "content": "Q2"}]
+    assert history_turns(messages) == [("Q1", "R1")]
+
+
+def test_short_history_is_sent_as_is():
+    messages, tokens = BoundedMemory(MODEL, max_tokens=800).window(history(3))
+
+    assert messages == history(3)
+    assert tokens > 0
+
+
+def test_long_history_is_bounded_and_summarized():
+    memory = BoundedMemory(MODEL, max_tokens=200)
+    messages, tokens = memory.window(history(30))
+
+    assert tokens <= 200
+    assert messages[0]["role"] == "system" and messages[0]["content"].startswith(SUMMARY_HEADER)
+    assert messages[-2:] == history(30)[-2:]  # Dernier echange tel quel
+    recent = [m for m in messages[1:] if m["role"] == "user"]
+    assert len(recent) >= MIN_RECENT_TURNS
+    # Les plus anciens echanges du resume sortent en premier
+    assert "Question 0 " not in messages[0]["content"]
+
+
+def test_recent_turns_kept_even_over_budget():
+    messages, _ = BoundedMemory(MODEL, max_tokens=50).window(history(5, size=400))
+    assert [m for m in messages if m["role"] != "system"] == history(5, size=400)[-2 * MIN_RECENT_TURNS:]
+
+
+def test_summarizer_receives_each_turn_once():
+    summarizer = StubSummarizer()
+    memory = BoundedMemory(MODEL, max_tokens=200, summarizer=summarizer)
+    memory.window(history(20))
+    memory.window(history(20))  # Rien de nouveau a resumer
+    messages, _ = memory.window(history(24))
+
+    folded = [q for call in summarizer.calls for q in call]
+    assert folded == [str(i) for i in range(len(folded))]  # Chaque echange une seule fois, dans l'ordre
+    assert len(summarizer.calls) == 2
+    assert messages[0]["content"] == f"{SUMMARY_HEADER}\n" + " ".join(f"Q{q}" for q in folded)
+
+
+def test_folded_turns_never_return_to_window():
+    memory = BoundedMemory(MODEL, max_tokens=200)
+    first, _ = memory.window(history(20))
+    oldest = turn_index(next(m for m in first if m["role"] == "user"))
+    assert oldest > 0
+
+    # Des echanges recents plus courts liberent de la place : la fenetre ne s'etend pas pour autant vers le passe
+    shorter = history(20)[:-10] + turn_messages([(f"Question {i}", "ok") for i in range(15, 20)])
+    second, _ = memory.window(shorter)
+
+    assert min(turn_index(m) for m in second if m["role"] == "user") == oldest
+
+
+def test_replaced_history_resets_summary():
+    memory = BoundedMemory(MODEL, max_tokens=200)
+    memory.window(history(30))
+    messages, _ = memory.window(history(2))
+
+    assert messages == history(2)
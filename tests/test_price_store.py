@@ -0,0 +1,85 @@
+"""
+PriceStore : synchronisation incrementale, re-telechargement complet apres un
+re-ajustement des cours, et compteurs associes.
+"""
+
+import numpy as np
+import pytest
+
+from tools.price_store import PriceStore
+
+
+def bars(start: str, days: int, close_offset: float = 0.0) -> dict:
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(start, "D") + days)
+    close = 100.0 + np.arange(days) + close_offset
+    return {"dates": dates, "open": close - 0.5, "high": close + 1.0, "low": close - 1.0, "close": close,
+            "volume": np.full(days, 1000, dtype=np.int64)}
+
+
+class FakeYahoo:
+    """_download sans reseau : historique complet ou barres depuis `start`, enregistre les appels."""
+
+    def __init__(self, history: dict):
+        self.history = history
+        self.calls = []
+
+    def __call__(self, ticker: str, start):
+        self.calls.append(start)
+        if start is None:
+            return self.history
+        keep = self.history["dates"] >= np.datetime64(start, "D")
+        return {name: values[keep] for name, values in self.history.items()}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(folder=str(tmp_path / "prices"), sync_interval=0)
+
+
+def test_incremental_sync_appends_missing_days(store, monkeypatch):
+    yahoo = FakeYahoo(bars("2026-01-01", 60))
+    monkeypatch.setattr(store, "_download", yahoo)
+    store.sync("NVDA")
+    yahoo.history = bars("2026-01-01", 65)
+    store.sync("NVDA")
+
+    loaded = store.load("NVDA", sync=False)
+    assert np.array_equal(loaded.close, yahoo.history["close"])
+    assert yahoo.calls[1] is not None  # Seulement les jours recents
+    stats = store.stats()
+    assert stats["full_downloads"] == 1 and stats["readjusted"] == 0
+    assert stats["rows_fetched"] == 60 + len(FakeYahoo(yahoo.history)(None, yahoo.calls[1])["dates"])
+
+
+def test_readjusted_closes_trigger_full_download(store, monkeypatch):
+    yahoo = FakeYahoo(bars("2026-01-01", 60))
+    monkeypatch.setattr(store, "_download", yahoo)
+    store.sync("NVDA")
+    yahoo.history = bars("2026-01-01", 65, close_offset=-2.0)  # Dividende : tout l'historique re-ajuste
+    store.sync("NVDA")
+
+    assert yahoo.calls[-1] is None
+    assert np.array_equal(store.load("NVDA", sync=False).close, yahoo.history["close"])
+    stats = store.stats()
+    assert stats["readjusted"] == 1 and stats["full_downloads"] == 2
+    incremental = len(FakeYahoo(yahoo.history)(None, yahoo.calls[1])["dates"])
+    assert stats["rows_fetched"] == 60 + incremental + 65  # Le re-telechargement complet est compte
+
+
+def test_sync_skipped_within_interval(tmp_path, monkeypatch):
+    store = PriceStore(folder=str(tmp_path / "prices"), sync_interval=3600)
+    monkeypatch.setattr(store, "_download", FakeYahoo(bars("2026-01-01", 10)))
+
+    assert store.sync("NVDA") is True
+    assert store.sync("NVDA") is False
+    assert store.stats()["skipped"] == 1
+
+
+def test_loaded_columns_survive_rewrite(store, monkeypatch):
+    yahoo = FakeYahoo(bars("2026-01-01", 30))
+    monkeypatch.setattr(store, "_download", yahoo)
+    loaded = store.load("NVDA")
+    yahoo.history = bars("2026-01-01", 35, close_offset=-2.0)
+    store.sync("NVDA")  # Remplace les fichiers pendant que `loaded` est encore reference
+
+    assert np.array_equal(loaded.close, bars("2026-01-01", 30)["close"])
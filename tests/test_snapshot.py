@@ -0,0 +1,61 @@
+"""
+StockSnapshot : le JSON historique est produit dans l'ordre declare par OUTPUT_KEYS,
+et un snapshot relu depuis le cache disque redonne exactement le meme JSON.
+"""
+
+import json
+
+import pytest
+import yfinance
+
+from tools import http_session, yfinance_fetch
+from tools.snapshot import INFO_FIELDS, OUTPUT_KEYS, StockSnapshot
+from tools.snapshot_cache import SnapshotCache
+
+
+class NoNetworkTicker:
+    def __init__(self, ticker: str, session=None):
+        raise AssertionError(f"{ticker} aurait du etre servi depuis le cache disque")
+
+
+def test_output_keys_cover_every_info_field():
+    assert len(set(OUTPUT_KEYS)) == len(OUTPUT_KEYS)
+    assert set(INFO_FIELDS) <= set(OUTPUT_KEYS)
+
+
+def test_to_dict_follows_output_keys(offline_yahoo):
+    snapshot = yfinance_fetch.fetch_stock_snapshot("NVDA")
+    data = snapshot.to_dict()
+
+    assert tuple(data) == OUTPUT_KEYS
+    assert data["ticker"] == "NVDA"
+    assert data["dividends"]["payout_ratio"] == snapshot.dividends.payout_percent
+    assert json.loads(snapshot.to_json()) == data
+
+
+def test_error_snapshot_keeps_short_form():
+    assert StockSnapshot(ticker="XXX", error="introuvable").to_dict() == {"ticker": "XXX", "error": "introuvable"}
+
+
+def test_snapshot_survives_disk_cache_round_trip(offline_yahoo, monkeypatch):
+    expected = yfinance_fetch.data_fetcher_per_stock("NVDA")
+    folder = str(offline_yahoo / "snapshots")
+    SnapshotCache(folder=folder).get("NVDA")
+
+    # Nouveau processus simule : plus de reseau, l'entree est relue depuis le fichier JSON
+    monkeypatch.setattr(yfinance, "Ticker", NoNetworkTicker)
+    monkeypatch.setattr(http_session, "_tickers", {})
+    reloaded = SnapshotCache(folder=folder)
+
+    assert reloaded.get("NVDA") == expected
+    assert reloaded.stats()["profile"]["hits"] == 1
+
+
+@pytest.mark.parametrize("group", ["quote", "news"])
+def test_partial_refetch_keeps_json_identical(offline_yahoo, group):
+    cache = SnapshotCache(folder=str(offline_yahoo / "snapshots"))
+    expected = cache.get("NVDA")
+
+    cache.invalidate("NVDA", group)
+    assert cache.get("NVDA") == expected
+    assert cache.stats()[group]["misses"] == 2
@@ -0,0 +1,44 @@
+"""
+SnapshotCache : une entree perimee est servie puis rafraichie en arriere-plan,
+sauf apres shutdown() ou plus aucun rafraichissement n'est lance.
+"""
+
+import time
+
+from tools.snapshot_cache import GROUP_TTLS, SnapshotCache
+
+
+def stale_cache(folder: str) -> SnapshotCache:
+    # Toute entree est perimee aussitot, mais servie telle quelle (rafraichie en arriere-plan)
+    return SnapshotCache(folder=folder, ttls={group: 0.01 for group in GROUP_TTLS}, stale_factor=1e6)
+
+
+def wait_for_refreshes(cache: SnapshotCache, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_stale_entry_is_refreshed_in_background(offline_yahoo):
+    cache = stale_cache(str(offline_yahoo / "snapshots"))
+    expected = cache.get("NVDA")
+    time.sleep(0.02)
+
+    assert cache.get("NVDA") == expected
+    wait_for_refreshes(cache)
+    stats = cache.stats()
+    assert stats["profile"]["stale"] == 1
+    assert stats["_global"]["refreshes"] == 1
+    cache.shutdown()
+
+
+def test_no_refresh_after_shutdown(offline_yahoo, capsys):
+    cache = stale_cache(str(offline_yahoo / "snapshots"))
+    expected = cache.get("NVDA")
+    cache.shutdown()
+    time.sleep(0.02)
+
+    assert cache.get("NVDA") == expected  # Toujours servie, sans erreur
+    assert not cache._refreshing
+    assert cache.stats()["_global"]["refreshes"] == 0
+    assert "echoue" not in capsys.readouterr().out
@@ -0,0 +1,50 @@
+"""
+Snapshot d'un ticker : les modes concurrent et sequentiel produisent le meme JSON,
+identique a celui de la version d'origine de data_fetcher_per_stock
+(fixtures/snapshot_baseline_NVDA.json, genere sur le meme FakeTicker).
+"""
+
+import json
+import os
+
+import pytest
+
+from tools import yfinance_fetch
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "fixtures", "snapshot_baseline_NVDA.json")
+NEW_KEYS = ("technical_indicators",)  # Ajoutes depuis la version d'origine
+
+
+def _baseline() -> dict:
+    with open(BASELINE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _without_new_keys(snapshot: dict) -> dict:
+    return {key: value for key, value in snapshot.items() if key not in NEW_KEYS}
+
+
+@pytest.mark.parametrize("concurrent", [True, False], ids=["concurrent", "sequential"])
+def test_snapshot_matches_baseline(offline_yahoo, concurrent):
+    snapshot = json.loads(yfinance_fetch.data_fetcher_per_stock("NVDA", concurrent=concurrent))
+    baseline = _baseline()
+
+    assert list(_without_new_keys(snapshot)) == list(baseline)  # Meme ordre de cles
+    assert _without_new_keys(snapshot) == baseline
+
+
+def test_concurrent_and_sequential_json_identical(offline_yahoo):
+    concurrent = yfinance_fetch.data_fetcher_per_stock("NVDA", concurrent=True)
+    sequential = yfinance_fetch.data_fetcher_per_stock("NVDA", concurrent=False)
+    assert concurrent == sequential
+
+
+def test_fetch_records_timings_per_sub_request(offline_yahoo):
+    yfinance_fetch.data_fetcher_per_stock("NVDA", concurrent=True)
+    timings = yfinance_fetch.get_last_fetch_timings("NVDA")
+
+    assert timings["mode"] == "concurrent"
+    assert set(yfinance_fetch.YAHOO_SUB_REQUESTS) <= set(timings)
+    # Deux news sur trois ont une URL : deux scrapes
+    assert {"article_1", "article_3"} <= set(timings) and "article_2" not in timings
@@ -0,0 +1,249 @@
+"""
+Stockage sur disque des articles scrapes, indexe par URL canonique.
+
+Pour chaque article on garde le HTML brut (gzip) et le texte extrait.
+- Un article recent est servi sans aucune requete reseau.
+- Au-dela de REVALIDATE_AFTER, une requete conditionnelle (ETag / If-Modified-Since)
+  est envoyee : un 304 evite de re-telecharger et de re-parser la page.
+- Si les regles d'extraction changent (version differente), le texte est
+  re-extrait depuis le HTML stocke, sans re-telecharger.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+ARTICLE_CACHE_DIR = os.path.join("data", "cache", "articles")
+REVALIDATE_AFTER = 6 * 3600          # Age (s) au-dela duquel on revalide aupres du serveur
+MAX_BYTES = 100 * 1024 * 1024        # Taille max du stockage sur disque
+
+# Parametres de tracking ignores dans la cle
+TRACKING_PARAMS = ("utm_", "guce", "guccounter", "ncid", "soc_src", "soc_trk", "fbclid", "gclid")
+
+
+def canonical_url(url: str) -> str:
+    """Normalise une URL : schema/hote en minuscules, sans fragment ni parametres de tracking."""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+
+class ArticleStore:
+    """
+    Un article = deux fichiers : <cle>.json (metadonnees + texte) et <cle>.html.gz (HTML brut).
+    La cle est le SHA-256 de l'URL canonique.
+    """
+
+    def __init__(self, folder: str = ARTICLE_CACHE_DIR, revalidate_after: float = REVALIDATE_AFTER,
+                 max_bytes: int = MAX_BYTES):
+        self.folder = folder
+        self.revalidate_after = revalidate_after
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "fetched": 0, "reextracted": 0, "served_on_error": 0}
+        self._total_bytes = self._disk_usage()
+
+    # === Fichiers ===
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.json")
+
+    def _html_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.html.gz")
+
+    def _disk_usage(self) -> int:
+        if not os.path.isdir(self.folder):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.folder, f)) for f in os.listdir(self.folder))
+
+    def _write(self, path: str, data: bytes):
+        """
+        Ecriture atomique via un fichier temporaire unique (deux ecritures de la meme cle
+        ne se melangent pas) ; la taille totale compte l'ancien fichier remplace.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            with self._lock:
+                try:
+                    old_size = os.path.getsize(path)
+                except OSError:
+                    old_size = 0
+                os.replace(tmp_path, path)
+                self._total_bytes += len(data) - old_size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_meta(self, record: dict):
+        self._write(self._meta_path(record["key"]), json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+    def _evict(self):
+        """Supprime les articles les moins recemment valides au-dela de max_bytes."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        records = []
+        for filename in os.listdir(self.folder):
+            if filename.endswith(".json"):
+                try:
+                    with open(os.path.join(self.folder, filename), "r", encoding="utf-8") as f:
+                        records.append(json.load(f))
+                except (json.JSONDecodeError, OSError):
+                    continue
+        for record in sorted(records, key=lambda r: r.get("validated_at", 0)):
+            if self._total_bytes <= self.max_bytes:
+                break
+            for path in (self._meta_path(record["key"]), self._html_path(record["key"])):
+                try:
+                    self._total_bytes -= os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # === Lecture ===
+
+    def load(self, url: str) -> Optional[dict]:
+        """Retourne les metadonnees stockees pour cette URL, ou None."""
+        try:
+            with open(self._meta_path(self._key(url)), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        # HTML evince : ni re-extraction ni requete conditionnelle possibles
+        return record if os.path.exists(self._html_path(record["key"])) else None
+
+    def load_html(self, record: dict) -> bytes:
+        with gzip.open(self._html_path(record["key"]), "rb") as f:
+            return f.read()
+
+    def is_fresh(self, record: Optional[dict]) -> bool:
+        """True si l'article a ete valide recemment (pas besoin de contacter le serveur)."""
+        return record is not None and time.time() - record["validated_at"] < self.revalidate_after
+
+    def conditional_headers(self, record: Optional[dict]) -> Dict[str, str]:
+        """En-tetes pour une requete conditionnelle (vides si rien n'est stocke)."""
+        headers = {}
+        if record:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def text(self, record: dict, max_chars: int, extract: Callable, extractor_version: str,
+             counter: str = "hits") -> str:
+        """
+        Texte extrait de l'article. Re-extrait depuis le HTML stocke si la version
+        de l'extracteur ou la limite de caracteres a change ; si le HTML a ete evince
+        entre-temps, le texte deja stocke est servi tel quel.
+        """
+        with self._lock:
+            self._stats[counter] += 1
+        if record.get("extractor_version") == extractor_version and record.get("max_chars") == max_chars:
+            return record["text"]
+
+        try:
+            html = self.load_html(record)
+        except OSError:
+            return record["text"][:max_chars]
+        record["text"] = extract(html, max_chars)
+        record["extractor_version"] = extractor_version
+        record["max_chars"] = max_chars
+        self._write_meta(record)
+        with self._lock:
+            self._stats["reextracted"] += 1
+        return record["text"]
+
+    # === Ecriture ===
+
+    def save(self, url: str, html: bytes, headers, text: str, max_chars: int, extractor_version: str) -> dict:
+        """Stocke une reponse 200 (HTML compresse + texte extrait + validateurs HTTP)."""
+        key = self._key(url)
+        now = time.time()
+        record = {
+            "key": key,
+            "url": canonical_url(url),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": now,
+            "validated_at": now,
+            "extractor_version": extractor_version,
+            "max_chars": max_chars,
+            "text": text,
+        }
+        self._write(self._html_path(key), gzip.compress(html))
+        self._write_meta(record)
+
+        with self._lock:
+            self._stats["fetched"] += 1
+            self._evict()
+        return record
+
+    def touch(self, record: dict):
+        """Le serveur a repondu 304 : l'article stocke est toujours valide."""
+        record["validated_at"] = time.time()
+        self._write_meta(record)
+
+    def reextract_all(self, extract: Callable, extractor_version: str) -> int:
+        """
+        Re-extrait tous les articles stockes avec une autre version de l'extracteur.
+        Les metadonnees illisibles et les articles dont le HTML a ete evince sont laisses tels quels.
+        """
+        count = 0
+        if not os.path.isdir(self.folder):
+            return count
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, filename), "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                continue
+            if record.get("extractor_version") == extractor_version:
+                continue
+            try:
+                html = self.load_html(record)
+            except OSError:
+                continue
+            record["text"] = extract(html, record.get("max_chars", 5000))
+            record["extractor_version"] = extractor_version
+            self._write_meta(record)
+            count += 1
+        return count
+
+    def stats(self) -> Dict:
+        """Compteurs : servis sans reseau, revalides (304), telecharges, re-extraits."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._total_bytes
+            return stats
+
+
+# Instance globale pour faciliter l'utilisation
+_article_store: Optional[ArticleStore] = None
+_article_store_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+    """Retourne l'instance globale du stockage d'articles."""
+    global _article_store
+    with _article_store_lock:
+        if _article_store is None:
+            _article_store = ArticleStore()
+        return _article_store
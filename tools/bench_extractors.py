@@ -0,0 +1,91 @@
+"""
+Benchmark des extracteurs d'articles : temps CPU et egalite des sorties.
+
+Par defaut, utilise les pages HTML du stockage d'articles (data/cache/articles).
+    python -m tools.bench_extractors
+    python -m tools.bench_extractors page1.html page2.html --repeat 20
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import time
+
+from tools.article_cache import ARTICLE_CACHE_DIR
+from tools.html_extract import EXTRACTORS, MAX_HTML_BYTES
+
+
+def load_pages(paths: list) -> dict:
+    """Charge les pages a comparer (fichiers .html ou .html.gz)."""
+    if not paths:
+        paths = glob.glob(os.path.join(ARTICLE_CACHE_DIR, "*.html.gz"))
+    pages = {}
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def bench(pages: dict, repeat: int = 10, max_chars: int = 5000, max_bytes: int = None) -> dict:
+    """
+    Mesure le temps CPU moyen par page de chaque extracteur et compare leurs sorties.
+    max_bytes coupe les pages comme le ferait la lecture en flux.
+    """
+    if max_bytes:
+        pages = {name: html[:max_bytes] for name, html in pages.items()}
+
+    results = {"pages": len(pages), "cpu_ms_par_page": {}, "sorties_identiques": 0, "differences": []}
+    outputs = {}
+    for backend, extract in EXTRACTORS.items():
+        try:
+            outputs[backend] = {name: extract(html, max_chars) for name, html in pages.items()}
+        except Exception as e:
+            print(f"[Bench] Backend {backend} indisponible : {e}")
+            continue
+        start = time.process_time()
+        for _ in range(repeat):
+            for html in pages.values():
+                extract(html, max_chars)
+        elapsed = time.process_time() - start
+        results["cpu_ms_par_page"][backend] = round(elapsed / max(repeat * len(pages), 1) * 1000, 2)
+
+    if "bs4" in outputs and "lxml" in outputs:
+        for name in pages:
+            if outputs["bs4"][name] == outputs["lxml"][name]:
+                results["sorties_identiques"] += 1
+            else:
+                results["differences"].append(name)
+        cpu = results["cpu_ms_par_page"]
+        if cpu.get("lxml"):
+            results["acceleration"] = round(cpu["bs4"] / cpu["lxml"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les extracteurs d'articles (bs4 vs lxml).")
+    parser.add_argument("paths", nargs="*", help="Fichiers HTML (par defaut : stockage d'articles)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-chars", type=int, default=5000)
+    parser.add_argument("--max-bytes", type=int, default=MAX_HTML_BYTES)
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths)
+    if not pages:
+        print(f"Aucune page trouvee (dossier {ARTICLE_CACHE_DIR} vide ?)")
+        return
+
+    results = bench(pages, args.repeat, args.max_chars, args.max_bytes)
+    print(f"Pages comparees: {results['pages']}")
+    for backend, ms in results["cpu_ms_par_page"].items():
+        print(f"- {backend}: {ms} ms CPU / page")
+    if "acceleration" in results:
+        print(f"Acceleration lxml: x{results['acceleration']}")
+    print(f"Sorties identiques: {results['sorties_identiques']}/{results['pages']}")
+    for name in results["differences"]:
+        print(f"  ! difference: {name}")
+
+
+if __name__ == "__main__":
+    main()
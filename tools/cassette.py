@@ -0,0 +1,239 @@
+"""
+Enregistrement / rejeu du trafic Yahoo Finance et des pages d'articles.
+
+- record : chaque reponse yfinance et chaque page scrapee est ecrite dans une cassette.
+- replay : les reponses sont relues depuis la cassette, sans reseau, dans un ordre
+  deterministe, avec une latence injectee optionnelle.
+
+Active par variables d'environnement (aucune modification de main.py / mono_agent.py) :
+    YF_CASSETTE_MODE=record python main.py
+    YF_CASSETTE_MODE=replay YF_CASSETTE_LATENCY=recorded python main.py
+
+ou dans le code :
+    with use_cassette("data/cassettes/nvda", mode="replay", latency=0.05):
+        fetch_stock_snapshot("NVDA")
+
+YF_CASSETTE_LATENCY : "recorded" (durees mesurees a l'enregistrement) ou un nombre de secondes.
+En mode cassette, les caches persistants (snapshots, articles) sont contournes.
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Union
+
+from tools.article_cache import canonical_url
+
+
+CASSETTE_DIR = os.path.join("data", "cassettes", "default")
+MODES = ("record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """Reponse absente de la cassette en mode replay."""
+
+
+class Cassette:
+    """
+    Une cassette = un dossier :
+      yahoo/<groupe>.json       reponses yfinance (groupe = ticker), par sous-requete
+      pages/<cle>.json          metadonnees d'une page (url, erreur, duree)
+      pages/<cle>.html.gz       HTML brut de la page
+    """
+
+    def __init__(self, folder: str = CASSETTE_DIR, mode: str = "replay",
+                 latency: Union[None, float, str] = None):
+        if mode not in MODES:
+            raise ValueError(f"Mode de cassette inconnu : {mode} (attendu : {', '.join(MODES)})")
+        self.folder = folder
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._groups: Dict[str, dict] = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    # === Fichiers ===
+
+    def _group_path(self, group: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', group)
+        return os.path.join(self.folder, "yahoo", f"{safe}.json")
+
+    def _page_key(self, url: str) -> str:
+        return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+    def _page_path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.folder, "pages", f"{self._page_key(url)}{suffix}")
+
+    def _load_group(self, group: str) -> dict:
+        """Entrees d'un groupe (chargees une fois, sous self._lock)."""
+        if group not in self._groups:
+            try:
+                with open(self._group_path(group), "r", encoding="utf-8") as f:
+                    self._groups[group] = json.load(f)
+            except FileNotFoundError:
+                self._groups[group] = {}
+        return self._groups[group]
+
+    @staticmethod
+    def _write_json(path: str, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False, default=_to_jsonable)
+        os.replace(f"{path}.tmp", path)
+
+    # === Latence ===
+
+    def _sleep(self, recorded_duration: float):
+        if self.latency == "recorded":
+            time.sleep(recorded_duration or 0)
+        elif self.latency:
+            time.sleep(float(self.latency))
+
+    # === Yahoo ===
+
+    def call(self, group: str, name: str, func: Callable, *args):
+        """Execute (record) ou rejoue (replay) un appel yfinance identifie par (groupe, nom)."""
+        if self.mode == "replay":
+            with self._lock:
+                entry = self._load_group(group).get(name)
+                if entry is None:
+                    self._stats["misses"] += 1
+                    raise CassetteMiss(f"{group}/{name} absent de la cassette {self.folder}")
+                self._stats["replayed"] += 1
+            self._sleep(entry.get("duration"))
+            if entry.get("error"):
+                raise RuntimeError(entry["error"])
+            return entry["value"]
+
+        start = time.perf_counter()
+        entry = {}
+        try:
+            value = func(*args)
+            entry["value"] = value
+            return value
+        except Exception as e:
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["duration"] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                self._load_group(group)[name] = entry
+                self._write_json(self._group_path(group), self._groups[group])
+                self._stats["recorded"] += 1
+
+    # === Pages ===
+
+    def page(self, url: str, download: Callable[[str], bytes]) -> bytes:
+        """HTML brut d'une page : telecharge et enregistre (record) ou relu (replay)."""
+        meta_path = self._page_path(url, ".json")
+        html_path = self._page_path(url, ".html.gz")
+
+        if self.mode == "replay":
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                with self._lock:
+                    self._stats["misses"] += 1
+                raise CassetteMiss(f"Page {url} absente de la cassette {self.folder}")
+            with self._lock:
+                self._stats["replayed"] += 1
+            self._sleep(meta.get("duration"))
+            if meta.get("error"):
+                raise RuntimeError(meta["error"])
+            with gzip.open(html_path, "rb") as f:
+                return f.read()
+
+        start = time.perf_counter()
+        meta = {"url": canonical_url(url), "error": None}
+        try:
+            html = download(url)
+            os.makedirs(os.path.dirname(html_path), exist_ok=True)
+            with gzip.open(f"{html_path}.tmp", "wb") as f:
+                f.write(html)
+            os.replace(f"{html_path}.tmp", html_path)
+            return html
+        except Exception as e:
+            meta["error"] = str(e)
+            raise
+        finally:
+            meta["duration"] = round(time.perf_counter() - start, 3)
+            self._write_json(meta_path, meta)
+            with self._lock:
+                self._stats["recorded"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def _to_jsonable(value):
+    """Types non JSON renvoyes par yfinance (scalaires NumPy, Timestamp...)."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# === Cassette active ===
+
+_active: Optional[Cassette] = None
+_env_checked = False
+_active_lock = threading.Lock()
+
+
+def get_active_cassette() -> Optional[Cassette]:
+    """Cassette active, ou None (trafic reel). Lue une fois depuis YF_CASSETTE_* au premier appel."""
+    global _active, _env_checked
+    with _active_lock:
+        if not _env_checked:
+            _env_checked = True
+            mode = os.environ.get("YF_CASSETTE_MODE", "").strip().lower()
+            if mode:
+                latency = os.environ.get("YF_CASSETTE_LATENCY") or None
+                if latency and latency != "recorded":
+                    latency = float(latency)
+                _active = Cassette(os.environ.get("YF_CASSETTE_DIR", CASSETTE_DIR), mode, latency)
+                print(f"[Cassette] Mode {mode} : {_active.folder}")
+        return _active
+
+
+def set_cassette(cassette: Optional[Cassette]):
+    """Active une cassette (None : retour au trafic reel)."""
+    global _active, _env_checked
+    with _active_lock:
+        _active = cassette
+        _env_checked = True
+
+
+@contextmanager
+def use_cassette(folder: str = CASSETTE_DIR, mode: str = "replay", latency: Union[None, float, str] = None):
+    """Active une cassette le temps d'un bloc."""
+    previous = get_active_cassette()
+    cassette = Cassette(folder, mode, latency)
+    set_cassette(cassette)
+    try:
+        yield cassette
+    finally:
+        set_cassette(previous)
+
+
+def recorded(name: str):
+    """
+    Decorateur des sous-requetes Yahoo f(data) : en mode cassette, l'appel est
+    enregistre / rejoue sous <ticker>/<name>.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(data, *args):
+            cassette = get_active_cassette()
+            if cassette is None:
+                return func(data, *args)
+            return cassette.call(data.ticker, name, func, data, *args)
+        return wrapper
+    return decorator
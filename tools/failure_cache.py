@@ -0,0 +1,207 @@
+"""
+Cache negatif des sources d'articles en echec (403, timeouts, connexions refusees).
+
+Beaucoup de sites de news repondent systematiquement 403 ou ne repondent pas : sans
+ce cache, chaque execution re-paie le timeout complet pour chacun de leurs articles.
+
+- Une URL en echec est ignoree pendant un TTL qui double a chaque nouvel echec
+  (plafonne a MAX_TTL) ; un succes efface l'entree.
+- Un domaine est ignore des que DOMAIN_MIN_FAILURES URLs distinctes y ont echoue pour
+  une raison propre au site (403/451, timeout, connexion). Un 404/410 ne concerne que
+  son URL : quelques liens morts ne bloquent pas tout un hote de news.
+- Le compteur d'echecs decroit : une entree sans nouvel echec depuis FORGET_AFTER
+  est oubliee.
+
+Chaque requete evitee est creditee de la duree moyenne des echecs mesures pour
+cette URL / ce domaine (stats()["time_saved"]).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from tools.article_cache import canonical_url
+
+
+FAILURE_CACHE_PATH = os.path.join("data", "cache", "scrape_failures.json")
+BASE_TTL = 30 * 60                  # TTL apres un premier echec (s)
+PERMANENT_BASE_TTL = 6 * 3600       # TTL pour 401/403/404/410/451 : le site refuse durablement
+MAX_TTL = 7 * 24 * 3600
+FORGET_AFTER = 14 * 24 * 3600       # Une entree sans nouvel echec est oubliee apres ce delai
+DOMAIN_MIN_FAILURES = 2             # URLs distinctes en echec avant d'ignorer tout le domaine
+DOMAIN_MAX_URLS = 20                # URLs en echec memorisees par domaine
+PERMANENT_STATUSES = (401, 403, 404, 410, 451)
+DOMAIN_STATUSES = (403, 451)        # Refus du site entier ; les autres statuts ne visent que l'URL
+CACHE_FORMAT = 2
+
+
+def _domain(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def classify_failure(error: Exception) -> str:
+    """Raison courte de l'echec : "HTTP 403", "timeout", "connexion"..."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if status:
+        return f"HTTP {status}"
+    name = type(error).__name__
+    if "Timeout" in name:
+        return "timeout"
+    if "Connect" in name or "SSL" in name:
+        return "connexion"
+    return name
+
+
+def is_source_failure(error: Exception) -> bool:
+    """Echec imputable a la source (statut HTTP, timeout, connexion), pas a notre extraction."""
+    reason = classify_failure(error)
+    return reason.startswith("HTTP ") or reason in ("timeout", "connexion")
+
+
+def is_domain_failure(reason: str) -> bool:
+    """Echec qui vise le site (refus, timeout, connexion) plutot qu'un article precis."""
+    return reason in ("timeout", "connexion") or any(reason == f"HTTP {status}" for status in DOMAIN_STATUSES)
+
+
+def _ttl(failures: int, reason: str) -> float:
+    permanent = any(reason == f"HTTP {status}" for status in PERMANENT_STATUSES)
+    base = PERMANENT_BASE_TTL if permanent else BASE_TTL
+    return min(MAX_TTL, base * 2 ** (failures - 1))
+
+
+class FailureCache:
+    """Entrees "url" (URL canonique) et "domain" (hote sans www.), persistees en JSON."""
+
+    def __init__(self, path: str = FAILURE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._stats = {"skipped_urls": 0, "skipped_domains": 0, "failures": 0, "recovered": 0,
+                       "time_saved": 0.0}
+
+    # === Fichier ===
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"url": {}, "domain": {}}
+        if content.get("format") != CACHE_FORMAT:
+            return {"url": {}, "domain": {}}
+        return {"url": content.get("url", {}), "domain": content.get("domain", {})}
+
+    def _save(self):
+        """Ecriture atomique (sous self._lock), entrees oubliees purgees."""
+        now = time.time()
+        for kind in ("url", "domain"):
+            self._entries[kind] = {key: entry for key, entry in self._entries[kind].items()
+                                   if now - entry["last_failure"] < FORGET_AFTER}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"format": CACHE_FORMAT, **self._entries}, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    # === API ===
+
+    def _blocked(self, kind: str, key: str, now: float) -> Optional[dict]:
+        entry = self._entries[kind].get(key)
+        if entry is None or entry["until"] <= now:
+            return None
+        if kind == "domain" and len(entry["urls"]) < DOMAIN_MIN_FAILURES:
+            return None
+        return entry
+
+    def check(self, url: str) -> Optional[str]:
+        """
+        Raison de l'echec recent si l'URL ou son domaine doit etre ignore, sinon None.
+        Une requete ignoree est comptee comme temps gagne.
+        """
+        now = time.time()
+        with self._lock:
+            for kind, key, counter in (("url", canonical_url(url), "skipped_urls"),
+                                       ("domain", _domain(url), "skipped_domains")):
+                entry = self._blocked(kind, key, now)
+                if entry is not None:
+                    self._stats[counter] += 1
+                    self._stats["time_saved"] += entry["cost"]
+                    return entry["reason"]
+        return None
+
+    def record_failure(self, url: str, error: Exception, duration: float):
+        """Enregistre un echec de scrape et la duree perdue (ignore les erreurs non imputables a la source)."""
+        if not is_source_failure(error):
+            return
+        reason = classify_failure(error)
+        canonical = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            self._stats["failures"] += 1
+            entry = self._entries["url"].get(canonical)
+            if entry is None or now - entry["last_failure"] >= FORGET_AFTER:
+                entry = {"failures": 0, "cost": 0.0}
+            failures = entry["failures"] + 1
+            self._entries["url"][canonical] = {
+                "failures": failures,
+                "reason": reason,
+                "last_failure": now,
+                "until": now + _ttl(failures, reason),
+                # Moyenne glissante de la duree des echecs
+                "cost": round(entry["cost"] + (duration - entry["cost"]) / failures, 3),
+            }
+
+            # Domaine : seulement les echecs propres au site, comptes par URL distincte
+            if is_domain_failure(reason):
+                domain = _domain(url)
+                entry = self._entries["domain"].get(domain)
+                if entry is None or now - entry["last_failure"] >= FORGET_AFTER:
+                    entry = {"urls": [], "samples": 0, "cost": 0.0}
+                urls = [u for u in entry["urls"] if u != canonical][-(DOMAIN_MAX_URLS - 1):] + [canonical]
+                samples = entry["samples"] + 1
+                self._entries["domain"][domain] = {
+                    "urls": urls,
+                    "samples": samples,
+                    "reason": reason,
+                    "last_failure": now,
+                    "until": now + _ttl(len(urls), reason),
+                    "cost": round(entry["cost"] + (duration - entry["cost"]) / samples, 3),
+                }
+            self._save()
+
+    def record_success(self, url: str):
+        """Un succes efface l'URL et remet le domaine a zero."""
+        with self._lock:
+            removed = [self._entries[kind].pop(key, None) is not None
+                       for kind, key in (("url", canonical_url(url)), ("domain", _domain(url)))]
+            if any(removed):
+                self._stats["recovered"] += 1
+                self._save()
+
+    def stats(self) -> Dict:
+        """Compteurs : requetes ignorees (URL / domaine), echecs, temps gagne (s), entrees actives."""
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["time_saved"] = round(stats["time_saved"], 3)
+            stats["blocked_urls"] = sum(1 for key in self._entries["url"] if self._blocked("url", key, now))
+            stats["blocked_domains"] = sum(1 for key in self._entries["domain"] if self._blocked("domain", key, now))
+        return stats
+
+
+# Instance globale pour faciliter l'utilisation
+_failure_cache: Optional[FailureCache] = None
+_failure_cache_lock = threading.Lock()
+
+
+def get_failure_cache() -> FailureCache:
+    """Retourne l'instance globale du cache negatif."""
+    global _failure_cache
+    with _failure_cache_lock:
+        if _failure_cache is None:
+            _failure_cache = FailureCache()
+        return _failure_cache
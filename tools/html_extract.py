@@ -0,0 +1,239 @@
+"""
+Extracteurs de texte pour les articles scrapes.
+
+Deux backends interchangeables, meme format de sortie :
+- "bs4"  : BeautifulSoup + html.parser (pur Python), l'extracteur historique ;
+- "lxml" : parseur C de lxml, suppression du bruit en un seul parcours de l'arbre.
+
+Le HTML est lu en flux et coupe a MAX_HTML_BYTES : on ne garde de toute facon
+que max_chars caracteres de texte.
+
+Comparaison des deux backends (temps CPU et egalite des sorties) :
+    python -m tools.bench_extractors
+
+Les parseurs ne sont importes qu'a la premiere extraction.
+"""
+
+import importlib.util
+from functools import lru_cache
+from typing import Callable
+
+
+EXTRACTOR_BACKEND = "auto"        # "auto" (lxml si installe), "lxml" ou "bs4"
+EXTRACTION_RULES_VERSION = 1      # A incrementer quand les regles d'extraction changent
+MAX_HTML_BYTES = 512 * 1024       # Budget d'octets lus par page
+CHUNK_SIZE = 64 * 1024
+
+BOILERPLATE_TAGS = ('script', 'style', 'nav', 'footer', 'aside', 'header',
+                    'form', 'button', 'iframe', 'noscript')
+AD_CLASS_WORDS = ('ad', 'cookie', 'banner', 'popup', 'newsletter', 'sidebar')
+
+
+def _assemble_text(titles: list, paragraphs: list, lists: list, max_chars: int) -> str:
+    """Mise en forme commune a tous les extracteurs."""
+    # Assembler le contenu
+    content_parts = []
+
+    if titles:
+        content_parts.append("TITRES: " + " // ".join(titles[:3]))
+
+    if paragraphs:
+        content_parts.append("CONTENU: " + " ".join(paragraphs))
+
+    if lists:
+        content_parts.append("POINTS CLES: " + " // ".join(lists[:3]))
+
+    full_text = "\n".join(content_parts)
+
+    # Nettoyer les espaces multiples
+    full_text = " ".join(full_text.split())
+
+    # Limiter la taille (5000 caractères par défaut)
+    if len(full_text) > max_chars:
+        return full_text[:max_chars] + "... [Article tronque]"
+
+    return full_text if full_text else "Contenu non extractible"
+
+
+def extract_bs4(html, max_chars: int = 5000) -> str:
+    """
+    Extracteur historique : BeautifulSoup + html.parser (pur Python).
+    Récupère les paragraphes, titres et listes pour un contexte riche.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Supprimer les éléments non pertinents (scripts, styles, nav, footer, ads)
+    for element in soup(list(BOILERPLATE_TAGS)):
+        element.decompose()
+
+    # Supprimer les divs de pub/cookies courants
+    for div in soup.find_all(['div', 'section'], class_=lambda x: x and any(
+        word in str(x).lower() for word in AD_CLASS_WORDS
+    )):
+        div.decompose()
+
+    # Récupérer le contenu principal (article, main, ou body)
+    main_content = soup.find('article') or soup.find('main') or soup.find('body')
+
+    if not main_content:
+        main_content = soup
+
+    # Extraire les titres (h1, h2, h3)
+    titles = []
+    for h in main_content.find_all(['h1', 'h2', 'h3']):
+        text = h.get_text(strip=True)
+        if len(text) > 10:
+            titles.append(f"[{h.name.upper()}] {text}")
+
+    # Extraire les paragraphes
+    paragraphs = []
+    for p in main_content.find_all('p'):
+        text = p.get_text(strip=True)
+        if len(text) > 30:  # Ignorer les textes trop courts
+            paragraphs.append(text)
+
+    # Extraire les listes (ul, ol)
+    lists = []
+    for ul in main_content.find_all(['ul', 'ol']):
+        items = [li.get_text(strip=True) for li in ul.find_all('li') if len(li.get_text(strip=True)) > 20]
+        if items:
+            lists.append(" | ".join(items[:5]))  # Max 5 items par liste
+
+    return _assemble_text(titles, paragraphs, lists, max_chars)
+
+
+def _lxml_text(element) -> str:
+    """Equivalent de get_text(strip=True) de BeautifulSoup."""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def _decode(html):
+    """Decode en UTF-8 ; un caractere coupe par le budget d'octets est ignore."""
+    if isinstance(html, str):
+        return html
+    try:
+        return html.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start >= len(html) - 3:
+            return html[:e.start].decode("utf-8")
+        return html  # Autre encodage : lxml lit la balise meta charset
+
+
+def extract_lxml(html, max_chars: int = 5000) -> str:
+    """
+    Extracteur rapide : parseur lxml, et un seul parcours de l'arbre pour
+    supprimer scripts, navigation, commentaires et blocs de pub/cookies.
+    """
+    import lxml.etree
+    import lxml.html
+
+    html = _decode(html)
+    if not html or not html.strip():
+        return "Contenu non extractible"
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ValueError:
+        # Chaine unicode avec declaration d'encodage XML : on repasse par les octets
+        root = lxml.html.document_fromstring(html.encode("utf-8"))
+    except lxml.etree.ParserError:
+        return "Contenu non extractible"
+
+    # Un seul parcours : on marque tout le bruit, puis on le retire (le texte qui suit est garde)
+    to_drop = []
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            to_drop.append(element)  # Commentaires, instructions de traitement
+        elif tag in BOILERPLATE_TAGS:
+            to_drop.append(element)
+        elif tag in ('div', 'section'):
+            classes = element.get('class')
+            if classes and any(word in classes.lower() for word in AD_CLASS_WORDS):
+                to_drop.append(element)
+    for element in to_drop:
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    # Récupérer le contenu principal (article, main, ou body)
+    main_content = root
+    for tag in ('article', 'main', 'body'):
+        element = next(root.iter(tag), None)
+        if element is not None:
+            main_content = element
+            break
+
+    titles = []
+    paragraphs = []
+    lists = []
+    for element in main_content.iter('h1', 'h2', 'h3', 'p', 'ul', 'ol'):
+        tag = element.tag
+        if tag == 'p':
+            text = _lxml_text(element)
+            if len(text) > 30:
+                paragraphs.append(text)
+        elif tag in ('ul', 'ol'):
+            items = [text for text in (_lxml_text(li) for li in element.iter('li')) if len(text) > 20]
+            if items:
+                lists.append(" | ".join(items[:5]))
+        else:
+            text = _lxml_text(element)
+            if len(text) > 10:
+                titles.append(f"[{tag.upper()}] {text}")
+
+    return _assemble_text(titles, paragraphs, lists, max_chars)
+
+
+EXTRACTORS = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+}
+
+
+@lru_cache(maxsize=None)
+def _lxml_installed() -> bool:
+    return importlib.util.find_spec("lxml") is not None
+
+
+def backend_name() -> str:
+    if EXTRACTOR_BACKEND == "auto":
+        return "lxml" if _lxml_installed() else "bs4"
+    return EXTRACTOR_BACKEND
+
+
+def get_extractor(name: str = None) -> Callable:
+    """Retourne l'extracteur demande (par defaut celui de EXTRACTOR_BACKEND)."""
+    return EXTRACTORS[name or backend_name()]
+
+
+def extractor_version() -> str:
+    """Identifie backend + regles : un changement declenche la re-extraction des articles stockes."""
+    return f"{backend_name()}-{EXTRACTION_RULES_VERSION}"
+
+
+def read_capped(response, max_bytes: int = MAX_HTML_BYTES) -> bytes:
+    """Lit une reponse requests (stream=True) jusqu'a max_bytes, puis ferme la connexion."""
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+    finally:
+        response.close()
+    return b"".join(chunks)[:max_bytes]
+
+
+async def aread_capped(response, max_bytes: int = MAX_HTML_BYTES) -> bytes:
+    """Equivalent asynchrone de read_capped pour une reponse aiohttp."""
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    return b"".join(chunks)[:max_bytes]
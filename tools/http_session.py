@@ -0,0 +1,154 @@
+"""
+Couche de sessions HTTP partagees pour le scraping et Yahoo Finance.
+
+- Une seule requests.Session (pool keep-alive) pour tous les scrapes d'articles :
+  chaque article ne paie plus son propre handshake TCP/TLS.
+- Au plus PER_HOST_MAX_CONNECTIONS requetes simultanees par domaine de news.
+- Les objets yf.Ticker sont reutilises quelques secondes et partagent une meme
+  session Yahoo, donc le meme cookie / crumb pour tous les tickers.
+
+requests, yfinance et aiohttp ne sont importes qu'a la premiere utilisation.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+from tools.rate_limit import get_rate_limiter, response_status_check
+
+if TYPE_CHECKING:
+    import requests
+    import yfinance as yf
+
+
+PER_HOST_MAX_CONNECTIONS = 2    # Connexions simultanees max par domaine (politesse)
+POOL_CONNECTIONS = 32           # Nombre de domaines gardes dans le pool keep-alive
+TICKER_TTL = 30                 # Duree de reutilisation d'un yf.Ticker (s) : il met info/news en cache
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+_aiohttp = None
+_aiohttp_checked = False
+
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+
+def get_http_session() -> "requests.Session":
+    """Session requests partagee par tout le processus (pool de connexions keep-alive)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            import urllib3
+            from requests.adapters import HTTPAdapter
+
+            # Les scrapes se font avec verify=False : on coupe l'avertissement associe
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            _session = requests.Session()
+            # Pool non bloquant : le plafond par hote est tenu par host_slot. Avec pool_block=True
+            # (sans delai d'attente possible via requests), une reponse jamais fermee bloquait
+            # pour toujours les requetes suivantes vers l'hote ; ici elle coute une connexion de plus.
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=PER_HOST_MAX_CONNECTIONS,
+                                  pool_block=False)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+@contextmanager
+def host_slot(url: str):
+    """Reserve une des PER_HOST_MAX_CONNECTIONS places du domaine de l'URL."""
+    host = urlsplit(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_MAX_CONNECTIONS)
+    with slot:
+        yield
+
+
+def _get(url: str, **kwargs) -> "requests.Response":
+    with host_slot(url):
+        return get_http_session().get(url, **kwargs)
+
+
+def polite_get(url: str, **kwargs) -> "requests.Response":
+    """
+    GET via la session partagee, en respectant la limite par domaine et le debit
+    global des news (429/5xx re-tentes avec backoff, voir tools.rate_limit).
+    """
+    return get_rate_limiter().call("news", _get, url, retry_if=response_status_check, **kwargs)
+
+
+def get_aiohttp():
+    """Module aiohttp s'il est installe (optionnel : scrapes asynchrones natifs), sinon None."""
+    global _aiohttp, _aiohttp_checked
+    if not _aiohttp_checked:
+        try:
+            import aiohttp
+            _aiohttp = aiohttp
+        except ImportError:
+            _aiohttp = None
+        _aiohttp_checked = True
+    return _aiohttp
+
+
+def new_async_session(headers: dict = None):
+    """
+    Session aiohttp avec keep-alive et la meme limite par domaine.
+    A creer dans la boucle d'evenements qui l'utilise.
+    """
+    aiohttp = get_aiohttp()
+    connector = aiohttp.TCPConnector(limit_per_host=PER_HOST_MAX_CONNECTIONS, ssl=False)
+    return aiohttp.ClientSession(headers=headers, connector=connector)
+
+
+# === YAHOO FINANCE ===
+
+_yahoo_session = None
+_yahoo_session_ready = False
+_tickers: Dict[str, tuple] = {}  # symbole -> (yf.Ticker, date de creation)
+_tickers_lock = threading.Lock()
+
+
+def get_yahoo_session():
+    """
+    Session partagee par tous les yf.Ticker : le cookie et le crumb Yahoo ne sont
+    negocies qu'une fois. Les versions recentes de yfinance exigent curl_cffi ;
+    s'il n'est pas installe, yfinance garde sa propre session globale (None).
+    """
+    global _yahoo_session, _yahoo_session_ready
+    with _session_lock:
+        if not _yahoo_session_ready:
+            try:
+                from curl_cffi import requests as curl_requests
+                _yahoo_session = curl_requests.Session(impersonate="chrome")
+            except ImportError:
+                _yahoo_session = None
+            _yahoo_session_ready = True
+        return _yahoo_session
+
+
+def get_ticker(symbol: str) -> "yf.Ticker":
+    """
+    yf.Ticker reutilise pendant TICKER_TTL secondes. Au-dela on en recree un :
+    yfinance garde info et news en memoire dans l'objet.
+    """
+    import yfinance as yf
+
+    now = time.time()
+    with _tickers_lock:
+        cached = _tickers.get(symbol)
+        if cached and now - cached[1] < TICKER_TTL:
+            return cached[0]
+        # Menage des tickers expires
+        for key in [k for k, (_, created) in _tickers.items() if now - created >= TICKER_TTL]:
+            del _tickers[key]
+        ticker = yf.Ticker(symbol, session=get_yahoo_session())
+        _tickers[symbol] = (ticker, now)
+        return ticker
@@ -0,0 +1,131 @@
+"""
+Budget de temps d'import des modules de fetch.
+
+Chaque module est importe dans un processus neuf ; on verifie :
+- que l'import reste sous son budget (meilleur temps sur --repeat essais) ;
+- qu'aucune dependance lourde (yfinance, pandas, numpy, requests, bs4, lxml, aiohttp)
+  n'est chargee avant le premier fetch ;
+- pour les points d'entree, langchain est importe avant la mesure : son temps et ses
+  propres dependances sont exclus, tout le reste est controle comme ci-dessus ;
+- que l'import ne modifie pas l'environnement (variables SSL).
+
+    python -m tools.import_budget
+    python -m tools.import_budget --entrypoints      # ajoute main.py et mono_agent.py
+    python -m pytest tests/test_import_budget.py     # memes controles, sous pytest
+
+Code de sortie 1 si un budget est depasse. Un module dont une dependance optionnelle
+n'est pas installee (ex : langchain pour les points d'entree) est signale et ignore.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Module -> budget (ms)
+IMPORT_BUDGETS_MS = {
+    "tools.yfinance_fetch": 150,
+    "tools.snapshot_cache": 150,
+}
+# Points d'entree, hors langchain (prechargee, seule exemptee)
+ENTRYPOINT_BUDGETS_MS = {
+    "main": 300,
+    "mono_agent": 300,
+}
+ENTRYPOINT_PRELOAD = ("langchain_core.messages", "langchain.messages", "langchain_ollama")
+
+HEAVY_MODULES = ("yfinance", "pandas", "numpy", "requests", "bs4", "lxml", "aiohttp", "curl_cffi")
+SSL_ENV_VARS = ("CURL_CA_BUNDLE", "REQUESTS_CA_BUNDLE", "SSL_CERT_FILE")
+LOCAL_MODULES = ("tools", "agents", "main", "mono_agent")  # Un import manquant de ces modules est une erreur
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import importlib, json, os, sys, time
+for name in {preload!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+exempt = set(sys.modules)
+env_before = {{k: os.environ.get(k) for k in {env!r}}}
+start = time.perf_counter()
+try:
+    import {module}
+except ModuleNotFoundError as e:
+    print(json.dumps({{"missing": e.name}}))
+    sys.exit(0)
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "ms": elapsed,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules and m not in exempt),
+    "env_changed": [k for k, v in env_before.items() if os.environ.get(k) != v],
+}}))
+"""
+
+
+def measure(module: str, repeat: int = 3, preload: tuple = ()) -> dict:
+    """
+    Importe `module` dans `repeat` processus neufs (apres `preload`) ; garde le meilleur temps.
+    Retourne {"missing": nom} si une dependance externe n'est pas installee, {"error": ...} si l'import echoue.
+    """
+    best = None
+    for _ in range(repeat):
+        probe = _PROBE.format(module=module, heavy=HEAVY_MODULES, env=SSL_ENV_VARS, preload=preload)
+        completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=ROOT)
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "erreur inconnue"
+            return {"error": error}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if "missing" in result:
+            if (result["missing"] or "").split(".")[0] in LOCAL_MODULES:
+                return {"error": f"module introuvable : {result['missing']}"}
+            return result
+        if best is None or result["ms"] < best["ms"]:
+            best = result
+    best["ms"] = round(best["ms"], 1)
+    return best
+
+
+def check(budgets: dict, repeat: int, preload: tuple = ()) -> bool:
+    ok = True
+    for module, budget in budgets.items():
+        result = measure(module, repeat, preload)
+        if "error" in result:
+            print(f"- {module}: import impossible ({result['error']})")
+            ok = False
+            continue
+        if "missing" in result:
+            print(f"- {module}: ignore (dependance absente : {result['missing']})")
+            continue
+
+        problems = []
+        if result["ms"] > budget:
+            problems.append(f"budget {budget} ms depasse")
+        if result["heavy"]:
+            problems.append(f"modules lourds charges : {', '.join(result['heavy'])}")
+        if result["env_changed"]:
+            problems.append(f"environnement modifie : {', '.join(result['env_changed'])}")
+
+        status = "OK" if not problems else "ECHEC"
+        print(f"- {module}: {result['ms']} ms (budget {budget} ms) {status}")
+        for problem in problems:
+            print(f"    ! {problem}")
+        ok = ok and not problems
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifie le temps d'import des modules de fetch.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--entrypoints", action="store_true", help="Mesure aussi main.py et mono_agent.py")
+    args = parser.parse_args()
+
+    ok = check(IMPORT_BUDGETS_MS, args.repeat)
+    if args.entrypoints:
+        ok = check(ENTRYPOINT_BUDGETS_MS, args.repeat, ENTRYPOINT_PRELOAD) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Indicateurs techniques et de risque calcules en NumPy sur l'historique de cours.
+
+Un seul passage vectorise sur les tableaux de clotures / volumes : moyennes mobiles,
+RSI, performances, volatilite realisee, drawdown maximal, z-score de volume et VaR
+historique. Les agents recoivent ces faits deja calcules au lieu de les deviner.
+
+Un indicateur est None si l'historique est trop court pour le calculer.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from tools.snapshot import TechnicalIndicators
+
+
+TRADING_DAYS = 252          # Seances par an (annualisation, fenetres 1 an)
+MONTH_DAYS = 21
+SMA_WINDOWS = (20, 50, 200)
+RSI_PERIOD = 14
+VOLUME_WINDOW = 20
+
+
+def _pct(value) -> Optional[float]:
+    return None if value is None else round(float(value) * 100, 2)
+
+
+def _sma(cumsum: np.ndarray, window: int) -> Optional[float]:
+    """Moyenne des `window` derniers points a partir des sommes cumulees (cumsum[0] = 0)."""
+    if len(cumsum) - 1 < window:
+        return None
+    return round(float((cumsum[-1] - cumsum[-1 - window]) / window), 4)
+
+
+def _wilder_rsi(deltas: np.ndarray, period: int = RSI_PERIOD) -> Optional[float]:
+    """
+    RSI de Wilder, forme fermee de la moyenne lissee :
+    avg_N = (1-a)^(N-p) * moyenne(p premiers) + somme a(1-a)^(N-t) x_t, a = 1/p.
+    """
+    if len(deltas) < period:
+        return None
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    alpha = 1.0 / period
+    rest = len(deltas) - period
+    decay = (1 - alpha) ** np.arange(rest - 1, -1, -1)
+    avg_gain = (1 - alpha) ** rest * gains[:period].mean() + alpha * np.dot(decay, gains[period:])
+    avg_loss = (1 - alpha) ** rest * losses[:period].mean() + alpha * np.dot(decay, losses[period:])
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return round(float(100 - 100 / (1 + avg_gain / avg_loss)), 2)
+
+
+def _period_return(close: np.ndarray, days: int) -> Optional[float]:
+    if len(close) <= days:
+        return None
+    return close[-1] / close[-1 - days] - 1
+
+
+def _volatility(log_returns: np.ndarray, days: int) -> Optional[float]:
+    """Volatilite realisee annualisee sur les `days` derniers rendements."""
+    if len(log_returns) < days:
+        return None
+    return log_returns[-days:].std(ddof=1) * np.sqrt(TRADING_DAYS)
+
+
+def compute_indicators(close, volume=None) -> Optional[TechnicalIndicators]:
+    """
+    Calcule tous les indicateurs a partir des clotures (et des volumes) tries par date.
+    Accepte des tableaux NumPy, des listes ou des array('d').
+    """
+    close = np.asarray(close, dtype=np.float64)
+    close = close[np.isfinite(close)]
+    if len(close) < 2:
+        return None
+
+    cumsum = np.concatenate(([0.0], np.cumsum(close)))
+    log_returns = np.diff(np.log(close))
+    simple_returns = np.expm1(log_returns)
+    last = float(close[-1])
+
+    sma = {window: _sma(cumsum, window) for window in SMA_WINDOWS}
+
+    # Drawdown et VaR sur la derniere annee disponible
+    year_close = close[-(TRADING_DAYS + 1):]
+    drawdowns = year_close / np.maximum.accumulate(year_close) - 1
+    year_returns = simple_returns[-TRADING_DAYS:]
+    var_95, var_99 = (-np.percentile(year_returns, [5, 1])) if len(year_returns) >= MONTH_DAYS else (None, None)
+
+    volume_zscore = None
+    if volume is not None:
+        volume = np.asarray(volume, dtype=np.float64)
+        if len(volume) > VOLUME_WINDOW:
+            window = volume[-VOLUME_WINDOW - 1:-1]
+            std = window.std(ddof=1)
+            if std > 0:
+                volume_zscore = round(float((volume[-1] - window.mean()) / std), 2)
+
+    return TechnicalIndicators(
+        history_days=int(len(close)),
+        last_close=round(last, 4),
+        sma_20=sma[20],
+        sma_50=sma[50],
+        sma_200=sma[200],
+        price_vs_sma_50_pct=_pct(last / sma[50] - 1) if sma[50] else None,
+        price_vs_sma_200_pct=_pct(last / sma[200] - 1) if sma[200] else None,
+        rsi_14=_wilder_rsi(np.diff(close)),
+        return_1m_pct=_pct(_period_return(close, MONTH_DAYS)),
+        return_3m_pct=_pct(_period_return(close, 3 * MONTH_DAYS)),
+        return_1y_pct=_pct(_period_return(close, TRADING_DAYS)),
+        volatility_1m_pct=_pct(_volatility(log_returns, MONTH_DAYS)),
+        volatility_1y_pct=_pct(_volatility(log_returns, TRADING_DAYS)),
+        max_drawdown_1y_pct=_pct(drawdowns.min()),
+        volume_zscore_20d=volume_zscore,
+        var_95_1d_pct=_pct(var_95),
+        var_99_1d_pct=_pct(var_99),
+    )
@@ -0,0 +1,312 @@
+"""
+Stockage local en colonnes des cours journaliers (OHLCV) par ticker.
+
+Chaque colonne est un fichier .npy relu directement en tableau NumPy : on peut
+travailler sur des annees d'historique sans les re-telecharger et sans garder de
+DataFrame pandas.
+Une synchronisation ne telecharge que les jours manquants depuis la derniere.
+
+Les cours sont ajustes (dividendes, splits) par Yahoo : quelques jours deja stockes
+sont re-telecharges a chaque synchronisation, et s'ils ne correspondent plus
+(nouveau dividende ou split), tout l'historique est re-telecharge.
+
+Usage:
+    bars = get_price_store().load("NVDA")           # synchronise si besoin
+    bars.close[-250:]                                # un an de clotures
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from tools.http_session import get_ticker
+from tools.rate_limit import frame_not_empty, get_rate_limiter
+
+
+PRICE_STORE_DIR = os.path.join("data", "cache", "prices")
+HISTORY_PERIOD = "5y"           # Profondeur du premier telechargement
+SYNC_INTERVAL = 15 * 60         # Pas de nouvelle synchronisation avant ce delai (s)
+OVERLAP_DAYS = 7                # Jours deja stockes re-telecharges pour detecter un re-ajustement
+ADJUST_TOLERANCE = 1e-4         # Ecart relatif toleré sur les clotures deja stockees
+STORE_FORMAT = 1
+
+COLUMNS = {
+    "open": ("Open", np.float64),
+    "high": ("High", np.float64),
+    "low": ("Low", np.float64),
+    "close": ("Close", np.float64),
+    "volume": ("Volume", np.int64),
+}
+
+
+@dataclass(slots=True)
+class PriceBars:
+    """Barres journalieres d'un ticker (tableaux NumPy alignes sur dates)."""
+    ticker: str
+    dates: np.ndarray       # datetime64[D]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def tail(self, days: int) -> "PriceBars":
+        return PriceBars(self.ticker, *(getattr(self, name)[-days:] for name in ("dates", *COLUMNS)))
+
+    def recent(self, days: int) -> "PriceBars":
+        """Barres des `days` derniers jours calendaires (comme period="1mo" pour 30)."""
+        if not len(self.dates):
+            return self
+        mask = self.dates > self.dates[-1] - np.timedelta64(days, "D")
+        return PriceBars(self.ticker, *(getattr(self, name)[mask] for name in ("dates", *COLUMNS)))
+
+    def to_columns(self) -> dict:
+        """Format des sous-requetes d'historique du snapshot."""
+        return {
+            "dates": [str(date) for date in self.dates],
+            "close": self.close.tolist(),
+            "volume": self.volume.tolist(),
+        }
+
+
+def _frame_to_columns(frame) -> Dict[str, np.ndarray]:
+    """DataFrame OHLCV yfinance -> colonnes NumPy (le DataFrame peut etre libere ensuite)."""
+    frame = frame.dropna(subset=["Close"])
+    columns = {"dates": np.array(frame.index.strftime("%Y-%m-%d"), dtype="datetime64[D]")}
+    for name, (source, dtype) in COLUMNS.items():
+        values = frame[source].to_numpy(dtype=np.float64)
+        if dtype is np.int64:
+            values = np.nan_to_num(values)
+        columns[name] = values.astype(dtype)
+    return columns
+
+
+class PriceStore:
+    """
+    Un ticker = un dossier contenant une colonne par fichier (.npy) et meta.json
+    (nombre de lignes, derniere date, date de derniere synchronisation).
+    """
+
+    def __init__(self, folder: str = PRICE_STORE_DIR, period: str = HISTORY_PERIOD,
+                 sync_interval: float = SYNC_INTERVAL):
+        self.folder = folder
+        self.period = period
+        self.sync_interval = sync_interval
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._stats = {"syncs": 0, "skipped": 0, "full_downloads": 0, "rows_fetched": 0, "readjusted": 0}
+        self._stats_lock = threading.Lock()
+
+    # === Fichiers ===
+
+    def _dir(self, ticker: str) -> str:
+        return os.path.join(self.folder, re.sub(r'[^A-Za-z0-9._-]', '_', ticker))
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _read_meta(self, ticker: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(ticker), "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            return meta if meta.get("format") == STORE_FORMAT else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _read_columns(self, ticker: str) -> Dict[str, np.ndarray]:
+        """
+        Colonnes lues en entier, sans memoire mappee : sous Windows, un fichier mappe ne
+        pourrait plus etre remplace par _write tant que des barres le referencent.
+        """
+        folder = self._dir(ticker)
+        return {name: np.load(os.path.join(folder, f"{name}.npy")) for name in ("dates", *COLUMNS)}
+
+    def _write(self, ticker: str, columns: Dict[str, np.ndarray]):
+        """Ecriture atomique de chaque colonne, meta.json en dernier."""
+        folder = self._dir(ticker)
+        os.makedirs(folder, exist_ok=True)
+        for name, values in columns.items():
+            path = os.path.join(folder, f"{name}.npy")
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, values)
+            os.replace(f"{path}.tmp", path)
+        meta = {
+            "format": STORE_FORMAT,
+            "ticker": ticker,
+            "rows": int(len(columns["dates"])),
+            "first_date": str(columns["dates"][0]) if len(columns["dates"]) else None,
+            "last_date": str(columns["dates"][-1]) if len(columns["dates"]) else None,
+            "last_sync": time.time(),
+        }
+        meta_path = os.path.join(folder, "meta.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def _count(self, counter: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[counter] += value
+
+    # === Synchronisation ===
+
+    def _needs_sync(self, meta: Optional[dict], force: bool) -> bool:
+        return force or meta is None or time.time() - meta["last_sync"] >= self.sync_interval
+
+    def _sync_start(self, meta: dict) -> str:
+        """Premier jour a re-telecharger : quelques jours avant la derniere barre stockee."""
+        last = np.datetime64(meta["last_date"], "D")
+        return str(last - np.timedelta64(OVERLAP_DAYS, "D"))
+
+    def _merge(self, ticker: str, meta: Optional[dict], fetched: Dict[str, np.ndarray]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Fusionne les barres telechargees avec celles stockees.
+        Retourne None si les clotures deja stockees ont ete re-ajustees (re-telechargement complet).
+        """
+        if meta is None:
+            return fetched
+        stored = self._read_columns(ticker)
+        if not len(fetched["dates"]):
+            return stored
+
+        first_new = fetched["dates"][0]
+        keep = stored["dates"] < first_new
+        # Comparaison sur le recouvrement, hors derniere barre stockee (seance eventuellement en cours)
+        overlap_dates = stored["dates"][~keep][:-1]
+        if len(overlap_dates):
+            old_close = stored["close"][~keep][:-1]
+            new_close = fetched["close"][np.isin(fetched["dates"], overlap_dates)]
+            if len(new_close) != len(old_close) or not np.allclose(new_close, old_close, rtol=ADJUST_TOLERANCE):
+                return None
+        return {name: np.concatenate([stored[name][keep], fetched[name]]) for name in stored}
+
+    def _download(self, ticker: str, start: Optional[str]) -> Dict[str, np.ndarray]:
+        window = {"period": self.period} if start is None else {"start": start}
+        frame = get_rate_limiter().call("yahoo", get_ticker(ticker).history, auto_adjust=True,
+                                        retry_if=frame_not_empty, **window)
+        return _frame_to_columns(frame)
+
+    def _apply(self, ticker: str, meta: Optional[dict], fetched: Dict[str, np.ndarray]):
+        """Enregistre le resultat d'un telechargement (incremental ou complet)."""
+        self._count("rows_fetched", len(fetched["dates"]))
+        merged = self._merge(ticker, meta, fetched)
+        if merged is None:
+            self._count("readjusted")
+            merged = self._download(ticker, None)
+            self._count("full_downloads")
+            self._count("rows_fetched", len(merged["dates"]))
+        self._count("syncs")
+        if len(merged["dates"]):
+            self._write(ticker, merged)
+
+    def sync(self, ticker: str, force: bool = False) -> bool:
+        """
+        Telecharge les jours manquants d'un ticker.
+        Retourne False si le ticker a ete synchronise il y a moins de sync_interval.
+        """
+        with self._lock(ticker):
+            meta = self._read_meta(ticker)
+            if not self._needs_sync(meta, force):
+                self._count("skipped")
+                return False
+            if meta is None:
+                self._count("full_downloads")
+            fetched = self._download(ticker, None if meta is None else self._sync_start(meta))
+            self._apply(ticker, meta, fetched)
+            return True
+
+    def sync_many(self, tickers: list, force: bool = False) -> list:
+        """
+        Synchronise plusieurs tickers avec au plus deux telechargements groupes :
+        un pour les tickers absents (historique complet), un pour les mises a jour.
+        Retourne les tickers effectivement synchronises.
+        """
+        metas = {ticker: self._read_meta(ticker) for ticker in tickers}
+        to_sync = [t for t in tickers if self._needs_sync(metas[t], force)]
+        self._count("skipped", len(tickers) - len(to_sync))
+
+        new = [t for t in to_sync if metas[t] is None]
+        updates = [t for t in to_sync if metas[t] is not None]
+        downloads = []
+        if new:
+            downloads.append((new, {"period": self.period}))
+            self._count("full_downloads", len(new))
+        if updates:
+            downloads.append((updates, {"start": min(self._sync_start(metas[t]) for t in updates)}))
+
+        import yfinance as yf
+
+        synced = []
+        for group, window in downloads:
+            frame = get_rate_limiter().call("yahoo", yf.download, group, group_by="ticker", auto_adjust=True,
+                                            threads=True, progress=False, retry_if=frame_not_empty, **window)
+            if frame is None or frame.empty:
+                continue
+            for ticker in group:
+                if frame.columns.nlevels > 1:
+                    if ticker not in frame.columns.get_level_values(0):
+                        continue
+                    sub = frame[ticker]
+                else:
+                    sub = frame
+                with self._lock(ticker):
+                    self._apply(ticker, metas[ticker], _frame_to_columns(sub))
+                synced.append(ticker)
+            del frame
+        return synced
+
+    # === Lecture ===
+
+    def has(self, ticker: str) -> bool:
+        return self._read_meta(ticker) is not None
+
+    def load(self, ticker: str, days: int = None, sync: bool = True) -> Optional[PriceBars]:
+        """
+        Barres journalieres du ticker (les `days` dernieres si precise).
+        Synchronise d'abord si necessaire ; None si aucune donnee.
+        """
+        if sync:
+            self.sync(ticker)
+        with self._lock(ticker):
+            if self._read_meta(ticker) is None:
+                return None
+            bars = PriceBars(ticker, **self._read_columns(ticker))
+        return bars.tail(days) if days else bars
+
+    def recent_columns(self, ticker: str, days: int = 30, sync: bool = True) -> dict:
+        """
+        Barres des `days` derniers jours calendaires (comme period="1mo"),
+        au format des sous-requetes d'historique du snapshot.
+        """
+        bars = self.load(ticker, days, sync)
+        if bars is None:
+            return {"dates": [], "close": [], "volume": []}
+        return bars.recent(days).to_columns()
+
+    def stats(self) -> Dict:
+        """Compteurs : synchronisations, evitees, telechargements complets, lignes recues."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+# Instance globale pour faciliter l'utilisation
+_price_store: Optional[PriceStore] = None
+_price_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """Retourne l'instance globale du stockage de cours."""
+    global _price_store
+    with _price_store_lock:
+        if _price_store is None:
+            _price_store = PriceStore()
+        return _price_store
@@ -0,0 +1,304 @@
+"""
+Limiteur de debit partage par tout le processus pour les appels Yahoo et news.
+
+- Un seau a jetons par source ("yahoo", "news") : les appels concurrents sont
+  espaces au lieu de partir en rafale et de declencher des 429.
+- Debit adaptatif : un 429 divise le debit par deux, chaque succes le fait
+  remonter progressivement vers le debit nominal.
+- Les erreurs transitoires (429, 5xx, connexion coupee, reponse vide) sont
+  re-tentees avec un backoff exponentiel a jitter complet.
+
+Les compteurs (attente en file, re-tentatives, 429) sont repris dans les
+timings du fetch, donc dans les metriques de l'analyse.
+"""
+
+import functools
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+# Source -> (debit nominal en requetes/s, rafale max)
+# Yahoo : un fetch complet (7 sous-requetes) tient dans la rafale, et un lot de 50 tickers
+# (~300 sous-requetes, l'historique groupe compte pour une) prend ~13 s de file au lieu de 75 s.
+# Le debit adaptatif se replie de lui-meme si Yahoo repond 429.
+RATE_LIMITS = {
+    "yahoo": (20.0, 40),
+    "news": (10.0, 10),
+}
+MIN_RATE_FACTOR = 0.125     # Le debit adaptatif ne descend pas sous 1/8 du nominal
+RECOVERY_STEP = 0.05        # Fraction du debit nominal regagnee a chaque succes
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5          # Secondes ; doublee a chaque tentative
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_OPEN_CHECKPOINTS = 64   # Releves checkpoint() suivis a la fois (un fetch en erreur n'appelle pas since())
+
+
+class RetryableResult(Exception):
+    """Reponse a re-tenter (statut 429/5xx, resultat vide)."""
+
+    def __init__(self, message: str, throttled: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.throttled = throttled
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Seau a jetons thread-safe ; un jeton = une requete."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.nominal_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Reserve un jeton ; retourne le delai a attendre avant d'envoyer la requete."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.nominal_rate * MIN_RATE_FACTOR, self.rate / 2)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.nominal_rate, self.rate + self.nominal_rate * RECOVERY_STEP)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) or getattr(error, "status", None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    if isinstance(error, RetryableResult):
+        return error.retry_after
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    try:
+        return float(headers.get("Retry-After")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(error: Exception) -> bool:
+    """429 / rate limit Yahoo (YFRateLimitError, "Too Many Requests")."""
+    if isinstance(error, RetryableResult):
+        return error.throttled
+    message = str(error)
+    return (_status_code(error) == 429 or "RateLimit" in type(error).__name__
+            or "Too Many Requests" in message or "Rate limited" in message)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Erreur transitoire : limitation, erreur serveur ou connexion coupee (pas les timeouts)."""
+    if isinstance(error, RetryableResult) or is_throttled(error):
+        return True
+    if _status_code(error) in RETRY_STATUSES:
+        return True
+    return type(error).__name__ in ("ConnectionError", "ChunkedEncodingError", "ClientConnectionError",
+                                    "ServerDisconnectedError", "RemoteDisconnected")
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Backoff exponentiel a jitter complet, au moins Retry-After si le serveur l'indique."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, min(retry_after, BACKOFF_MAX)) if retry_after else delay
+
+
+def response_status_check(response) -> None:
+    """retry_if pour les reponses HTTP : leve RetryableResult sur 429/5xx."""
+    status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    if status in RETRY_STATUSES:
+        headers = getattr(response, "headers", {}) or {}
+        try:
+            retry_after = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = None
+        raise RetryableResult(f"HTTP {status}", throttled=status == 429, retry_after=retry_after)
+
+
+def frame_not_empty(frame) -> None:
+    """retry_if pour les historiques Yahoo : un DataFrame vide est souvent une limitation silencieuse."""
+    if frame is None or frame.empty:
+        raise RetryableResult("historique vide")
+
+
+class RateLimiter:
+    """Un seau par source, re-tentatives et compteurs par source."""
+
+    def __init__(self, limits: Dict[str, tuple] = None, max_retries: int = MAX_RETRIES):
+        self.buckets = {key: TokenBucket(rate, burst) for key, (rate, burst) in (limits or RATE_LIMITS).items()}
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._stats = {key: {"calls": 0, "queue_wait": 0.0, "max_queue_wait": 0.0, "retries": 0,
+                             "throttled": 0, "failures": 0} for key in self.buckets}
+        self._windows: Dict[int, Dict[str, float]] = {}  # Releve checkpoint() ouvert -> attente max par source
+        self._next_window = 0
+
+    def _count_wait(self, key: str, wait: float):
+        with self._lock:
+            stats = self._stats[key]
+            stats["calls"] += 1
+            stats["queue_wait"] += wait
+            stats["max_queue_wait"] = max(stats["max_queue_wait"], wait)
+            for window in self._windows.values():
+                window[key] = max(window[key], wait)
+
+    def _on_error(self, key: str, error: Exception, attempt: int) -> float:
+        """Delai avant la prochaine tentative, ou -1 si l'erreur est definitive (ou tentatives epuisees)."""
+        bucket = self.buckets[key]
+        retryable = is_retryable(error)
+        throttled = retryable and is_throttled(error)
+        if throttled:
+            bucket.on_throttle()
+        with self._lock:
+            self._stats[key]["throttled"] += int(throttled)
+            if retryable and attempt < self.max_retries:
+                self._stats[key]["retries"] += 1
+            elif retryable:
+                self._stats[key]["failures"] += 1
+        if not retryable or attempt >= self.max_retries:
+            return -1.0
+        return backoff_delay(attempt, _retry_after(error))
+
+    def call(self, key: str, func: Callable, *args, retry_if: Callable = None, **kwargs):
+        """
+        Appelle func(*args, **kwargs) en respectant le debit de `key`.
+        retry_if(resultat) peut lever RetryableResult pour re-tenter (reponse vide, 429...).
+        Apres MAX_RETRIES, l'exception (ou le dernier resultat) est rendue a l'appelant ;
+        une reponse HTTP rendue ainsi est deja fermee (son statut reste lisible).
+        """
+        bucket = self.buckets[key]
+        for attempt in range(self.max_retries + 1):
+            wait = bucket.reserve()
+            self._count_wait(key, wait)
+            if wait:
+                time.sleep(wait)
+            try:
+                result = func(*args, **kwargs)
+                if retry_if is not None:
+                    try:
+                        retry_if(result)
+                    except RetryableResult as e:
+                        delay = self._on_error(key, e, attempt)
+                        _close(result)
+                        if delay < 0:
+                            return result
+                        time.sleep(delay)
+                        continue
+                bucket.on_success()
+                return result
+            except RetryableResult:
+                raise
+            except Exception as e:
+                delay = self._on_error(key, e, attempt)
+                if delay < 0:
+                    raise
+                time.sleep(delay)
+
+    async def acall(self, key: str, func: Callable, *args, retry_if: Callable = None, **kwargs):
+        """Equivalent asynchrone de call : func est une fonction coroutine."""
+        import asyncio
+
+        bucket = self.buckets[key]
+        for attempt in range(self.max_retries + 1):
+            wait = bucket.reserve()
+            self._count_wait(key, wait)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await func(*args, **kwargs)
+                if retry_if is not None:
+                    try:
+                        retry_if(result)
+                    except RetryableResult as e:
+                        delay = self._on_error(key, e, attempt)
+                        if delay < 0:
+                            return result
+                        await asyncio.sleep(delay)
+                        continue
+                bucket.on_success()
+                return result
+            except RetryableResult:
+                raise
+            except Exception as e:
+                delay = self._on_error(key, e, attempt)
+                if delay < 0:
+                    raise
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        """Compteurs cumules par source, et debit courant."""
+        with self._lock:
+            stats = {key: dict(counters) for key, counters in self._stats.items()}
+        for key, bucket in self.buckets.items():
+            stats[key]["queue_wait"] = round(stats[key]["queue_wait"], 3)
+            stats[key]["max_queue_wait"] = round(stats[key]["max_queue_wait"], 3)
+            stats[key]["rate"] = round(bucket.rate, 2)
+        return stats
+
+    def checkpoint(self) -> Dict:
+        """Releve stats() pour since() ; l'attente max est suivie a partir de ce releve."""
+        with self._lock:
+            self._next_window += 1
+            window = self._next_window
+            self._windows[window] = {key: 0.0 for key in self.buckets}
+            if len(self._windows) > MAX_OPEN_CHECKPOINTS:
+                del self._windows[next(iter(self._windows))]
+        return {**self.stats(), "_window": window}
+
+    def since(self, before: Dict) -> Dict:
+        """Compteurs accumules depuis un releve checkpoint() anterieur (pour un fetch donne)."""
+        with self._lock:
+            window = self._windows.pop(before.get("_window"), None)
+        delta = {}
+        for key, counters in self.stats().items():
+            previous = before.get(key, {})
+            delta[key] = {
+                name: round(value - previous.get(name, 0), 3) if name not in ("rate", "max_queue_wait") else value
+                for name, value in counters.items()
+            }
+            # Sans releve checkpoint(), seul le maximum depuis le demarrage est connu
+            if window is not None:
+                delta[key]["max_queue_wait"] = round(window[key], 3)
+        return delta
+
+
+def _close(result):
+    """Libere la connexion d'une reponse HTTP abandonnee avant re-tentative."""
+    close = getattr(result, "close", None)
+    if callable(close):
+        close()
+
+
+def limited(key: str, retry_if: Callable = None):
+    """Decorateur : chaque appel passe par le limiteur global pour la source `key`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_rate_limiter().call(key, func, *args, retry_if=retry_if, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Instance globale pour faciliter l'utilisation
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Retourne le limiteur partage par tout le processus."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
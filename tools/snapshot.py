@@ -0,0 +1,331 @@
+"""
+Snapshot type d'un ticker, passe directement entre les etapes du pipeline.
+
+Les valeurs restent brutes (float, int, array) : plus de chaines pre-formatees
+("12.3 Mrd$") a re-parser. Le JSON n'est produit qu'a la frontiere de
+persistance (to_json), au format historique de data_fetcher_per_stock.
+"""
+
+import json
+import math
+from array import array
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+# Attribut du snapshot -> cle du dictionnaire info de yfinance
+INFO_FIELDS = {
+    # === IDENTITE ===
+    "company_name": "longName",
+    "sector": "sector",
+    "industry": "industry",
+    "country": "country",
+    "website": "website",
+    "employees": "fullTimeEmployees",
+    "business_summary": "longBusinessSummary",
+    # === PRIX & MARCHE ===
+    "current_price": "currentPrice",
+    "previous_close": "previousClose",
+    "open_price": "open",
+    "day_high": "dayHigh",
+    "day_low": "dayLow",
+    "fifty_two_week_high": "fiftyTwoWeekHigh",
+    "fifty_two_week_low": "fiftyTwoWeekLow",
+    "fifty_day_average": "fiftyDayAverage",
+    "two_hundred_day_average": "twoHundredDayAverage",
+    "market_cap": "marketCap",
+    "enterprise_value": "enterpriseValue",
+    "volume": "volume",
+    "average_volume": "averageVolume",
+    "beta": "beta",
+    # === VALORISATION ===
+    "pe_ratio": "trailingPE",
+    "forward_pe": "forwardPE",
+    "peg_ratio": "pegRatio",
+    "price_to_book": "priceToBook",
+    "price_to_sales": "priceToSalesTrailing12Months",
+    "ev_to_revenue": "enterpriseToRevenue",
+    "ev_to_ebitda": "enterpriseToEbitda",
+    # === RENTABILITE ===
+    "profit_margins": "profitMargins",
+    "operating_margins": "operatingMargins",
+    "gross_margins": "grossMargins",
+    "return_on_equity": "returnOnEquity",
+    "return_on_assets": "returnOnAssets",
+    # === CROISSANCE ===
+    "revenue_growth": "revenueGrowth",
+    "earnings_growth": "earningsGrowth",
+    "earnings_quarterly_growth": "earningsQuarterlyGrowth",
+    # === ANALYSTES ===
+    "target_price_low": "targetLowPrice",
+    "target_price_mean": "targetMeanPrice",
+    "target_price_high": "targetHighPrice",
+    "recommendation": "recommendationKey",
+    "number_of_analysts": "numberOfAnalystOpinions",
+    # === DONNEES FINANCIERES ===
+    "total_revenue": "totalRevenue",
+    "revenue_per_share": "revenuePerShare",
+    "ebitda": "ebitda",
+    "net_income_to_common": "netIncomeToCommon",
+    "earnings_per_share": "trailingEps",
+    "forward_eps": "forwardEps",
+    "book_value": "bookValue",
+    "total_cash": "totalCash",
+    "total_debt": "totalDebt",
+    "debt_to_equity": "debtToEquity",
+    "current_ratio": "currentRatio",
+    "quick_ratio": "quickRatio",
+}
+
+# Cles du JSON historique (data_fetcher_per_stock), dans l'ordre de sortie de to_dict
+OUTPUT_KEYS = (
+    "company_name", "ticker", "sector", "industry", "country", "website", "employees",
+    "business_summary", "current_price", "previous_close", "open_price", "day_high",
+    "day_low", "fifty_two_week_high", "fifty_two_week_low", "fifty_day_average",
+    "two_hundred_day_average", "market_cap", "enterprise_value", "volume",
+    "average_volume", "beta", "pe_ratio", "forward_pe", "peg_ratio", "price_to_book",
+    "price_to_sales", "ev_to_revenue", "ev_to_ebitda", "profit_margins",
+    "operating_margins", "gross_margins", "return_on_equity", "return_on_assets",
+    "revenue_growth", "earnings_growth", "earnings_quarterly_growth", "dividends",
+    "target_price_low", "target_price_mean", "target_price_high", "recommendation",
+    "number_of_analysts", "analyst_recommendations", "total_revenue",
+    "revenue_per_share", "ebitda", "net_income_to_common", "earnings_per_share",
+    "forward_eps", "book_value", "total_cash", "total_debt", "debt_to_equity",
+    "current_ratio", "quick_ratio", "recent_price_history_30_days",
+    "recent_volume_history_30_days", "technical_indicators", "net_income_quarterly",
+    "revenue_quarterly", "balance_sheet", "cashflow", "latest_news",
+)
+
+
+def raw_number(value) -> Optional[float]:
+    """Valeur numerique brute (None pour absent / NaN)."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _format_millions(value: Optional[float]) -> Optional[str]:
+    return f"{value / 1e6:.1f} M$" if value is not None else None
+
+
+def _format_billions(value: Optional[float], keep_zero: bool = False) -> Optional[str]:
+    if value is None or not (value or keep_zero):
+        return None
+    return f"{value / 1e9:.2f} Mrd$"
+
+
+def _format_percent(value: Optional[float]) -> str:
+    return f"{value * 100:.2f}%" if value else "0%"
+
+
+@dataclass(slots=True)
+class Dividends:
+    amount_per_share: Optional[float] = None
+    yield_ratio: Optional[float] = None      # 0.0045 pour 0.45 %
+    payout_ratio: Optional[float] = None     # 0.25 pour 25 %
+    ex_dividend_date: Optional[str] = None
+
+    @property
+    def yield_percent(self) -> str:
+        return _format_percent(self.yield_ratio)
+
+    @property
+    def payout_percent(self) -> str:
+        return _format_percent(self.payout_ratio)
+
+
+@dataclass(slots=True)
+class NewsItem:
+    title: Optional[str]
+    link: Optional[str]
+    context_article: str
+
+
+@dataclass(slots=True)
+class TechnicalIndicators:
+    """Indicateurs calcules par tools.indicators (None si l'historique est trop court)."""
+    history_days: int = 0                           # Seances utilisees pour le calcul
+    last_close: Optional[float] = None
+    sma_20: Optional[float] = None
+    sma_50: Optional[float] = None
+    sma_200: Optional[float] = None
+    price_vs_sma_50_pct: Optional[float] = None
+    price_vs_sma_200_pct: Optional[float] = None
+    rsi_14: Optional[float] = None
+    return_1m_pct: Optional[float] = None
+    return_3m_pct: Optional[float] = None
+    return_1y_pct: Optional[float] = None
+    volatility_1m_pct: Optional[float] = None       # Annualisee
+    volatility_1y_pct: Optional[float] = None       # Annualisee
+    max_drawdown_1y_pct: Optional[float] = None     # Negatif
+    volume_zscore_20d: Optional[float] = None       # Volume du jour vs 20 seances precedentes
+    var_95_1d_pct: Optional[float] = None           # Perte journaliere historique (positive)
+    var_99_1d_pct: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["TechnicalIndicators"]:
+        return cls(**data) if data else None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class StockSnapshot:
+    ticker: str
+    error: Optional[str] = None
+
+    # === IDENTITE ===
+    company_name: Optional[str] = None
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    country: Optional[str] = None
+    website: Optional[str] = None
+    employees: Optional[int] = None
+    business_summary: Optional[str] = None
+
+    # === PRIX & MARCHE ===
+    current_price: Optional[float] = None
+    previous_close: Optional[float] = None
+    open_price: Optional[float] = None
+    day_high: Optional[float] = None
+    day_low: Optional[float] = None
+    fifty_two_week_high: Optional[float] = None
+    fifty_two_week_low: Optional[float] = None
+    fifty_day_average: Optional[float] = None
+    two_hundred_day_average: Optional[float] = None
+    market_cap: Optional[int] = None
+    enterprise_value: Optional[int] = None
+    volume: Optional[int] = None
+    average_volume: Optional[int] = None
+    beta: Optional[float] = None
+
+    # === VALORISATION ===
+    pe_ratio: Optional[float] = None
+    forward_pe: Optional[float] = None
+    peg_ratio: Optional[float] = None
+    price_to_book: Optional[float] = None
+    price_to_sales: Optional[float] = None
+    ev_to_revenue: Optional[float] = None
+    ev_to_ebitda: Optional[float] = None
+
+    # === RENTABILITE ===
+    profit_margins: Optional[float] = None
+    operating_margins: Optional[float] = None
+    gross_margins: Optional[float] = None
+    return_on_equity: Optional[float] = None
+    return_on_assets: Optional[float] = None
+
+    # === CROISSANCE ===
+    revenue_growth: Optional[float] = None
+    earnings_growth: Optional[float] = None
+    earnings_quarterly_growth: Optional[float] = None
+
+    # === DIVIDENDES ===
+    dividends: Dividends = field(default_factory=Dividends)
+
+    # === ANALYSTES ===
+    target_price_low: Optional[float] = None
+    target_price_mean: Optional[float] = None
+    target_price_high: Optional[float] = None
+    recommendation: Optional[str] = None
+    number_of_analysts: Optional[int] = None
+    analyst_recommendations: List[dict] = field(default_factory=list)
+
+    # === DONNEES FINANCIERES ===
+    total_revenue: Optional[int] = None
+    revenue_per_share: Optional[float] = None
+    ebitda: Optional[int] = None
+    net_income_to_common: Optional[int] = None
+    earnings_per_share: Optional[float] = None
+    forward_eps: Optional[float] = None
+    book_value: Optional[float] = None
+    total_cash: Optional[int] = None
+    total_debt: Optional[int] = None
+    debt_to_equity: Optional[float] = None
+    current_ratio: Optional[float] = None
+    quick_ratio: Optional[float] = None
+
+    # === HISTORIQUES (valeurs brutes) ===
+    history_dates: Tuple[str, ...] = ()
+    close_history: array = field(default_factory=lambda: array('d'))
+    volume_history: array = field(default_factory=lambda: array('q'))
+    net_income_quarterly: Dict[str, Optional[float]] = field(default_factory=dict)  # $
+    revenue_quarterly: Dict[str, Optional[float]] = field(default_factory=dict)     # $
+    balance_sheet: Dict[str, Optional[float]] = field(default_factory=dict)  # $
+    cashflow: Dict[str, Optional[float]] = field(default_factory=dict)       # $
+    indicators: Optional[TechnicalIndicators] = None                         # Sur tout l'historique stocke
+
+    # === NEWS ===
+    latest_news: List[NewsItem] = field(default_factory=list)
+
+    @classmethod
+    def from_results(cls, ticker: str, results: dict, articles_default: str = "Contenu non disponible.") -> "StockSnapshot":
+        """Construit le snapshot a partir des resultats bruts des sous-requetes Yahoo."""
+        info = results["info"]
+        history = results["history"]
+        net_income, revenue = results["quarterly_income_stmt"]
+        articles = results["articles"]
+
+        snapshot = cls(
+            ticker=ticker,
+            dividends=Dividends(
+                amount_per_share=info.get("dividendRate"),
+                yield_ratio=info.get("dividendYield"),
+                payout_ratio=info.get("payoutRatio"),
+                ex_dividend_date=str(info.get("exDividendDate")) if info.get("exDividendDate") else None,
+            ),
+            analyst_recommendations=results["recommendations"],
+            history_dates=tuple(history["dates"]),
+            close_history=array('d', history["close"]),
+            volume_history=array('q', history["volume"]),
+            indicators=TechnicalIndicators.from_dict(history.get("indicators")),
+            net_income_quarterly=dict(net_income),
+            revenue_quarterly=dict(revenue),
+            balance_sheet=dict(results["quarterly_balance_sheet"]),
+            cashflow=dict(results["quarterly_cashflow"]),
+            latest_news=[
+                NewsItem(
+                    title=news["content"].get('title'),
+                    link=news["content"]["canonicalUrl"].get('url'),
+                    context_article=articles.get(i, articles_default),
+                )
+                for i, news in enumerate(results["news"])
+            ],
+        )
+        for attr, info_key in INFO_FIELDS.items():
+            setattr(snapshot, attr, info.get(info_key))
+        return snapshot
+
+    def to_dict(self) -> dict:
+        """Format historique (chiffres formates) : uniquement pour la persistance / l'affichage."""
+        if self.error:
+            return {"ticker": self.ticker, "error": self.error}
+
+        values = {attr: getattr(self, attr) for attr in INFO_FIELDS}
+        values.update({
+            "ticker": self.ticker,
+            "dividends": {
+                "amount_per_share": self.dividends.amount_per_share,
+                "yield_percent": self.dividends.yield_percent,
+                "payout_ratio": self.dividends.payout_percent,
+                "ex_dividend_date": self.dividends.ex_dividend_date,
+            },
+            "analyst_recommendations": self.analyst_recommendations,
+            "recent_price_history_30_days": dict(zip(self.history_dates, self.close_history)),
+            "recent_volume_history_30_days": dict(zip(self.history_dates, self.volume_history)),
+            "technical_indicators": self.indicators.to_dict() if self.indicators else None,
+            "net_income_quarterly": {date: _format_millions(value) for date, value in self.net_income_quarterly.items()},
+            "revenue_quarterly": {date: _format_billions(value, keep_zero=True) for date, value in self.revenue_quarterly.items()},
+            "balance_sheet": {key: _format_billions(value) for key, value in self.balance_sheet.items()},
+            "cashflow": {key: _format_billions(value) for key, value in self.cashflow.items()},
+            "latest_news": [
+                {"title": n.title, "link": n.link, "context_article": n.context_article}
+                for n in self.latest_news
+            ],
+        })
+        return {key: values[key] for key in OUTPUT_KEYS}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
@@ -0,0 +1,357 @@
+"""
+Cache persistant des snapshots Yahoo Finance, avec un TTL par groupe de champs.
+
+Les prix changent en permanence, les etats financiers ou la description de
+l'entreprise presque jamais : chaque groupe a donc sa propre duree de vie.
+Une entree legerement perimee est servie immediatement pendant qu'un
+rafraichissement tourne en arriere-plan (stale-while-revalidate).
+
+Usage:
+    snapshot = cached_fetch_stock_snapshot("NVDA")
+    raw_json = cached_data_fetcher_per_stock("NVDA")
+    print(get_snapshot_cache().stats())
+    shutdown_snapshot_cache()  # En fin de programme
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from tools.cassette import _to_jsonable, get_active_cassette
+from tools.snapshot import StockSnapshot
+from tools.yfinance_fetch import (
+    QUOTE_FAST_INFO_FIELDS,
+    fetch_stock_snapshot,
+    fetch_sub_requests,
+    record_fetch_timings,
+)
+
+
+# TTL par groupe (secondes)
+GROUP_TTLS = {
+    "quote": 60,                # Prix et volumes du jour
+    "history": 15 * 60,         # Historique 30 jours
+    "news": 30 * 60,            # Actualites + contenu des articles
+    "profile": 6 * 3600,        # info complet : description, secteur, ratios, objectifs
+    "statements": 24 * 3600,    # Etats financiers trimestriels + recommandations
+}
+
+# Une entree perimee depuis moins de TTL * STALE_FACTOR est servie telle quelle
+# et rafraichie en arriere-plan ; au-dela, elle est re-telechargee avant de repondre.
+STALE_FACTOR = 1.0
+
+# Sous-requetes Yahoo couvertes par chaque groupe (cles de yfinance_fetch.PARTIAL_SUB_REQUESTS)
+GROUP_SUB_REQUESTS = {
+    "quote": ("quote",),
+    "history": ("history",),
+    "news": ("news",),
+    "profile": ("info",),
+    "statements": ("quarterly_income_stmt", "quarterly_balance_sheet", "quarterly_cashflow", "recommendations"),
+}
+
+CACHE_DIR = os.path.join("data", "cache", "snapshots")
+MAX_ENTRIES = 200                   # Nombre max de tickers en cache
+MAX_BYTES = 50 * 1024 * 1024        # Taille max du cache sur disque
+CACHE_FORMAT = 2                    # Version du format des blocs ; les entrees d'un autre format sont ignorees
+
+
+class SnapshotCache:
+    """
+    Cache LRU borne (nombre d'entrees et taille disque) des snapshots par ticker.
+    Une entree = un fichier JSON par ticker, contenant un bloc par groupe.
+    """
+
+    def __init__(self, folder: str = CACHE_DIR, ttls: Dict[str, float] = None,
+                 max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES,
+                 stale_factor: float = STALE_FACTOR):
+        self.folder = folder
+        self.ttls = dict(GROUP_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_factor = stale_factor
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()  # ticker -> entree (ordre LRU)
+        self._sizes: Dict[str, int] = {}                         # ticker -> taille sur disque
+        self._refreshing = set()                                 # (ticker, groupe) en cours
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="snapshot_refresh")
+        self._closed = False
+        # Filet de securite : atexit passe apres l'attente des threads de concurrent.futures (file
+        # comprise), les points d'entree appellent donc shutdown_snapshot_cache() avant de sortir.
+        atexit.register(self.shutdown)
+
+        self._stats = {group: {"hits": 0, "stale": 0, "misses": 0} for group in GROUP_TTLS}
+        self._stats["_global"] = {"refreshes": 0, "refresh_errors": 0, "evictions": 0}
+
+        self._load_index()
+
+    # === Persistance ===
+
+    def _path(self, ticker: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        return os.path.join(self.folder, f"{safe}.json")
+
+    def _load_index(self):
+        """Recharge les entrees presentes sur disque, de la plus ancienne a la plus recente."""
+        if not os.path.isdir(self.folder):
+            return
+        files = []
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.folder, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                if "ticker" not in entry or entry.get("format") != CACHE_FORMAT:
+                    continue
+                files.append((entry.get("last_access", 0), entry, os.path.getsize(path)))
+            except (json.JSONDecodeError, OSError):
+                continue
+        for _, entry, size in sorted(files, key=lambda x: x[0]):
+            self._entries[entry["ticker"]] = entry
+            self._sizes[entry["ticker"]] = size
+        self._evict()
+
+    def _persist(self, ticker: str):
+        """Ecriture atomique de l'entree (fichier temporaire puis remplacement)."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(ticker)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                # Scalaires NumPy renvoyes par yfinance -> types Python natifs
+                json.dump(self._entries[ticker], f, ensure_ascii=False, default=_to_jsonable)
+            os.replace(tmp_path, path)
+            self._sizes[ticker] = os.path.getsize(path)
+        except (OSError, ValueError) as e:
+            print(f"[SnapshotCache] Erreur sauvegarde {ticker}: {e}")
+
+    def _evict(self):
+        """Supprime les entrees les moins recemment utilisees au-dela des limites."""
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or sum(self._sizes.values()) > self.max_bytes):
+            ticker, _ = self._entries.popitem(last=False)
+            self._sizes.pop(ticker, None)
+            self._stats["_global"]["evictions"] += 1
+            try:
+                os.remove(self._path(ticker))
+            except OSError:
+                pass
+
+    # === Etat des groupes ===
+
+    def _group_state(self, entry: Optional[dict], group: str, now: float) -> str:
+        """Retourne "fresh", "stale" ou "miss" pour un groupe d'une entree."""
+        block = (entry or {}).get("groups", {}).get(group)
+        if block is None:
+            return "miss"
+        age = now - block["fetched_at"]
+        ttl = self.ttls[group]
+        if age < ttl:
+            return "fresh"
+        if age < ttl * (1 + self.stale_factor):
+            return "stale"
+        return "miss"
+
+    # === Telechargement ===
+
+    def _fetch_groups(self, ticker: str, groups: list, timings: dict) -> dict:
+        """Telecharge uniquement les sous-requetes des groupes demandes."""
+        names = [name for group in groups for name in GROUP_SUB_REQUESTS[group]]
+        if "profile" in groups and "quote" in names:
+            # info complet contient deja la cotation
+            names.remove("quote")
+
+        results = fetch_sub_requests(ticker, names, timings)
+
+        values = {}
+        for group in groups:
+            if group == "quote" and "profile" in groups:
+                values[group] = {"quote": {key: results["info"].get(key) for key in QUOTE_FAST_INFO_FIELDS}}
+                continue
+            values[group] = {name: results[name] for name in GROUP_SUB_REQUESTS[group]}
+            if group == "news":
+                values[group]["articles"] = results["articles"]
+        return values
+
+    def _store(self, ticker: str, values: dict, fetched_at: float) -> dict:
+        """Ajoute les groupes telecharges a l'entree du ticker et la retourne (meme evincee)."""
+        with self._lock:
+            entry = self._entries.get(ticker) or {"ticker": ticker, "format": CACHE_FORMAT, "groups": {}}
+            for group, value in values.items():
+                entry["groups"][group] = {"fetched_at": fetched_at, "value": value}
+            entry["last_access"] = time.time()
+            self._entries[ticker] = entry
+            self._entries.move_to_end(ticker)
+            self._persist(ticker)
+            self._evict()
+            return entry
+
+    def _refresh_in_background(self, ticker: str, groups: list):
+        with self._lock:
+            if self._closed:
+                return
+            groups = [g for g in groups if (ticker, g) not in self._refreshing]
+            if not groups:
+                return
+            self._refreshing.update((ticker, g) for g in groups)
+
+        def refresh():
+            try:
+                fetched_at = time.time()
+                self._store(ticker, self._fetch_groups(ticker, groups, {}), fetched_at)
+                with self._lock:
+                    self._stats["_global"]["refreshes"] += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats["_global"]["refresh_errors"] += 1
+                    closed = self._closed
+                if not closed:  # Apres shutdown(), les pools de fetch refusent les taches : echec attendu
+                    print(f"[SnapshotCache] Rafraichissement de {ticker} echoue: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update((ticker, g) for g in groups)
+
+        try:
+            self._refresher.submit(refresh)
+        except RuntimeError:
+            # Pool arrete (fin de programme) : l'entree perimee reste servie telle quelle
+            with self._lock:
+                self._refreshing.difference_update((ticker, g) for g in groups)
+
+    # === API publique ===
+
+    def get_snapshot(self, ticker: str) -> StockSnapshot:
+        """Retourne le snapshot type du ticker, servi depuis le cache quand c'est possible."""
+        start = time.perf_counter()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(ticker)
+            states = {group: self._group_state(entry, group, now) for group in GROUP_TTLS}
+
+        missing = [g for g, state in states.items() if state == "miss"]
+        stale = [g for g, state in states.items() if state == "stale"]
+        if "profile" in missing and "quote" in stale:
+            # La cotation arrive avec le profil complet
+            stale.remove("quote")
+            missing.append("quote")
+
+        timings = {}
+        if missing:
+            entry = self._store(ticker, self._fetch_groups(ticker, missing, timings), now)
+        if stale:
+            self._refresh_in_background(ticker, stale)
+
+        with self._lock:
+            for group, state in states.items():
+                counter = {"fresh": "hits", "stale": "stale", "miss": "misses"}[state]
+                self._stats[group][counter] += 1
+            # L'entree a pu etre evincee (limites du cache) : on sert alors les valeurs deja en main
+            entry = self._entries.get(ticker, entry)
+            if ticker in self._entries:
+                entry["last_access"] = time.time()
+                self._entries.move_to_end(ticker)
+            groups = {group: block["value"] for group, block in entry["groups"].items()}
+
+        timings["cache"] = states
+        timings["total"] = round(time.perf_counter() - start, 3)
+        timings["mode"] = "cached"
+        record_fetch_timings(ticker, timings)
+
+        return StockSnapshot.from_results(ticker, self._to_results(groups))
+
+    def get(self, ticker: str) -> str:
+        """Retourne le snapshot JSON du ticker (meme format que data_fetcher_per_stock)."""
+        return self.get_snapshot(ticker).to_json()
+
+    @staticmethod
+    def _to_results(groups: dict) -> dict:
+        """Reconstitue les resultats des sous-requetes attendus par StockSnapshot.from_results."""
+        info = dict(groups["profile"]["info"])
+        info.update({key: value for key, value in groups["quote"]["quote"].items() if value is not None})
+
+        results = {"info": info}
+        results.update(groups["history"])
+        results.update(groups["statements"])
+        results["news"] = groups["news"]["news"]
+        # Les cles JSON sont des chaines : on retrouve les index des articles
+        results["articles"] = {int(i): text for i, text in groups["news"]["articles"].items()}
+        return results
+
+    def invalidate(self, ticker: str, group: str = None):
+        """Supprime un ticker du cache, ou seulement un de ses groupes."""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                return
+            if group is None:
+                self._entries.pop(ticker)
+                self._sizes.pop(ticker, None)
+                try:
+                    os.remove(self._path(ticker))
+                except OSError:
+                    pass
+            else:
+                entry["groups"].pop(group, None)
+                self._persist(ticker)
+
+    def shutdown(self):
+        """Abandonne les rafraichissements en file et n'en lance plus (fin de programme)."""
+        with self._lock:
+            self._closed = True
+        self._refresher.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """Compteurs hit / stale / miss par groupe, taux de hit et occupation du cache."""
+        with self._lock:
+            stats = {group: dict(counters) for group, counters in self._stats.items()}
+            for group in GROUP_TTLS:
+                counters = stats[group]
+                total = counters["hits"] + counters["stale"] + counters["misses"]
+                # Une entree stale est servie sans attendre : elle compte comme un hit
+                counters["hit_rate"] = round((counters["hits"] + counters["stale"]) / total * 100, 1) if total else 0.0
+            stats["_global"]["entries"] = len(self._entries)
+            stats["_global"]["bytes"] = sum(self._sizes.values())
+            return stats
+
+
+# Instance globale pour faciliter l'utilisation
+_snapshot_cache: Optional[SnapshotCache] = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """Retourne l'instance globale du cache de snapshots."""
+    global _snapshot_cache
+    with _snapshot_cache_lock:
+        if _snapshot_cache is None:
+            _snapshot_cache = SnapshotCache()
+        return _snapshot_cache
+
+
+def shutdown_snapshot_cache():
+    """Arrete les rafraichissements en arriere-plan du cache global, s'il a ete cree."""
+    with _snapshot_cache_lock:
+        cache = _snapshot_cache
+    if cache is not None:
+        cache.shutdown()
+
+
+def cached_fetch_stock_snapshot(stockName: str) -> StockSnapshot:
+    """fetch_stock_snapshot avec le cache de snapshots (contourne en mode cassette)."""
+    if get_active_cassette() is not None:
+        return fetch_stock_snapshot(stockName)
+    return get_snapshot_cache().get_snapshot(stockName)
+
+
+def cached_data_fetcher_per_stock(stockName: str) -> str:
+    """data_fetcher_per_stock avec le cache de snapshots."""
+    return cached_fetch_stock_snapshot(stockName).to_json()
@@ -1,18 +1,32 @@
-import yfinance as yf
-import json
-import requests
-from bs4 import BeautifulSoup
 import os
-import certifi
-import shutil
-import urllib3
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.article_cache import get_article_store
+from tools.cassette import get_active_cassette, recorded
+from tools.failure_cache import get_failure_cache
+from tools.html_extract import aread_capped, extractor_version, get_extractor, read_capped
+from tools.http_session import get_aiohttp, get_ticker, new_async_session, polite_get
+from tools.rate_limit import frame_not_empty, get_rate_limiter, limited
+from tools.snapshot import StockSnapshot, raw_number
+
+# Import sans effet de bord : yfinance, pandas, numpy, requests, bs4/lxml et aiohttp
+# ne sont charges qu'au premier fetch (verification : python -m tools.import_budget).
+
+SSL_CERT_PATH = None
 
-# Désactive les warnings SSL
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Fix pour les chemins Windows avec caractères spéciaux (é, è, etc.)
-# On copie le certificat dans un chemin sans accents
+# On copie le certificat dans un chemin sans accents.
+# A appeler explicitement (main.py / mono_agent.py le font sous Windows) : modifie
+# CURL_CA_BUNDLE, REQUESTS_CA_BUNDLE et SSL_CERT_FILE pour tout le processus.
 def setup_ssl_certs():
+    global SSL_CERT_PATH
+    import certifi
+    import shutil
+
     cert_path = certifi.where()
     # Chemin de destination sans caractères spéciaux
     safe_cert_dir = os.path.join(os.environ.get('TEMP', 'C:\\Temp'), 'ssl_certs')
@@ -27,6 +41,7 @@ def setup_ssl_certs():
         os.environ['CURL_CA_BUNDLE'] = safe_cert_path
         os.environ['REQUESTS_CA_BUNDLE'] = safe_cert_path
         os.environ['SSL_CERT_FILE'] = safe_cert_path
+        SSL_CERT_PATH = safe_cert_path
         return safe_cert_path
     except Exception as e:
         print(f"⚠️ Impossible de configurer les certificats SSL: {e}")
@@ -34,105 +49,159 @@ def setup_ssl_certs():
         os.environ['CURL_CA_BUNDLE'] = ''
         return None
 
-SSL_CERT_PATH = setup_ssl_certs()
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+SCRAPE_TIMEOUT = 10  # secondes
 
-def scrape_article_content(url: str, max_chars: int = 5000) -> str:
+
+def extract_article_text(html, max_chars: int = 5000) -> str:
     """
-    Télécharge le HTML de la page et extrait le contenu textuel complet.
-    Récupère les paragraphes, titres et listes pour un contexte riche.
+    Extrait le contenu textuel d'une page HTML deja telechargee,
+    avec le backend configure dans tools.html_extract.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
+    return get_extractor()(html, max_chars)
 
-    try:
-        response = requests.get(url, headers=headers, timeout=10, verify=False)
+
+def _download_page(url: str) -> bytes:
+    """HTML brut d'une page, sans passer par le stockage d'articles."""
+    # Connexion rendue au pool sur tous les chemins, erreur HTTP comprise
+    with polite_get(url, headers=SCRAPE_HEADERS, timeout=SCRAPE_TIMEOUT, verify=False, stream=True) as response:
         response.raise_for_status()
+        return read_capped(response)
+
 
-        soup = BeautifulSoup(response.content, 'html.parser')
+def _scrape_with_cassette(cassette, url: str, max_chars: int) -> str:
+    """Mode cassette : page enregistree / rejouee, le stockage d'articles est contourne."""
+    try:
+        html = cassette.page(url, _download_page)
+    except Exception as e:
+        return f"Erreur scraping: {str(e)}"
+    return extract_article_text(html, max_chars)
 
-        # Supprimer les éléments non pertinents (scripts, styles, nav, footer, ads)
-        for element in soup(['script', 'style', 'nav', 'footer', 'aside', 'header',
-                            'form', 'button', 'iframe', 'noscript']):
-            element.decompose()
 
-        # Supprimer les divs de pub/cookies courants
-        for div in soup.find_all(['div', 'section'], class_=lambda x: x and any(
-            word in str(x).lower() for word in ['ad', 'cookie', 'banner', 'popup', 'newsletter', 'sidebar']
-        )):
-            div.decompose()
+def scrape_article_content(url: str, max_chars: int = 5000) -> str:
+    """
+    Télécharge le HTML de la page et extrait le contenu textuel complet.
+    Passe par le stockage d'articles : pas de requete si l'article est recent,
+    requete conditionnelle (ETag / If-Modified-Since) sinon.
+    """
+    cassette = get_active_cassette()
+    if cassette is not None:
+        return _scrape_with_cassette(cassette, url, max_chars)
+
+    store = get_article_store()
+    record = store.load(url)
+    if store.is_fresh(record):
+        return store.text(record, max_chars, extract_article_text, extractor_version())
+
+    # Source en echec recent (403, timeout...) : pas de requete
+    failures = get_failure_cache()
+    skip_reason = failures.check(url)
+    if skip_reason:
+        if record:
+            return store.text(record, max_chars, extract_article_text, extractor_version(), counter="served_on_error")
+        return f"Erreur scraping: {skip_reason} (source ignoree)"
+
+    start = time.perf_counter()
+    try:
+        headers = dict(SCRAPE_HEADERS, **store.conditional_headers(record))
+        # Connexion rendue au pool sur tous les chemins (304, erreur HTTP, lecture)
+        with polite_get(url, headers=headers, timeout=SCRAPE_TIMEOUT, verify=False, stream=True) as response:
+            not_modified = response.status_code == 304 and record is not None
+            if not not_modified:
+                response.raise_for_status()
+                # Lecture en flux, arretee au budget d'octets (le texte garde est de toute facon borne)
+                html = read_capped(response)
+        failures.record_success(url)
+        if not_modified:
+            store.touch(record)
+            return store.text(record, max_chars, extract_article_text, extractor_version(), counter="revalidated")
+
+        text = extract_article_text(html, max_chars)
+        store.save(url, html, response.headers, text, max_chars, extractor_version())
+        return text
 
-        # Récupérer le contenu principal (article, main, ou body)
-        main_content = soup.find('article') or soup.find('main') or soup.find('body')
+    except Exception as e:
+        failures.record_failure(url, e, time.perf_counter() - start)
+        if record:
+            # Mieux vaut la version stockee qu'une erreur
+            return store.text(record, max_chars, extract_article_text, extractor_version(), counter="served_on_error")
+        return f"Erreur scraping: {str(e)}"
 
-        if not main_content:
-            main_content = soup
 
-        # Extraire les titres (h1, h2, h3)
-        titles = []
-        for h in main_content.find_all(['h1', 'h2', 'h3']):
-            text = h.get_text(strip=True)
-            if len(text) > 10:
-                titles.append(f"[{h.name.upper()}] {text}")
+# === SOUS-REQUETES YAHOO ===
+# Chaque sous-requete est independante : elles peuvent tourner dans un pool de threads.
+# Toutes passent par le limiteur partage (tools.rate_limit) ; en rejeu de cassette,
+# @recorded repond avant le limiteur.
 
-        # Extraire les paragraphes
-        paragraphs = []
-        for p in main_content.find_all('p'):
-            text = p.get_text(strip=True)
-            if len(text) > 30:  # Ignorer les textes trop courts
-                paragraphs.append(text)
+FETCH_MAX_WORKERS = 8  # Taille max du pool (7 sous-requetes Yahoo + scrapes d'articles)
 
-        # Extraire les listes (ul, ol)
-        lists = []
-        for ul in main_content.find_all(['ul', 'ol']):
-            items = [li.get_text(strip=True) for li in ul.find_all('li') if len(li.get_text(strip=True)) > 20]
-            if items:
-                lists.append(" | ".join(items[:5]))  # Max 5 items par liste
+_timings_lock = threading.Lock()
+_fetch_timings = {}  # ticker -> timings du dernier fetch
 
-        # Assembler le contenu
-        content_parts = []
 
-        if titles:
-            content_parts.append("TITRES: " + " // ".join(titles[:3]))
+@recorded("info")
+@limited("yahoo")
+def _fetch_info(data):
+    return data.info
 
-        if paragraphs:
-            content_parts.append("CONTENU: " + " ".join(paragraphs))
 
-        if lists:
-            content_parts.append("POINTS CLES: " + " // ".join(lists[:3]))
+@recorded("news")
+@limited("yahoo")
+def _fetch_news(data):
+    return data.news[:5]  # 5 news au lieu de 3
 
-        full_text = "\n".join(content_parts)
 
-        # Nettoyer les espaces multiples
-        full_text = " ".join(full_text.split())
+HISTORY_DAYS = 30  # Jours d'historique repris dans le snapshot
 
-        # Limiter la taille (5000 caractères par défaut)
-        if len(full_text) > max_chars:
-            return full_text[:max_chars] + "... [Article tronque]"
 
-        return full_text if full_text else "Contenu non extractible"
+@recorded("history")
+def _fetch_history(data):
+    # Historique des prix sur 1 mois, depuis le stockage local (seuls les jours manquants sont telecharges)
+    from tools.price_store import get_price_store
 
+    try:
+        return _history_from_store(get_price_store(), data.ticker)
     except Exception as e:
-        return f"Erreur scraping: {str(e)}"
-
+        print(f"[PriceStore] Stockage indisponible pour {data.ticker}, telechargement direct : {e}")
+        history = get_rate_limiter().call("yahoo", data.history, period="1mo", retry_if=frame_not_empty)
+        return _history_columns(history)
 
-def data_fetcher_per_stock(stockName : str):
-    data = yf.Ticker(stockName)
-  
-    info = data.info
-  
-    raw_news = data.news[:5]  # 5 news au lieu de 3
-    clean_news = []
 
-    # Historique des prix sur 1 mois
-    history = data.history(period="1mo")
-    historySummary = history['Close'].tail(30).to_dict()
-    history_clean = {str(key.date()): value for key, value in historySummary.items()}
+def _history_from_store(store, ticker: str, sync: bool = True) -> dict:
+    """
+    Colonnes du dernier mois pour le snapshot, et indicateurs techniques
+    calcules sur tout l'historique stocke (plusieurs annees).
+    """
+    from tools.indicators import compute_indicators
+
+    bars = store.load(ticker, sync=sync)
+    if bars is None:
+        return {"dates": [], "close": [], "volume": [], "indicators": None}
+    columns = bars.recent(HISTORY_DAYS).to_columns()
+    indicators = compute_indicators(bars.close, bars.volume)
+    columns["indicators"] = indicators.to_dict() if indicators else None
+    return columns
+
+
+def _history_columns(history):
+    """DataFrame OHLCV -> colonnes brutes (dates, cloture, volume) des 30 derniers jours."""
+    from tools.indicators import compute_indicators
+
+    history = history.tail(30)
+    indicators = compute_indicators(history['Close'].to_numpy(), history['Volume'].to_numpy())
+    return {
+        "dates": [str(key.date()) for key in history.index],
+        "close": [float(value) for value in history['Close']],
+        "volume": [int(value) if value == value else 0 for value in history['Volume']],  # NaN -> 0
+        "indicators": indicators.to_dict() if indicators else None,
+    }
 
-    # Historique des volumes
-    volume_history = history['Volume'].tail(30).to_dict()
-    volume_clean = {str(key.date()): int(value) for key, value in volume_history.items()}
 
+@recorded("quarterly_income_stmt")
+@limited("yahoo")
+def _fetch_income_stmt(data):
     # Données financières trimestrielles
     financials = data.quarterly_income_stmt
     quarterly_results = {}
@@ -142,48 +211,52 @@ def data_fetcher_per_stock(stockName : str):
         if "Net Income" in financials.index:
             net_income_series = financials.loc["Net Income"]
             for date, value in net_income_series.head(4).items():
-                quarterly_results[str(date.date())] = f"{value / 1e6:.1f} M$"
+                quarterly_results[str(date.date())] = raw_number(value)
 
         if "Total Revenue" in financials.index:
             revenue_series = financials.loc["Total Revenue"]
             for date, value in revenue_series.head(4).items():
-                quarterly_revenue[str(date.date())] = f"{value / 1e9:.2f} Mrd$"
+                quarterly_revenue[str(date.date())] = raw_number(value)
+
+    return quarterly_results, quarterly_revenue
 
+
+@recorded("quarterly_balance_sheet")
+@limited("yahoo")
+def _fetch_balance_sheet(data):
     # Bilan (Balance Sheet)
     balance_sheet = data.quarterly_balance_sheet
     balance_data = {}
     if not balance_sheet.empty:
         latest = balance_sheet.iloc[:, 0]  # Dernière colonne
         balance_data = {
-            "total_assets": f"{latest.get('Total Assets', 0) / 1e9:.2f} Mrd$" if latest.get('Total Assets') else None,
-            "total_debt": f"{latest.get('Total Debt', 0) / 1e9:.2f} Mrd$" if latest.get('Total Debt') else None,
-            "cash": f"{latest.get('Cash And Cash Equivalents', 0) / 1e9:.2f} Mrd$" if latest.get('Cash And Cash Equivalents') else None,
-            "total_equity": f"{latest.get('Stockholders Equity', 0) / 1e9:.2f} Mrd$" if latest.get('Stockholders Equity') else None,
+            "total_assets": raw_number(latest.get('Total Assets')),
+            "total_debt": raw_number(latest.get('Total Debt')),
+            "cash": raw_number(latest.get('Cash And Cash Equivalents')),
+            "total_equity": raw_number(latest.get('Stockholders Equity')),
         }
+    return balance_data
+
 
+@recorded("quarterly_cashflow")
+@limited("yahoo")
+def _fetch_cashflow(data):
     # Cash Flow
     cashflow = data.quarterly_cashflow
     cashflow_data = {}
     if not cashflow.empty:
         latest_cf = cashflow.iloc[:, 0]
         cashflow_data = {
-            "operating_cashflow": f"{latest_cf.get('Operating Cash Flow', 0) / 1e9:.2f} Mrd$" if latest_cf.get('Operating Cash Flow') else None,
-            "free_cashflow": f"{latest_cf.get('Free Cash Flow', 0) / 1e9:.2f} Mrd$" if latest_cf.get('Free Cash Flow') else None,
-            "capex": f"{latest_cf.get('Capital Expenditure', 0) / 1e9:.2f} Mrd$" if latest_cf.get('Capital Expenditure') else None,
+            "operating_cashflow": raw_number(latest_cf.get('Operating Cash Flow')),
+            "free_cashflow": raw_number(latest_cf.get('Free Cash Flow')),
+            "capex": raw_number(latest_cf.get('Capital Expenditure')),
         }
+    return cashflow_data
 
-    # News
-    for news in raw_news:
-        url = news["content"]["canonicalUrl"].get('url')
-        article_body = "Contenu non disponible."
-        if url:
-            article_body = scrape_article_content(url)
-        clean_news.append({
-            "title": news["content"].get('title'),
-            "link": news["content"]["canonicalUrl"].get('url'),
-            "context_article": article_body
-        })
 
+@recorded("recommendations")
+@limited("yahoo")
+def _fetch_recommendations(data):
     # Recommandations des analystes
     recommendations = {}
     try:
@@ -193,104 +266,456 @@ def data_fetcher_per_stock(stockName : str):
             recommendations = latest_reco
     except:
         recommendations = {}
+    return recommendations
 
-    # Dividendes
-    dividend_rate = info.get("dividendRate")
-    dividend_yield = info.get("dividendYield")
-    payout_ratio = info.get("payoutRatio")
-
-    data_filtered = {
-        # === IDENTITE ===
-        "company_name": info.get("longName"),
-        "ticker": stockName,
-        "sector": info.get("sector"),
-        "industry": info.get("industry"),
-        "country": info.get("country"),
-        "website": info.get("website"),
-        "employees": info.get("fullTimeEmployees"),
-        "business_summary": info.get("longBusinessSummary"),  # Description complete
-
-        # === PRIX & MARCHE ===
-        "current_price": info.get("currentPrice"),
-        "previous_close": info.get("previousClose"),
-        "open_price": info.get("open"),
-        "day_high": info.get("dayHigh"),
-        "day_low": info.get("dayLow"),
-        "fifty_two_week_high": info.get("fiftyTwoWeekHigh"),
-        "fifty_two_week_low": info.get("fiftyTwoWeekLow"),
-        "fifty_day_average": info.get("fiftyDayAverage"),
-        "two_hundred_day_average": info.get("twoHundredDayAverage"),
-        "market_cap": info.get("marketCap"),
-        "enterprise_value": info.get("enterpriseValue"),
-        "volume": info.get("volume"),
-        "average_volume": info.get("averageVolume"),
-        "beta": info.get("beta"),  # Volatilite par rapport au marche
-
-        # === VALORISATION ===
-        "pe_ratio": info.get("trailingPE"),
-        "forward_pe": info.get("forwardPE"),
-        "peg_ratio": info.get("pegRatio"),  # PE / Croissance
-        "price_to_book": info.get("priceToBook"),
-        "price_to_sales": info.get("priceToSalesTrailing12Months"),
-        "ev_to_revenue": info.get("enterpriseToRevenue"),
-        "ev_to_ebitda": info.get("enterpriseToEbitda"),
-
-        # === RENTABILITE ===
-        "profit_margins": info.get("profitMargins"),
-        "operating_margins": info.get("operatingMargins"),
-        "gross_margins": info.get("grossMargins"),
-        "return_on_equity": info.get("returnOnEquity"),  # ROE
-        "return_on_assets": info.get("returnOnAssets"),  # ROA
-
-        # === CROISSANCE ===
-        "revenue_growth": info.get("revenueGrowth"),
-        "earnings_growth": info.get("earningsGrowth"),
-        "earnings_quarterly_growth": info.get("earningsQuarterlyGrowth"),
-
-        # === DIVIDENDES ===
-        "dividends": {
-            "amount_per_share": dividend_rate,
-            "yield_percent": f"{dividend_yield * 100:.2f}%" if dividend_yield else "0%",
-            "payout_ratio": f"{payout_ratio * 100:.2f}%" if payout_ratio else "0%",
-            "ex_dividend_date": str(info.get("exDividendDate")) if info.get("exDividendDate") else None,
-        },
-
-        # === ANALYSTES ===
-        "target_price_low": info.get("targetLowPrice"),
-        "target_price_mean": info.get("targetMeanPrice"),
-        "target_price_high": info.get("targetHighPrice"),
-        "recommendation": info.get("recommendationKey"),  # buy, hold, sell
-        "number_of_analysts": info.get("numberOfAnalystOpinions"),
-        "analyst_recommendations": recommendations,
-
-        # === DONNEES FINANCIERES ===
-        "total_revenue": info.get("totalRevenue"),
-        "revenue_per_share": info.get("revenuePerShare"),
-        "ebitda": info.get("ebitda"),
-        "net_income_to_common": info.get("netIncomeToCommon"),
-        "earnings_per_share": info.get("trailingEps"),
-        "forward_eps": info.get("forwardEps"),
-        "book_value": info.get("bookValue"),
-        "total_cash": info.get("totalCash"),
-        "total_debt": info.get("totalDebt"),
-        "debt_to_equity": info.get("debtToEquity"),
-        "current_ratio": info.get("currentRatio"),
-        "quick_ratio": info.get("quickRatio"),
-
-        # === HISTORIQUES ===
-        "recent_price_history_30_days": history_clean,
-        "recent_volume_history_30_days": volume_clean,
-        "net_income_quarterly": quarterly_results,
-        "revenue_quarterly": quarterly_revenue,
-        "balance_sheet": balance_data,
-        "cashflow": cashflow_data,
-
-        # === NEWS ===
-        "latest_news": clean_news,
+
+@recorded("quote")
+@limited("yahoo")
+def _fetch_quote(data):
+    """
+    Cotation seule via fast_info (requete legere), avec les memes cles que info.
+    Sert a rafraichir les prix sans re-telecharger tout le profil.
+    """
+    fast_info = data.fast_info
+    quote = {}
+    for info_key, attr in QUOTE_FAST_INFO_FIELDS.items():
+        try:
+            quote[info_key] = getattr(fast_info, attr)
+        except Exception:
+            quote[info_key] = None
+    return quote
+
+
+# Cles de info -> attributs de fast_info
+QUOTE_FAST_INFO_FIELDS = {
+    "currentPrice": "last_price",
+    "previousClose": "previous_close",
+    "open": "open",
+    "dayHigh": "day_high",
+    "dayLow": "day_low",
+    "fiftyTwoWeekHigh": "year_high",
+    "fiftyTwoWeekLow": "year_low",
+    "fiftyDayAverage": "fifty_day_average",
+    "twoHundredDayAverage": "two_hundred_day_average",
+    "marketCap": "market_cap",
+    "volume": "last_volume",
+    "averageVolume": "three_month_average_volume",
+}
+
+
+YAHOO_SUB_REQUESTS = {
+    "info": _fetch_info,
+    "news": _fetch_news,
+    "history": _fetch_history,
+    "quarterly_income_stmt": _fetch_income_stmt,
+    "quarterly_balance_sheet": _fetch_balance_sheet,
+    "quarterly_cashflow": _fetch_cashflow,
+    "recommendations": _fetch_recommendations,
+}
+
+
+# Fetch partiel (cache de snapshots) : sous-requetes du snapshot complet + cotation seule
+PARTIAL_SUB_REQUESTS = dict(YAHOO_SUB_REQUESTS, quote=_fetch_quote)
+
+
+def _timed(timings: dict, name: str, func, *args):
+    """Execute func(*args) et enregistre sa duree (en secondes) dans timings[name]."""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+def _news_url(news: dict):
+    return news["content"]["canonicalUrl"].get('url')
+
+
+def _fetch_sequential(data, timings: dict, sub_requests: dict = YAHOO_SUB_REQUESTS) -> dict:
+    """Mode historique : toutes les sous-requetes l'une apres l'autre."""
+    results = {name: _timed(timings, name, func, data) for name, func in sub_requests.items()}
+
+    if "news" in results:
+        articles = {}
+        for i, news in enumerate(results["news"]):
+            url = _news_url(news)
+            if url:
+                articles[i] = _timed(timings, f"article_{i + 1}", scrape_article_content, url)
+        results["articles"] = articles
+    return results
+
+
+def _fetch_concurrent(data, timings: dict, max_workers: int, sub_requests: dict = YAHOO_SUB_REQUESTS) -> dict:
+    """
+    Mode concurrent : les sous-requetes Yahoo tournent dans un pool borne,
+    les scrapes d'articles y sont ajoutes des que la liste des news est connue.
+    Le cout total tend vers celui de la sous-requete la plus lente.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yf_fetch") as pool:
+        futures = {
+            name: pool.submit(_timed, timings, name, func, data)
+            for name, func in sub_requests.items()
+        }
+
+        article_futures = {}
+        if "news" in futures:
+            for i, news in enumerate(futures["news"].result()):
+                url = _news_url(news)
+                if url:
+                    article_futures[i] = pool.submit(_timed, timings, f"article_{i + 1}", scrape_article_content, url)
+
+        results = {name: future.result() for name, future in futures.items()}
+        if "news" in futures:
+            results["articles"] = {i: future.result() for i, future in article_futures.items()}
+    return results
+
+
+def _counters() -> dict:
+    """Releve des compteurs partages (limiteur, cache negatif) avant un fetch."""
+    return {"rate_limit": get_rate_limiter().checkpoint(), "scrape_failures": get_failure_cache().stats()}
+
+
+def _counters_since(before: dict) -> dict:
+    """Entrees de timings accumulees depuis _counters() : attente / re-tentatives, scrapes evites."""
+    failures, previous = get_failure_cache().stats(), before["scrape_failures"]
+    skipped = lambda stats: stats["skipped_urls"] + stats["skipped_domains"]
+    return {
+        "rate_limit": get_rate_limiter().since(before["rate_limit"]),
+        "scrapes_skipped": skipped(failures) - skipped(previous),
+        "scrape_time_avoided": round(failures["time_saved"] - previous["time_saved"], 3),
     }
 
-    return json.dumps(data_filtered, indent=2, ensure_ascii=False)
-    ##print(data_filtered)
+
+def record_fetch_timings(stockName: str, timings: dict):
+    """Enregistre les durees du dernier fetch d'un ticker (lues par get_last_fetch_timings)."""
+    with _timings_lock:
+        _fetch_timings[stockName] = timings
+
+
+def get_last_fetch_timings(stockName: str = None) -> dict:
+    """
+    Retourne les durees par sous-requete du dernier fetch.
+    Sans argument : les timings de tous les tickers deja recuperes.
+    """
+    with _timings_lock:
+        if stockName is None:
+            return {ticker: dict(t) for ticker, t in _fetch_timings.items()}
+        return dict(_fetch_timings.get(stockName, {}))
+
+
+def fetch_stock_snapshot(stockName: str, concurrent: bool = True, max_workers: int = FETCH_MAX_WORKERS) -> StockSnapshot:
+    """
+    Recupere le snapshot complet d'un ticker, sous forme d'objet type (valeurs brutes).
+
+    :param concurrent: True -> sous-requetes et scrapes en parallele (pool borne),
+                       False -> mode sequentiel historique.
+    :param max_workers: Taille max du pool de threads en mode concurrent.
+    """
+    data = get_ticker(stockName)
+
+    timings = {}
+    counters_before = _counters()
+    start = time.perf_counter()
+    if concurrent:
+        results = _fetch_concurrent(data, timings, max_workers)
+    else:
+        results = _fetch_sequential(data, timings)
+    timings["total"] = round(time.perf_counter() - start, 3)
+    timings["mode"] = "concurrent" if concurrent else "sequential"
+    timings.update(_counters_since(counters_before))
+    record_fetch_timings(stockName, timings)
+
+    return _build_snapshot(stockName, results)
+
+
+def fetch_sub_requests(stockName: str, names: list, timings: dict = None,
+                       max_workers: int = FETCH_MAX_WORKERS) -> dict:
+    """
+    Telecharge seulement les sous-requetes `names` d'un ticker (cles de PARTIAL_SUB_REQUESTS),
+    en parallele. Avec "news", results["articles"] contient aussi le texte des articles.
+    """
+    sub_requests = {name: PARTIAL_SUB_REQUESTS[name] for name in names}
+    return _fetch_concurrent(get_ticker(stockName), {} if timings is None else timings, max_workers, sub_requests)
+
+
+def data_fetcher_per_stock(stockName : str, concurrent: bool = True, max_workers: int = FETCH_MAX_WORKERS) -> str:
+    """Recupere le snapshot complet d'un ticker (JSON, format historique)."""
+    return fetch_stock_snapshot(stockName, concurrent, max_workers).to_json()
+
+
+def _build_snapshot(stockName: str, results: dict) -> StockSnapshot:
+    """Assemble le snapshot type a partir des resultats des sous-requetes."""
+    return StockSnapshot.from_results(stockName, results)
+
+
+# === FETCH PAR LOT (WATCHLIST) ===
+
+BATCH_MAX_WORKERS = 16  # Pool partage par tous les tickers du lot
+
+
+def _download_histories(tickers: list) -> dict:
+    """
+    Historique 1 mois de tous les tickers, via le stockage local : les jours manquants
+    sont telecharges en lots groupes (un pour les nouveaux tickers, un pour les mises a jour).
+    Retourne ticker -> colonnes (dates, cloture, volume) ; les tickers absents sont omis.
+    """
+    cassette = get_active_cassette()
+    if cassette is not None:
+        return cassette.call("_batch", ",".join(tickers), _sync_histories, tickers)
+    return _sync_histories(tickers)
+
+
+def _sync_histories(tickers: list) -> dict:
+    from tools.price_store import get_price_store
+
+    store = get_price_store()
+    store.sync_many(tickers)
+    return {ticker: _history_from_store(store, ticker, sync=False) for ticker in tickers if store.has(ticker)}
+
+
+def fetch_snapshots_batch(tickers: list, max_workers: int = BATCH_MAX_WORKERS) -> dict:
+    """
+    Recupere les snapshots de plusieurs tickers.
+
+    Les historiques de prix/volumes sont telecharges en une seule requete groupee,
+    les fondamentaux et les articles de chaque ticker en parallele dans un pool commun.
+    Un ticker en erreur n'interrompt pas le lot : son snapshot a un champ error renseigne.
+
+    :return: dict ticker -> StockSnapshot
+    """
+    tickers = list(dict.fromkeys(tickers))  # Dedoublonne en gardant l'ordre
+    counters_before = _counters()
+    start = time.perf_counter()
+    batch_timings = {}
+    timings = {ticker: {} for ticker in tickers}
+    fundamentals = {name: func for name, func in YAHOO_SUB_REQUESTS.items() if name != "history"}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yf_batch") as pool:
+        history_future = pool.submit(_timed, batch_timings, "download", _download_histories, tickers)
+        futures = {
+            ticker: {name: pool.submit(_timed, timings[ticker], name, func, get_ticker(ticker))
+                     for name, func in fundamentals.items()}
+            for ticker in tickers
+        }
+
+        # Les scrapes partent des que la liste de news d'un ticker est connue
+        article_futures = {ticker: {} for ticker in tickers}
+        for ticker in tickers:
+            try:
+                raw_news = futures[ticker]["news"].result()
+            except Exception:
+                continue
+            for i, news in enumerate(raw_news):
+                url = _news_url(news)
+                if url:
+                    article_futures[ticker][i] = pool.submit(
+                        _timed, timings[ticker], f"article_{i + 1}", scrape_article_content, url)
+
+        try:
+            histories = history_future.result()
+        except Exception as e:
+            print(f"[Batch] Telechargement groupe echoue, repli ticker par ticker : {e}")
+            histories = {}
+        # Repli individuel pour les tickers absents du telechargement groupe
+        history_fallbacks = {
+            ticker: pool.submit(_timed, timings[ticker], "history", _fetch_history, get_ticker(ticker))
+            for ticker in tickers if ticker not in histories
+        }
+
+        snapshots = {}
+        for ticker in tickers:
+            try:
+                results = {name: future.result() for name, future in futures[ticker].items()}
+                results["history"] = histories[ticker] if ticker in histories else history_fallbacks[ticker].result()
+                results["articles"] = {i: future.result() for i, future in article_futures[ticker].items()}
+                snapshots[ticker] = _build_snapshot(ticker, results)
+            except Exception as e:
+                snapshots[ticker] = StockSnapshot(ticker, error=str(e))
+
+    total = round(time.perf_counter() - start, 3)
+    counters = _counters_since(counters_before)  # Cumul sur tout le lot
+    for ticker in tickers:
+        timings[ticker].update({"batch_download": batch_timings.get("download"), "total": total, "mode": "batch",
+                                **counters})
+        record_fetch_timings(ticker, timings[ticker])
+
+    return snapshots
+
+
+def data_fetcher_batch(tickers: list, max_workers: int = BATCH_MAX_WORKERS) -> dict:
+    """fetch_snapshots_batch au format JSON : dict ticker -> snapshot JSON."""
+    return {ticker: snapshot.to_json() for ticker, snapshot in fetch_snapshots_batch(tickers, max_workers).items()}
+
+
+# === API ASYNCIO ===
+# yfinance est synchrone : ses sous-requetes tournent dans un pool partage et borne
+# (pas un thread par requete). Les articles sont telecharges en HTTP asynchrone
+# (aiohttp) quand il est installe, sinon ils passent aussi par le pool.
+
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def _get_async_executor() -> ThreadPoolExecutor:
+    """Pool de threads partage par tous les fetchs asynchrones du processus."""
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            _async_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="yf_async")
+        return _async_executor
+
+
+async def _run_off_loop(func, *args):
+    import asyncio  # Deja charge par la boucle appelante : pas de cout a l'import du module
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_async_executor(), partial(func, *args))
+
+
+async def _gather_or_cancel(aws: dict) -> dict:
+    """
+    Attend un dict nom -> coroutine. Si l'une echoue ou si l'appelant est annule,
+    les taches restantes sont annulees avant de propager l'exception.
+    """
+    import asyncio
+
+    tasks = {name: asyncio.ensure_future(aw) for name, aw in aws.items()}
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}
+
+
+async def ascrape_article_content(url: str, max_chars: int = 5000, session=None) -> str:
+    """
+    Version asynchrone de scrape_article_content.
+
+    :param session: aiohttp.ClientSession a reutiliser (optionnel).
+    """
+    import asyncio
+
+    aiohttp = get_aiohttp()
+    if aiohttp is None or get_active_cassette() is not None:
+        return await _run_off_loop(scrape_article_content, url, max_chars)
+
+    store = get_article_store()
+    record = await _run_off_loop(store.load, url)
+    if store.is_fresh(record):
+        return await _run_off_loop(store.text, record, max_chars, extract_article_text, extractor_version())
+
+    failures = get_failure_cache()
+    skip_reason = failures.check(url)
+    if skip_reason:
+        if record:
+            return await _run_off_loop(store.text, record, max_chars, extract_article_text, extractor_version(),
+                                       "served_on_error")
+        return f"Erreur scraping: {skip_reason} (source ignoree)"
+
+    start = time.perf_counter()
+    try:
+        own_session = session is None
+        if own_session:
+            session = new_async_session(SCRAPE_HEADERS)
+        try:
+            timeout = aiohttp.ClientTimeout(total=SCRAPE_TIMEOUT)
+            headers = dict(SCRAPE_HEADERS, **store.conditional_headers(record))
+
+            async def get_page():
+                # Un 429/5xx leve ClientResponseError (status, headers) : re-tente par le limiteur
+                async with session.get(url, headers=headers, timeout=timeout, ssl=False) as response:
+                    if response.status == 304 and record is not None:
+                        return True, None, None
+                    response.raise_for_status()
+                    return False, await aread_capped(response), response.headers
+
+            not_modified, html, response_headers = await get_rate_limiter().acall("news", get_page)
+        finally:
+            if own_session:
+                await session.close()
+        failures.record_success(url)
+
+        if not_modified:
+            await _run_off_loop(store.touch, record)
+            return await _run_off_loop(store.text, record, max_chars, extract_article_text, extractor_version(),
+                                       "revalidated")
+
+        # Le parsing HTML est CPU-bound : il ne doit pas bloquer la boucle
+        text = await _run_off_loop(extract_article_text, html, max_chars)
+        await _run_off_loop(store.save, url, html, response_headers, text, max_chars, extractor_version())
+        return text
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        failures.record_failure(url, e, time.perf_counter() - start)
+        if record:
+            return await _run_off_loop(store.text, record, max_chars, extract_article_text, extractor_version(),
+                                       "served_on_error")
+        return f"Erreur scraping: {str(e)}"
+
+
+async def _atimed(timings: dict, name: str, aw):
+    start = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+async def afetch_stock_snapshot(stockName: str, session=None) -> StockSnapshot:
+    """
+    Version asynchrone de fetch_stock_snapshot : meme snapshot, sans bloquer
+    la boucle d'evenements. Annulable (les scrapes en cours sont annules).
+
+    Plusieurs tickers sur une meme boucle :
+        snapshots = await asyncio.gather(*(afetch_stock_snapshot(t) for t in tickers))
+
+    :param session: aiohttp.ClientSession partagee pour les scrapes (optionnel).
+    """
+    data = get_ticker(stockName)
+
+    timings = {}
+    counters_before = _counters()
+    start = time.perf_counter()
+
+    own_session = session is None and get_aiohttp() is not None
+    if own_session:
+        session = new_async_session(SCRAPE_HEADERS)
+    try:
+        async def fetch_articles():
+            raw_news = await _atimed(timings, "news", _run_off_loop(_fetch_news, data))
+            scrapes = {
+                i: _atimed(timings, f"article_{i + 1}", ascrape_article_content(_news_url(news), session=session))
+                for i, news in enumerate(raw_news) if _news_url(news)
+            }
+            return raw_news, await _gather_or_cancel(scrapes)
+
+        aws = {
+            name: _atimed(timings, name, _run_off_loop(func, data))
+            for name, func in YAHOO_SUB_REQUESTS.items() if name != "news"
+        }
+        aws["news"] = fetch_articles()
+        results = await _gather_or_cancel(aws)
+    finally:
+        if own_session:
+            await session.close()
+
+    results["news"], results["articles"] = results["news"]
+    timings["total"] = round(time.perf_counter() - start, 3)
+    timings["mode"] = "async"
+    timings.update(_counters_since(counters_before))
+    record_fetch_timings(stockName, timings)
+
+    return _build_snapshot(stockName, results)
+
+
+async def adata_fetcher_per_stock(stockName: str, session=None) -> str:
+    """Version asynchrone de data_fetcher_per_stock (JSON, format historique)."""
+    return (await afetch_stock_snapshot(stockName, session)).to_json()
 
 
 if __name__ == "__main__":